@@ -68,3 +68,39 @@ CREATE OR REPLACE FUNCTION rrf_score(rank bigint, rrf_k bigint DEFAULT 50)
 RETURNS numeric AS $$
     SELECT COALESCE(1.0 / ($1 + $2), 0.0);
 $$ LANGUAGE sql IMMUTABLE;
+
+-- Btree index for source_url equality lookups (exact-match identifier
+-- fast path pins all chunks of a document by source_url).
+CREATE INDEX IF NOT EXISTS idx_chunks_source_url
+    ON chunks (source_url);
+
+-- Query expansion dictionary (keyword <-> description, camelCase API
+-- names, legacy terms).  Rebuilt from the chunks table after every
+-- ingest by bbj_rag.intelligence.synonyms.refresh_synonyms() and loaded
+-- into memory at API startup.
+CREATE TABLE IF NOT EXISTS query_synonyms (
+    term            TEXT            PRIMARY KEY,
+    expansions      TEXT[]          NOT NULL,
+    source          TEXT            NOT NULL DEFAULT '',
+    updated_at      TIMESTAMPTZ     NOT NULL DEFAULT now()
+);
+
+-- Corpus-level key/value metadata.  "corpus_version" is replaced after
+-- every ingest (bbj_rag.chat.answer_cache.bump_corpus_version()) so
+-- caches derived from the chunks table can detect a changed corpus.
+CREATE TABLE IF NOT EXISTS corpus_meta (
+    key             TEXT            PRIMARY KEY,
+    value           TEXT            NOT NULL,
+    updated_at      TIMESTAMPTZ     NOT NULL DEFAULT now()
+);
+
+-- Precomputed chunk counts per (dimension, key): dimension is "total"
+-- (key ''), "source", "doc_type" or "generation".  Rebuilt after every
+-- ingest by bbj_rag.intelligence.corpus_stats.refresh_corpus_stats() and
+-- served by /stats and the quality report without scanning chunks.
+CREATE TABLE IF NOT EXISTS corpus_stats (
+    dimension       TEXT            NOT NULL,
+    key             TEXT            NOT NULL,
+    count           BIGINT          NOT NULL,
+    PRIMARY KEY (dimension, key)
+);
@@ -1,26 +1,44 @@
 """Chat API routes: GET /chat (page), POST /chat/stream (SSE).
 
-The /chat/stream endpoint accepts a messages array, runs RAG search
-for the latest user query, builds a grounded system prompt, and
-streams Claude's response as JSON-encoded SSE events.
+The /chat/stream endpoint accepts a messages array, condenses the latest
+user message and recent turns into a standalone query, runs RAG search
+for it, packs the results into a token-budgeted context, builds a
+grounded prompt, and streams Claude's response as JSON-encoded SSE
+events.
 """
 
 from __future__ import annotations
 
+import logging
 from pathlib import Path
-from typing import Annotated
+from typing import Annotated, Any
 
+from anthropic import AsyncAnthropic
 from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi.responses import HTMLResponse
 from fastapi.templating import Jinja2Templates
-from ollama import AsyncClient as OllamaAsyncClient
-from psycopg import AsyncConnection
+from psycopg_pool import AsyncConnectionPool
 from pydantic import BaseModel
 from sse_starlette.sse import EventSourceResponse
 
-from bbj_rag.api.deps import get_conn, get_ollama_client, get_settings
+from bbj_rag.api.deps import (
+    checkout,
+    embed_query,
+    get_answer_cache,
+    get_anthropic_client,
+    get_pool,
+    get_query_embedder,
+    get_settings,
+    get_synonym_map,
+)
+from bbj_rag.chat.answer_cache import AnswerCache, load_corpus_version, replay
+from bbj_rag.chat.context import pack_context
+from bbj_rag.chat.history import condense_query
 from bbj_rag.chat.stream import stream_chat_response
 from bbj_rag.config import Settings
+from bbj_rag.intelligence.synonyms import SynonymMap
+from bbj_rag.metrics import set_request_label, stage_timer
+from bbj_rag.query_embedder import QueryEmbedder
 from bbj_rag.search import async_hybrid_search, rerank_for_diversity
 
 _TEMPLATES_DIR = Path(__file__).resolve().parent.parent / "templates"
@@ -28,10 +46,15 @@ templates = Jinja2Templates(directory=str(_TEMPLATES_DIR))
 
 router = APIRouter(prefix="/chat", tags=["chat"])
 
+logger = logging.getLogger(__name__)
+
 # Annotated dependency types for FastAPI injection
-ConnDep = Annotated[AsyncConnection[object], Depends(get_conn)]
-OllamaDep = Annotated[OllamaAsyncClient, Depends(get_ollama_client)]
+PoolDep = Annotated[AsyncConnectionPool[Any], Depends(get_pool)]
+QueryEmbedderDep = Annotated[QueryEmbedder, Depends(get_query_embedder)]
+AnthropicDep = Annotated[AsyncAnthropic, Depends(get_anthropic_client)]
+AnswerCacheDep = Annotated[AnswerCache | None, Depends(get_answer_cache)]
 SettingsDep = Annotated[Settings, Depends(get_settings)]
+SynonymMapDep = Annotated[SynonymMap, Depends(get_synonym_map)]
 
 
 class ChatMessage(BaseModel):
@@ -56,9 +79,12 @@ async def chat_page(request: Request) -> HTMLResponse:
 @router.post("/stream")
 async def chat_stream(
     body: ChatRequest,
-    conn: ConnDep,
-    ollama_client: OllamaDep,
+    pool: PoolDep,
+    embedder: QueryEmbedderDep,
+    anthropic_client: AnthropicDep,
     settings: SettingsDep,
+    synonyms: SynonymMapDep,
+    answer_cache: AnswerCacheDep,
 ) -> EventSourceResponse:
     """Stream Claude's RAG-grounded response as SSE events.
 
@@ -71,37 +97,65 @@ async def chat_stream(
     if not body.messages:
         raise HTTPException(status_code=422, detail="messages array must not be empty")
 
-    # Extract latest user message for RAG search
-    user_query = body.messages[-1].content
+    # Convert messages to dicts for query building and streaming
+    messages_dicts = [{"role": m.role, "content": m.content} for m in body.messages]
 
-    # Embed the query using Ollama
-    try:
-        response = await ollama_client.embed(
-            model=settings.embedding_model, input=user_query
-        )
-        embedding: list[float] = response["embeddings"][0]
-    except Exception as exc:
-        raise HTTPException(
-            status_code=503, detail=f"Ollama embedding failed: {exc}"
-        ) from exc
+    # Standalone retrieval query: follow-ups carry the previous turn
+    with stage_timer("condense"):
+        user_query = await condense_query(messages_dicts, settings, anthropic_client)
 
-    # Run hybrid search with diversity reranking
-    raw_results = await async_hybrid_search(
-        conn=conn,
-        query_embedding=embedding,
-        query_text=user_query,
-        limit=10,
-    )
-    results = rerank_for_diversity(raw_results, limit=5)
+    # Embed the query (batched and admission-controlled)
+    embedding = await embed_query(embedder, user_query)
 
-    # Determine confidence level
+    # Run hybrid search with diversity reranking
+    with stage_timer("expand"):
+        expansion = synonyms.expansion_query(user_query)
+    # Single-turn questions may be answered from the answer cache; its
+    # corpus version is read on the same short checkout as the search
+    use_cache = answer_cache is not None and len(messages_dicts) == 1
+    corpus_version: str | None = None
+    async with checkout(pool) as conn:
+        raw_results = await async_hybrid_search(
+            conn=conn,
+            query_embedding=embedding,
+            query_text=user_query,
+            # Over-fetch so the diversity rerank has candidates to promote
+            limit=20,
+            expansion=expansion,
+        )
+        if use_cache:
+            try:
+                corpus_version = await load_corpus_version(conn)
+            except Exception:
+                logger.warning("Corpus version lookup failed; answer cache bypassed")
+    with stage_timer("rerank"):
+        candidates = rerank_for_diversity(raw_results, limit=10)
+
+    # Dedupe, merge and trim candidates to the context token budget
+    results = pack_context(candidates, settings.chat_context_token_budget)
+
+    # Confidence is judged on the sources Claude actually sees
     low_confidence = len(results) < settings.chat_confidence_min_results or (
         len(results) > 0 and results[0].score < settings.chat_confidence_min_score
     )
 
-    # Convert messages to dicts for the streaming function
-    messages_dicts = [{"role": m.role, "content": m.content} for m in body.messages]
-
-    return EventSourceResponse(
-        stream_chat_response(messages_dicts, results, settings, low_confidence)
+    events = stream_chat_response(
+        messages_dicts, results, settings, low_confidence, anthropic_client
     )
+
+    if answer_cache is not None and corpus_version is not None:
+        answer_cache.sync_corpus_version(corpus_version)
+        key = answer_cache.key(
+            user_query,
+            [r.id for r in results],
+            settings.chat_model,
+            corpus_version,
+        )
+        cached = answer_cache.get(key)
+        if cached is not None:
+            set_request_label("cache", "hit")
+            return EventSourceResponse(replay(cached))
+        set_request_label("cache", "miss")
+        events = answer_cache.record(key, events)
+
+    return EventSourceResponse(events)
@@ -1,25 +1,95 @@
 """FastAPI dependency injection functions for the BBJ RAG API.
 
-Provides request-scoped database connections from the async pool,
-and access to shared application state (settings, Ollama client).
+Provides the async connection pool with a ``checkout()`` helper that
+borrows a connection only around the queries that need it, and access
+to shared application state (settings, Ollama and Anthropic clients,
+the query embedder,
+identifier index, query synonym map, chat answer cache, /stats cache).
 """
 
 from __future__ import annotations
 
+import time
 from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from typing import Any
 
-from fastapi import Request
+from anthropic import AsyncAnthropic
+from fastapi import HTTPException, Request
 from ollama import AsyncClient as OllamaAsyncClient
 from psycopg import AsyncConnection
+from psycopg_pool import AsyncConnectionPool, PoolTimeout
 
+from bbj_rag.chat.answer_cache import AnswerCache
 from bbj_rag.config import Settings
+from bbj_rag.identifiers import IdentifierIndex
+from bbj_rag.intelligence.corpus_stats import StatsCache
+from bbj_rag.intelligence.synonyms import SynonymMap
+from bbj_rag.metrics import record_stage, stage_timer
+from bbj_rag.query_embedder import EmbeddingOverloaded, QueryEmbedder
 
 
-async def get_conn(request: Request) -> AsyncIterator[AsyncConnection[object]]:
-    """Yield a connection from the async pool, returning it on completion."""
-    pool = request.app.state.pool
-    async with pool.connection() as conn:
-        yield conn
+def get_pool(request: Request) -> AsyncConnectionPool[Any]:
+    """Return the shared async connection pool.
+
+    Handlers borrow connections with ``checkout()`` around their queries
+    instead of holding one for the whole request, so slow embedding and
+    Claude calls do not keep connections out of the pool.
+    """
+    return request.app.state.pool  # type: ignore[no-any-return]
+
+
+@asynccontextmanager
+async def checkout(
+    pool: AsyncConnectionPool[Any],
+) -> AsyncIterator[AsyncConnection[Any]]:
+    """Borrow a pooled connection for the enclosed block.
+
+    Checkout wait is recorded as the ``pool_wait`` stage and the time the
+    connection is held as ``pool_hold``.  When no connection frees up
+    within the pool timeout the request fails fast with 503 instead of
+    queueing indefinitely.
+    """
+    start = time.perf_counter()
+    acquired: float | None = None
+    try:
+        async with pool.connection() as conn:
+            acquired = time.perf_counter()
+            record_stage("pool_wait", acquired - start)
+            try:
+                yield conn
+            finally:
+                record_stage("pool_hold", time.perf_counter() - acquired)
+    except PoolTimeout as exc:
+        if acquired is not None:
+            raise
+        record_stage("pool_wait", time.perf_counter() - start)
+        raise HTTPException(
+            status_code=503,
+            detail="Database connection pool exhausted, retry shortly",
+            headers={"Retry-After": "1"},
+        ) from exc
+
+
+async def embed_query(embedder: QueryEmbedder, text: str) -> list[float]:
+    """Embed a search query, timed as the ``embed`` stage.
+
+    A full embedding queue fails fast with 503 + Retry-After; Ollama
+    errors and timeouts fail with 503 as before.
+    """
+    try:
+        with stage_timer("embed"):
+            return await embedder.embed(text)
+    except EmbeddingOverloaded as exc:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Embedding service busy: {exc}",
+            headers={"Retry-After": "1"},
+        ) from exc
+    except Exception as exc:
+        raise HTTPException(
+            status_code=503, detail=f"Ollama embedding failed: {exc}"
+        ) from exc
 
 
 def get_settings(request: Request) -> Settings:
@@ -30,3 +100,33 @@ def get_settings(request: Request) -> Settings:
 def get_ollama_client(request: Request) -> OllamaAsyncClient:
     """Return the shared OllamaAsyncClient instance."""
     return request.app.state.ollama_client  # type: ignore[no-any-return]
+
+
+def get_query_embedder(request: Request) -> QueryEmbedder:
+    """Return the shared batching, concurrency-limited QueryEmbedder."""
+    return request.app.state.query_embedder  # type: ignore[no-any-return]
+
+
+def get_anthropic_client(request: Request) -> AsyncAnthropic:
+    """Return the shared AsyncAnthropic client (pooled HTTP connections)."""
+    return request.app.state.anthropic_client  # type: ignore[no-any-return]
+
+
+def get_answer_cache(request: Request) -> AnswerCache | None:
+    """Return the shared AnswerCache, or None when answer caching is off."""
+    return getattr(request.app.state, "answer_cache", None)
+
+
+def get_identifier_index(request: Request) -> IdentifierIndex:
+    """Return the shared IdentifierIndex loaded at startup."""
+    return request.app.state.identifier_index  # type: ignore[no-any-return]
+
+
+def get_synonym_map(request: Request) -> SynonymMap:
+    """Return the shared SynonymMap loaded at startup."""
+    return request.app.state.synonym_map  # type: ignore[no-any-return]
+
+
+def get_stats_cache(request: Request) -> StatsCache:
+    """Return the shared StatsCache backing /stats."""
+    return request.app.state.stats_cache  # type: ignore[no-any-return]
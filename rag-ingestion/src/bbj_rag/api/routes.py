@@ -1,133 +1,285 @@
 """API route definitions for the BBJ RAG REST API.
 
-The /search endpoint accepts a query, embeds it via Ollama, runs hybrid
-RRF search against pgvector, and returns ranked documentation chunks.
-The /stats endpoint returns corpus statistics (total chunks, breakdowns
-by doc_type and by generation tag).
+The /search endpoint accepts a query, embeds it via Ollama (through the
+shared, batching QueryEmbedder), runs hybrid RRF search against
+pgvector, and returns ranked documentation chunks, encoded straight
+from the SearchResult dataclasses (see fastjson).  Single API
+identifiers are resolved through the exact-match fast path instead,
+without an embedding call.  /search/stream runs the same stages but
+sends each stage's results as soon as they are ready, as NDJSON lines
+or SSE events: ``exact`` or ``fused``, then ``reranked``, then ``done``.
+The keyword branch is widened with synonym and mnemonic expansions
+from the in-memory query synonym map.
+The /suggest endpoint completes partial API names from an in-memory
+identifier index without embedding.  The /stats endpoint returns corpus
+statistics (total chunks, breakdowns by doc_type and by generation tag)
+from the precomputed corpus_stats table, cached in-process.
 """
 
 from __future__ import annotations
 
+import logging
 from collections import Counter
-from typing import Annotated
+from collections.abc import AsyncIterator
+from typing import Annotated, Any
 
-from fastapi import APIRouter, Depends, HTTPException
-from ollama import AsyncClient as OllamaAsyncClient
-from psycopg import AsyncConnection
-from psycopg.rows import tuple_row
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from psycopg_pool import AsyncConnectionPool
+from sse_starlette.sse import EventSourceResponse
 
-from bbj_rag.api.deps import get_conn, get_ollama_client, get_settings
+from bbj_rag.api.deps import (
+    checkout,
+    embed_query,
+    get_identifier_index,
+    get_pool,
+    get_query_embedder,
+    get_settings,
+    get_stats_cache,
+    get_synonym_map,
+)
 from bbj_rag.api.schemas import (
     SearchRequest,
     SearchResponse,
-    SearchResultItem,
     StatsResponse,
+    SuggestItem,
+    SuggestResponse,
 )
 from bbj_rag.config import Settings
-from bbj_rag.search import async_hybrid_search, rerank_for_diversity
+from bbj_rag.fastjson import FastJSONResponse, dumps
+from bbj_rag.identifiers import IdentifierIndex
+from bbj_rag.intelligence.corpus_stats import StatsCache, async_load_corpus_stats
+from bbj_rag.intelligence.synonyms import SynonymMap
+from bbj_rag.metrics import set_request_label, stage_timer
+from bbj_rag.query_embedder import QueryEmbedder
+from bbj_rag.search import (
+    SearchResult,
+    async_exact_match_search,
+    async_hybrid_search,
+    exact_match_urls,
+    rerank_for_diversity,
+)
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 # Annotated dependency types for FastAPI injection
-ConnDep = Annotated[AsyncConnection[object], Depends(get_conn)]
-OllamaDep = Annotated[OllamaAsyncClient, Depends(get_ollama_client)]
+PoolDep = Annotated[AsyncConnectionPool[Any], Depends(get_pool)]
+QueryEmbedderDep = Annotated[QueryEmbedder, Depends(get_query_embedder)]
 SettingsDep = Annotated[Settings, Depends(get_settings)]
+IdentifierIndexDep = Annotated[IdentifierIndex, Depends(get_identifier_index)]
+SynonymMapDep = Annotated[SynonymMap, Depends(get_synonym_map)]
+StatsCacheDep = Annotated[StatsCache, Depends(get_stats_cache)]
 
 
-@router.post("/search", response_model=SearchResponse)
+@router.post("/search", response_model=SearchResponse, response_class=FastJSONResponse)
 async def search(
     body: SearchRequest,
-    conn: ConnDep,
-    ollama_client: OllamaDep,
-    settings: SettingsDep,
-) -> SearchResponse:
-    """Execute a hybrid search over the BBj documentation corpus."""
+    pool: PoolDep,
+    embedder: QueryEmbedderDep,
+    index: IdentifierIndexDep,
+    synonyms: SynonymMapDep,
+) -> FastJSONResponse:
+    """Execute a hybrid search over the BBj documentation corpus.
+
+    Single-identifier queries with an exact hit in the identifier index
+    take the fast path and skip the embedding call entirely.  Pooled
+    connections are held only while SQL runs, not during the embedding.
+    """
+    # Only the last stage (exact or reranked) is returned
+    results: list[SearchResult] = []
+    stages = _search_stages(body, pool, embedder, index, synonyms)
+    async for _stage, stage_results in stages:
+        results = stage_results
+    return FastJSONResponse(_search_payload(body.query, results))
+
+
+@router.post(
+    "/search/stream",
+    responses={
+        200: {
+            "content": {"application/x-ndjson": {}, "text/event-stream": {}},
+            "description": "One event per search stage (see module docstring)",
+        }
+    },
+)
+async def search_stream(
+    request: Request,
+    body: SearchRequest,
+    pool: PoolDep,
+    embedder: QueryEmbedderDep,
+    index: IdentifierIndexDep,
+    synonyms: SynonymMapDep,
+) -> Response:
+    """Stream search results stage by stage as NDJSON or SSE.
+
+    Emits ``exact`` (identifier fast path) or ``fused`` (hybrid RRF
+    results) as soon as they are available, then ``reranked`` (the final
+    /search results) and ``done``.  Failures after the stream started are
+    reported as an ``error`` event.  Send ``Accept: text/event-stream``
+    for SSE; NDJSON is the default.
+    """
+    events = _stream_events(body, pool, embedder, index, synonyms)
+    if "text/event-stream" in request.headers.get("accept", ""):
+        return EventSourceResponse(
+            {"event": event, "data": dumps(data)} async for event, data in events
+        )
+    return StreamingResponse(
+        (dumps({"event": event, **data}) + "\n" async for event, data in events),
+        media_type="application/x-ndjson",
+    )
+
+
+async def _search_stages(
+    body: SearchRequest,
+    pool: AsyncConnectionPool[Any],
+    embedder: QueryEmbedder,
+    index: IdentifierIndex,
+    synonyms: SynonymMap,
+) -> AsyncIterator[tuple[str, list[SearchResult]]]:
+    """Yield ``(stage, results)`` as each search stage completes.
+
+    Stages: ``exact`` alone when the identifier fast path hits,
+    otherwise ``fused`` (the top RRF results before diversity reranking)
+    followed by ``reranked``.  The last stage is the /search answer.
+    """
     # Normalize generation filter: bbj-gui -> bbj_gui
     gen_filter: str | None = None
     if body.generation is not None:
         gen_filter = body.generation.replace("-", "_")
+    set_request_label("generation_filter", str(gen_filter is not None).lower())
 
-    # Embed the query
-    try:
-        response = await ollama_client.embed(
-            model=settings.embedding_model, input=body.query
-        )
-        embedding: list[float] = response["embeddings"][0]
-    except Exception as exc:
-        raise HTTPException(
-            status_code=503, detail=f"Ollama embedding failed: {exc}"
-        ) from exc
+    # Exact-match fast path for API identifiers (no embedding, no HNSW);
+    # the in-memory index check spares ordinary queries a pool checkout
+    exact_urls = exact_match_urls(index, body.query)
+    if exact_urls:
+        async with checkout(pool) as conn:
+            exact_results = await async_exact_match_search(
+                conn=conn,
+                index=index,
+                query_text=body.query,
+                limit=body.limit,
+                generation_filter=gen_filter,
+                source_urls=exact_urls,
+            )
+        if exact_results:
+            yield "exact", exact_results
+            return
+
+    # Embed the query (batched and admission-controlled)
+    embedding = await embed_query(embedder, body.query)
 
     # Over-fetch for diversity reranking pool
-    raw_results = await async_hybrid_search(
-        conn=conn,
-        query_embedding=embedding,
-        query_text=body.query,
-        limit=body.limit * 2,
-        generation_filter=gen_filter,
-    )
+    with stage_timer("expand"):
+        expansion = synonyms.expansion_query(body.query)
+    async with checkout(pool) as conn:
+        raw_results = await async_hybrid_search(
+            conn=conn,
+            query_embedding=embedding,
+            query_text=body.query,
+            limit=body.limit * 2,
+            generation_filter=gen_filter,
+            expansion=expansion,
+        )
+    yield "fused", raw_results[: body.limit]
 
     # Apply diversity reranking
-    results = rerank_for_diversity(raw_results, limit=body.limit)
-
-    # Compute source type breakdown
-    source_type_counts = dict(Counter(r.source_type for r in results))
-
-    # Build response
-    items = [
-        SearchResultItem(
-            content=r.content,
-            title=r.title,
-            source_url=r.source_url,
-            doc_type=r.doc_type,
-            generations=r.generations,
-            context_header=r.context_header,
-            deprecated=r.deprecated,
-            display_url=r.display_url,
-            source_type=r.source_type,
-            score=r.score,
-        )
-        for r in results
-    ]
+    with stage_timer("rerank"):
+        results = rerank_for_diversity(raw_results, limit=body.limit)
+    yield "reranked", results
+
+
+async def _stream_events(
+    body: SearchRequest,
+    pool: AsyncConnectionPool[Any],
+    embedder: QueryEmbedder,
+    index: IdentifierIndex,
+    synonyms: SynonymMap,
+) -> AsyncIterator[tuple[str, dict[str, Any]]]:
+    """Map search stages to ``(event, data)`` pairs for /search/stream."""
+    count = 0
+    try:
+        async for stage, results in _search_stages(
+            body, pool, embedder, index, synonyms
+        ):
+            count = len(results)
+            yield stage, _search_payload(body.query, results)
+    except HTTPException as exc:
+        yield "error", {"status": exc.status_code, "detail": exc.detail}
+        return
+    except Exception as exc:
+        logger.exception("Search stream error")
+        yield "error", {"status": 500, "detail": str(exc)}
+        return
+    yield "done", {"query": body.query, "count": count}
 
-    return SearchResponse(
-        query=body.query,
-        results=items,
-        count=len(items),
-        source_type_counts=source_type_counts,
-    )
+
+def _search_payload(query: str, results: list[SearchResult]) -> dict[str, Any]:
+    """Build the SearchResponse envelope as plain JSON-ready data.
+
+    Encoded directly by FastJSONResponse; the SearchResponse model only
+    documents the shape in the OpenAPI schema.
+    """
+    return {
+        "query": query,
+        "results": [
+            {
+                "content": r.content,
+                "title": r.title,
+                "source_url": r.source_url,
+                "doc_type": r.doc_type,
+                "generations": r.generations,
+                "context_header": r.context_header,
+                "deprecated": r.deprecated,
+                "display_url": r.display_url,
+                "source_type": r.source_type,
+                "score": r.score,
+            }
+            for r in results
+        ],
+        "count": len(results),
+        "source_type_counts": dict(Counter(r.source_type for r in results)),
+    }
+
+
+@router.get("/suggest", response_model=SuggestResponse)
+async def suggest(
+    index: IdentifierIndexDep,
+    q: Annotated[str, Query(min_length=1, max_length=100)],
+    limit: Annotated[int, Query(ge=1, le=25)] = 10,
+) -> SuggestResponse:
+    """Complete a partial class, method, or topic name (no embedding)."""
+    suggestions = [
+        SuggestItem(name=i.name, kind=i.kind, owner=i.owner, url=i.url)
+        for i in index.complete(q, limit=limit)
+    ]
+    return SuggestResponse(query=q, suggestions=suggestions)
 
 
 @router.get("/stats", response_model=StatsResponse)
-async def stats(conn: ConnDep) -> StatsResponse:
-    """Return corpus statistics: total chunks, by source, by generation."""
-    try:
-        async with conn.cursor(row_factory=tuple_row) as cur:
-            # Total chunk count
-            await cur.execute("SELECT count(*) FROM chunks")
-            row = await cur.fetchone()
-            total = row[0] if row else 0
-
-            # Chunks grouped by doc_type
-            await cur.execute(
-                "SELECT doc_type, count(*) FROM chunks "
-                "GROUP BY doc_type ORDER BY count(*) DESC"
-            )
-            by_source: dict[str, int] = {r[0]: r[1] for r in await cur.fetchall()}
+async def stats(pool: PoolDep, stats_cache: StatsCacheDep) -> StatsResponse:
+    """Return corpus statistics: total chunks, by source, by generation.
 
-            # Chunks grouped by unnested generation tag
-            await cur.execute(
-                "SELECT g, count(*) FROM chunks, unnest(generations) AS g "
-                "GROUP BY g ORDER BY count(*) DESC"
-            )
-            by_generation: dict[str, int] = {r[0]: r[1] for r in await cur.fetchall()}
-    except Exception as exc:
-        raise HTTPException(
-            status_code=503, detail=f"Database query failed: {exc}"
-        ) from exc
+    Served from the precomputed ``corpus_stats`` table, cached in-process
+    for ``Settings.stats_cache_ttl`` seconds.
+    """
+    corpus = stats_cache.get()
+    set_request_label("cache", "miss" if corpus is None else "hit")
+    if corpus is None:
+        try:
+            async with checkout(pool) as conn:
+                corpus = await async_load_corpus_stats(conn)
+        except HTTPException:
+            raise
+        except Exception as exc:
+            raise HTTPException(
+                status_code=503, detail=f"Database query failed: {exc}"
+            ) from exc
+        stats_cache.put(corpus)
 
     return StatsResponse(
-        total_chunks=total,
-        by_source=by_source,
-        by_generation=by_generation,
+        total_chunks=corpus.total,
+        by_source=corpus.by_doc_type,
+        by_generation=corpus.by_generation,
     )
@@ -54,3 +54,19 @@ class StatsResponse(BaseModel):
     total_chunks: int
     by_source: dict[str, int]
     by_generation: dict[str, int]
+
+
+class SuggestItem(BaseModel):
+    """A single autocomplete suggestion for an API name or topic title."""
+
+    name: str
+    kind: str = Field(description="One of: class, method, topic")
+    owner: str = Field(default="", description="Owning class for methods")
+    url: str
+
+
+class SuggestResponse(BaseModel):
+    """Envelope containing ranked autocomplete suggestions."""
+
+    query: str
+    suggestions: list[SuggestItem]
@@ -1,17 +1,42 @@
 """FastAPI application entrypoint for the BBJ RAG service.
 
-Lifespan handler validates the environment, logs a startup summary,
-applies the pgvector schema idempotently, initialises an async connection
-pool with pgvector type registration, and warms up the Ollama embedding
-model on every startup.
+Startup runs in two phases so the process accepts traffic (and answers
+liveness probes) within a second or two, independent of Ollama:
+
+1. Blocking, fast:
+
+   - validate the environment and log a startup summary
+   - apply the pgvector schema (skipped when the stored version matches)
+   - open the async connection pool, sized from ``Settings.db_pool_limits``
+   - start the batched bbjcpl compiler pool
+   - create the shared Ollama and Anthropic clients and the query embedder
+   - start the background health monitor
+   - build the answer and stats caches and the per-client rate limiters
+
+2. Background warm-up, each step a startup phase on the health monitor:
+
+   - load the API identifier index used by /suggest
+   - load the query synonym map used for keyword expansion
+   - warm up the Ollama embedding model
+
+   ``/health/ready`` reports ready once all phases have finished;
+   failures are logged and non-fatal.
+
+Under ``bbj-rag serve --workers N`` every worker process runs this
+lifespan independently: its own pool, clients and in-memory caches, and
+nothing shared except PostgreSQL (the schema apply is serialised with
+an advisory lock).
 """
 
 from __future__ import annotations
 
+import asyncio
 import logging
+import os
 from collections.abc import AsyncIterator
 from contextlib import asynccontextmanager
 from pathlib import Path
+from typing import TYPE_CHECKING, Any
 
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
@@ -20,79 +45,256 @@ from bbj_rag.api.chat import router as chat_router
 from bbj_rag.api.routes import router as api_router
 from bbj_rag.health import router as health_router
 from bbj_rag.mcp_server import mcp
+from bbj_rag.metrics import MetricsMiddleware
+from bbj_rag.metrics import router as metrics_router
+from bbj_rag.ratelimit import RateLimitMiddleware
+
+if TYPE_CHECKING:
+    from ollama import AsyncClient as OllamaAsyncClient
+    from psycopg_pool import AsyncConnectionPool
+
+    from bbj_rag.config import Settings
+    from bbj_rag.health import HealthMonitor
 
 _STATIC_DIR = Path(__file__).resolve().parent / "static"
 
+_WARM_UP_PHASES = ("identifier_index", "synonym_map", "embedding_warmup")
+
+startup_logger = logging.getLogger("bbj_rag.startup")
+
+
+async def _warm_up(
+    app: FastAPI,
+    pool: AsyncConnectionPool[Any],
+    ollama_client: OllamaAsyncClient,
+    settings: Settings,
+    monitor: HealthMonitor,
+) -> None:
+    """Load in-memory indexes and warm up the embedding model.
+
+    Runs after startup; until it finishes /suggest completes from an
+    empty index and /search runs without synonym expansion.
+    """
+    from bbj_rag.identifiers import load_identifier_index
+    from bbj_rag.intelligence.synonyms import load_synonym_map
+
+    # Load the identifier index for /suggest (empty index on failure)
+    try:
+        async with pool.connection() as conn:
+            app.state.identifier_index = await load_identifier_index(conn)
+        monitor.finish_phase("identifier_index")
+    except Exception as exc:
+        startup_logger.warning("Identifier index load failed (non-fatal)")
+        monitor.finish_phase("identifier_index", f"error: {exc}")
+
+    # Load the query synonym map for keyword expansion (empty on failure)
+    try:
+        async with pool.connection() as conn:
+            app.state.synonym_map = await load_synonym_map(conn)
+        monitor.finish_phase("synonym_map")
+    except Exception as exc:
+        startup_logger.warning("Synonym map load failed (non-fatal)")
+        monitor.finish_phase("synonym_map", f"error: {exc}")
+
+    # Warm up the embedding model (loads it into Ollama memory).  Bounded,
+    # so a hung Ollama cannot hold readiness at 503 forever.
+    try:
+        await asyncio.wait_for(
+            ollama_client.embed(model=settings.embedding_model, input="warm-up"),
+            settings.warmup_timeout,
+        )
+        startup_logger.info("Embedding model warmed up: %s", settings.embedding_model)
+        monitor.finish_phase("embedding_warmup")
+    except TimeoutError:
+        startup_logger.warning(
+            "Embedding warm-up timed out after %.0fs (non-fatal)",
+            settings.warmup_timeout,
+        )
+        monitor.finish_phase(
+            "embedding_warmup", f"error: timed out after {settings.warmup_timeout:.1f}s"
+        )
+    except Exception as exc:
+        startup_logger.warning("Embedding warm-up failed (non-fatal)")
+        monitor.finish_phase("embedding_warmup", f"error: {exc}")
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncIterator[None]:
     """Run startup tasks: validate env, log config, apply schema, init pool."""
     # Imports inside lifespan to avoid circular imports and keep module
     # importable without side effects (important for testing).
+    import httpx
+    import psycopg
+    from anthropic import AsyncAnthropic, DefaultAsyncHttpxClient
     from ollama import AsyncClient as OllamaAsyncClient
-    from pgvector.psycopg import register_vector_async  # type: ignore[import-untyped]
     from psycopg_pool import AsyncConnectionPool
 
+    from bbj_rag.chat.answer_cache import AnswerCache
+    from bbj_rag.compiler import (
+        CompilerPool,
+        ValidationCache,
+        set_default_pool,
+        set_validation_cache,
+    )
     from bbj_rag.config import Settings
-    from bbj_rag.db import get_connection_from_settings
-    from bbj_rag.schema import apply_schema
+    from bbj_rag.db import async_register_vector_types
+    from bbj_rag.health import HealthMonitor
+    from bbj_rag.identifiers import IdentifierIndex
+    from bbj_rag.intelligence.corpus_stats import StatsCache
+    from bbj_rag.intelligence.synonyms import SynonymMap
+    from bbj_rag.query_embedder import QueryEmbedder
+    from bbj_rag.ratelimit import from_settings as rate_limits_from_settings
+    from bbj_rag.ratelimit import trusted_networks
+    from bbj_rag.schema import async_apply_schema
     from bbj_rag.startup import log_startup_summary, validate_environment
 
     logging.basicConfig(level=logging.INFO, format="%(message)s")
-    startup_logger = logging.getLogger("bbj_rag.startup")
 
     validate_environment()
     settings = Settings()
     log_startup_summary(settings)
 
-    # Apply schema idempotently (sync connection, used once)
-    conn = get_connection_from_settings(settings)
-    try:
-        apply_schema(conn)
-        startup_logger.info("Schema applied successfully")
-    finally:
-        conn.close()
-
-    # Build async connection pool with pgvector type registration
     conninfo = (
         f"host={settings.db_host} port={settings.db_port} "
         f"dbname={settings.db_name} user={settings.db_user} "
         f"password={settings.db_password}"
     )
+
+    # Apply schema unless already current.  Uses its own connection: the
+    # pool's configure hook needs the vector type the schema creates.
+    async with await psycopg.AsyncConnection.connect(conninfo) as conn:
+        if await async_apply_schema(conn):
+            startup_logger.info("Schema applied successfully")
+        else:
+            startup_logger.info("Schema up to date, apply skipped")
+
+    # Build async connection pool with pgvector type registration
+    # (grows toward max_size while checkouts queue, shrinks after max_idle;
+    # under `bbj-rag serve` each worker gets its share of the DB budget)
+    pool_min, pool_max = settings.db_pool_limits
     pool = AsyncConnectionPool(
         conninfo=conninfo,
-        min_size=2,
-        max_size=5,
+        min_size=pool_min,
+        max_size=pool_max,
+        timeout=settings.db_pool_timeout,
+        max_idle=settings.db_pool_max_idle,
         open=False,
-        configure=register_vector_async,
+        configure=async_register_vector_types,
     )
     await pool.open()
-    startup_logger.info("Async connection pool opened (min=2, max=5)")
+    startup_logger.info(
+        "Async connection pool opened (pid=%d, min=%d, max=%d, timeout=%.1fs)",
+        os.getpid(),
+        pool_min,
+        pool_max,
+        settings.db_pool_timeout,
+    )
 
-    # Create Ollama async client and warm up embedding model
-    ollama_client = OllamaAsyncClient()
-    try:
-        await ollama_client.embed(model=settings.embedding_model, input="warm-up")
-        startup_logger.info("Embedding model warmed up: %s", settings.embedding_model)
-    except Exception:
-        startup_logger.warning("Embedding warm-up failed (non-fatal)")
+    # Batched compiler pool for chat and MCP code validation
+    compiler_pool = CompilerPool(
+        settings.compiler_path,
+        workers=settings.compiler_workers,
+        batch_size=settings.compiler_batch_size,
+        queue_size=settings.compiler_queue_size,
+        timeout=settings.compiler_timeout,
+        work_dir=settings.compiler_work_dir or None,
+    )
+    await compiler_pool.start()
+    set_default_pool(compiler_pool)
+    set_validation_cache(
+        ValidationCache(
+            settings.compiler_cache_size,
+            settings.compiler_cache_dir,
+            settings.compiler_cache_disk_size,
+        )
+        if settings.compiler_cache_size > 0
+        else None
+    )
+
+    ollama_client = OllamaAsyncClient(host=settings.ollama_host)
+
+    # Request-path embeddings: concurrency limit, bounded queue, batching
+    query_embedder = QueryEmbedder(
+        ollama_client,
+        settings.embedding_model,
+        max_concurrency=settings.embed_max_concurrency,
+        max_queue=settings.embed_queue_size,
+        max_batch=settings.embed_max_batch,
+        batch_window=settings.embed_batch_window,
+        timeout=settings.embed_timeout,
+    )
+    await query_embedder.start()
+
+    # Shared Anthropic client: one keep-alive connection pool for all
+    # chat requests instead of a new client and TLS handshake per message
+    anthropic_client = AsyncAnthropic(
+        base_url=settings.chat_api_base_url or None,
+        http_client=DefaultAsyncHttpxClient(
+            limits=httpx.Limits(
+                max_connections=settings.chat_http_max_connections,
+                max_keepalive_connections=settings.chat_http_max_keepalive,
+                keepalive_expiry=settings.chat_http_keepalive_expiry,
+            )
+        ),
+    )
+
+    # Background health probes reuse the pool and the Ollama client
+    health_monitor = HealthMonitor(
+        pool,
+        ollama_client,
+        compiler_path=settings.compiler_path,
+        interval=settings.health_interval,
+        timeout=settings.health_timeout,
+    )
+    health_monitor.begin_phases(*_WARM_UP_PHASES)
+    await health_monitor.start()
 
     # Store shared state for dependency injection
     app.state.pool = pool
     app.state.settings = settings
     app.state.ollama_client = ollama_client
+    app.state.query_embedder = query_embedder
+    app.state.anthropic_client = anthropic_client
+    app.state.health_monitor = health_monitor
+    app.state.answer_cache = (
+        AnswerCache(settings.chat_answer_cache_ttl, settings.chat_answer_cache_size)
+        if settings.chat_answer_cache_ttl > 0
+        else None
+    )
+    app.state.identifier_index = IdentifierIndex()
+    app.state.synonym_map = SynonymMap()
+    app.state.stats_cache = StatsCache(settings.stats_cache_ttl)
+    app.state.rate_limits = rate_limits_from_settings(settings)
+    app.state.rate_limit_trusted = trusted_networks(settings)
+
+    warm_up = asyncio.create_task(
+        _warm_up(app, pool, ollama_client, settings, health_monitor),
+        name="startup-warm-up",
+    )
 
     # MCP session manager context wraps yield (required for Streamable HTTP)
     async with mcp.session_manager.run():
         yield
 
-    # Shutdown: close pool connections
+    # Shutdown: stop warm-up and probes, close API clients, stop compiler
+    # workers, close pool
+    warm_up.cancel()
+    await asyncio.gather(warm_up, return_exceptions=True)
+    await health_monitor.close()
+    await query_embedder.close()
+    await anthropic_client.close()
+    set_default_pool(None)
+    await compiler_pool.close()
     await pool.close()
     startup_logger.info("Async connection pool closed")
 
 
 app = FastAPI(title="BBJ RAG", lifespan=lifespan)
+# Metrics wraps the rate limiter, so rejected (429) requests are counted
+app.add_middleware(RateLimitMiddleware)
+app.add_middleware(MetricsMiddleware)
 app.include_router(health_router)
+app.include_router(metrics_router)
 app.include_router(api_router)
 app.include_router(chat_router)
 
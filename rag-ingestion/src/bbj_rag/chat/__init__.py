@@ -1,9 +1,12 @@
 """Chat module: RAG-grounded system prompts and Claude API streaming."""
 
-from bbj_rag.chat.prompt import build_rag_system_prompt
+from bbj_rag.chat.context import pack_context
+from bbj_rag.chat.history import build_retrieval_query, compact_history
+from bbj_rag.chat.prompt import build_cached_prompt, build_rag_system_prompt
 from bbj_rag.chat.stream import stream_chat_response
 from bbj_rag.chat.validation import (
     CodeBlock,
+    CodeFenceSplitter,
     build_fix_prompt,
     extract_code_blocks,
     replace_code_block,
@@ -12,9 +15,14 @@ from bbj_rag.chat.validation import (
 
 __all__ = [
     "CodeBlock",
+    "CodeFenceSplitter",
+    "build_cached_prompt",
     "build_fix_prompt",
     "build_rag_system_prompt",
+    "build_retrieval_query",
+    "compact_history",
     "extract_code_blocks",
+    "pack_context",
     "replace_code_block",
     "stream_chat_response",
     "validate_code_blocks",
@@ -0,0 +1,174 @@
+"""Server-side cache of validated chat answers for repeated questions.
+
+Support traffic repeats the same first-turn questions many times a day.
+Each one runs embed, search, Claude and bbjcpl validation, but only the
+last two are expensive.  ``AnswerCache`` stores the complete SSE event
+sequence of a successful, fully validated single-turn answer and
+replays it when the same question retrieves the same chunks again.
+
+Cache keys combine the normalised question, the ids of the chunks that
+were sent as context, the chat model and the corpus version.  The corpus
+version lives in the ``corpus_meta`` table and is bumped after every
+ingest (``bump_corpus_version()``), so new documentation invalidates all
+cached answers; the API reads it per cached request, which is a single
+primary-key lookup on a connection the request already holds.  Entries
+also expire after ``Settings.chat_answer_cache_ttl`` seconds.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import re
+import time
+import uuid
+from collections import OrderedDict
+from collections.abc import AsyncIterator, Sequence
+from typing import Any
+
+import psycopg
+
+from bbj_rag.fastjson import dumps
+
+logger = logging.getLogger(__name__)
+
+CORPUS_VERSION_KEY = "corpus_version"
+
+_TRAILING_PUNCT_RE = re.compile(r"[\s?!.]+$")
+
+
+def normalize_question(text: str) -> str:
+    """Lowercase, collapse whitespace and drop trailing punctuation."""
+    return _TRAILING_PUNCT_RE.sub("", " ".join(text.lower().split()))
+
+
+def bump_corpus_version(conn: psycopg.Connection[Any]) -> str:
+    """Record a new corpus version after the chunks table changed."""
+    version = uuid.uuid4().hex
+    with conn.cursor() as cur:
+        cur.execute(
+            "INSERT INTO corpus_meta (key, value) VALUES (%s, %s) "
+            "ON CONFLICT (key) DO UPDATE "
+            "SET value = EXCLUDED.value, updated_at = now()",
+            (CORPUS_VERSION_KEY, version),
+        )
+    conn.commit()
+    logger.info("Corpus version bumped: %s", version)
+    return version
+
+
+async def load_corpus_version(conn: psycopg.AsyncConnection[Any]) -> str:
+    """Return the current corpus version ("" before the first bump)."""
+    async with conn.cursor() as cur:
+        await cur.execute(
+            "SELECT value FROM corpus_meta WHERE key = %s", (CORPUS_VERSION_KEY,)
+        )
+        row = await cur.fetchone()
+    return str(row[0]) if row else ""
+
+
+class AnswerCache:
+    """TTL + LRU cache of replayable chat SSE event sequences.
+
+    Usage::
+
+        key = cache.key(question, [r.id for r in results], model, version)
+        events = cache.get(key)
+        if events is None:
+            stream = cache.record(key, stream_chat_response(...))
+    """
+
+    def __init__(self, ttl: float, max_entries: int = 512) -> None:
+        self.ttl = ttl
+        self.max_entries = max(1, max_entries)
+        self._entries: OrderedDict[str, tuple[float, list[dict[str, Any]]]] = (
+            OrderedDict()
+        )
+        self._corpus_version: str | None = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def key(
+        question: str,
+        chunk_ids: Sequence[int],
+        model: str,
+        corpus_version: str,
+    ) -> str:
+        payload = json.dumps(
+            [normalize_question(question), list(chunk_ids), model, corpus_version]
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def sync_corpus_version(self, version: str) -> None:
+        """Drop every entry when the corpus version changed."""
+        if self._corpus_version is not None and version != self._corpus_version:
+            logger.info("Corpus changed, clearing %d cached answers", len(self))
+            self._entries.clear()
+        self._corpus_version = version
+
+    def get(self, key: str) -> list[dict[str, Any]] | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires, events = entry
+        if expires < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return events
+
+    def put(self, key: str, events: list[dict[str, Any]]) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl, events)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    async def record(
+        self, key: str, events: AsyncIterator[dict[str, Any]]
+    ) -> AsyncIterator[dict[str, Any]]:
+        """Pass *events* through, storing them if the answer completed.
+
+        Responses that end in an ``error`` event, or are cut off before
+        ``done``, are not stored.  Neither are answers that carry a
+        ``validation_warning`` or whose ``done`` event reports
+        ``unverified_blocks`` (code bbjcpl was unavailable for or timed
+        out on): a later request may validate them.
+        """
+        seen: list[dict[str, Any]] = []
+        warned = False
+        async for event in events:
+            seen.append(event)
+            warned = warned or event.get("event") == "validation_warning"
+            yield event
+        if warned or not seen or seen[-1].get("event") != "done":
+            return
+        if json.loads(seen[-1]["data"]).get("unverified_blocks", 0):
+            return
+        self.put(key, seen)
+
+
+async def replay(events: list[dict[str, Any]]) -> AsyncIterator[dict[str, Any]]:
+    """Yield a cached event sequence, marking ``done`` as a cache hit."""
+    for event in events:
+        if event.get("event") == "done":
+            data = json.loads(event["data"])
+            data["cached"] = True
+            yield {"event": "done", "data": dumps(data)}
+        else:
+            yield event
+
+
+__all__ = [
+    "CORPUS_VERSION_KEY",
+    "AnswerCache",
+    "bump_corpus_version",
+    "load_corpus_version",
+    "normalize_question",
+    "replay",
+]
@@ -0,0 +1,177 @@
+"""Token-budgeted packing of search results into chat context.
+
+The chat endpoint retrieves more candidates than it needs and lets
+``pack_context()`` decide what reaches Claude:
+
+1. Chunks from the same ``source_url`` whose content is contained in a
+   higher-ranked chunk are dropped.
+2. Adjacent sub-chunks of one document (consecutive ids) are merged into
+   one source, removing the overlap the chunker repeats between them.
+3. Sources are added in score order while they fit the token budget.  A
+   source that does not fit is trimmed to the remaining budget at a
+   line boundary when enough budget is left, otherwise dropped.  The
+   top source is always kept, if need be as a prefix of its first line.
+
+Token counts use the chunker's words / 0.75 approximation, so the budget
+is an estimate, not an exact count.
+"""
+
+from __future__ import annotations
+
+from dataclasses import replace
+
+from bbj_rag.search import SearchResult
+
+# Minimum remaining budget worth filling with a trimmed source
+_MIN_TRIM_TOKENS = 120
+
+# Per-source overhead for the "[Source N: ...] / URL / Type" header
+_HEADER_TOKENS = 20
+
+# Overlap search: the next chunk's first characters looked up in the
+# previous chunk's tail
+_OVERLAP_PROBE = 40
+
+_TRIM_MARKER = "\n[...]"
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count: word count / 0.75 (same as the chunker)."""
+    return int(len(text.split()) / 0.75)
+
+
+def _source_tokens(result: SearchResult) -> int:
+    return (
+        _HEADER_TOKENS
+        + estimate_tokens(result.context_header)
+        + estimate_tokens(result.content)
+    )
+
+
+def _join_overlapping(first: str, second: str) -> str:
+    """Concatenate chunk texts, dropping the prefix *second* repeats."""
+    probe = second[:_OVERLAP_PROBE]
+    if probe:
+        start = first.find(probe, max(0, len(first) - len(second)))
+        while start != -1:
+            if second.startswith(first[start:]):
+                return first[:start] + second
+            start = first.find(probe, start + 1)
+    return f"{first}\n\n{second}"
+
+
+def _merge_adjacent(results: list[SearchResult]) -> list[SearchResult]:
+    """Merge runs of consecutive-id chunks from the same source_url.
+
+    The merged source keeps the first chunk's id and metadata and the
+    best score of the run; it is ranked where its best chunk was.
+    """
+    by_url: dict[str, list[SearchResult]] = {}
+    for result in results:
+        by_url.setdefault(result.source_url, []).append(result)
+
+    rank = {id(r): i for i, r in enumerate(results)}
+    merged: list[tuple[int, SearchResult]] = []
+    for group in by_url.values():
+        group.sort(key=lambda r: r.id)
+        run = [group[0]]
+        for result in group[1:]:
+            if result.id == run[-1].id + 1:
+                run.append(result)
+                continue
+            merged.append(_merge_run(run, rank))
+            run = [result]
+        merged.append(_merge_run(run, rank))
+    merged.sort(key=lambda item: item[0])
+    return [result for _, result in merged]
+
+
+def _merge_run(
+    run: list[SearchResult], rank: dict[int, int]
+) -> tuple[int, SearchResult]:
+    best = min(rank[id(r)] for r in run)
+    if len(run) == 1:
+        return best, run[0]
+    content = run[0].content
+    for result in run[1:]:
+        content = _join_overlapping(content, result.content)
+    return best, replace(run[0], content=content, score=max(r.score for r in run))
+
+
+def _drop_contained(results: list[SearchResult]) -> list[SearchResult]:
+    """Drop chunks whose text already appears in a better same-url chunk."""
+    kept: list[SearchResult] = []
+    for result in results:
+        text = result.content.strip()
+        if any(k.source_url == result.source_url and text in k.content for k in kept):
+            continue
+        kept.append(result)
+    return kept
+
+
+def _trim(result: SearchResult, budget: int) -> SearchResult:
+    """Cut *result* at a line boundary so it fits *budget* tokens.
+
+    When not even the first line fits, it is cut at a word boundary
+    instead, keeping at least one word, so a trimmed source is never
+    empty.
+    """
+    remaining = budget - _HEADER_TOKENS - estimate_tokens(result.context_header)
+    kept: list[str] = []
+    used = 0
+    for line in result.content.splitlines():
+        cost = estimate_tokens(line)
+        if used + cost > remaining:
+            if not "\n".join(kept).strip() and line.strip():
+                words = max(1, int(max(remaining - used, 0) * 0.75))
+                kept.append(" ".join(line.split()[:words]))
+            break
+        kept.append(line)
+        used += cost
+    text = "\n".join(kept).rstrip()
+    if text.count("```") % 2:
+        text += "\n```"
+    return replace(result, content=text + _TRIM_MARKER)
+
+
+def pack_context(
+    results: list[SearchResult],
+    token_budget: int,
+    max_sources: int | None = None,
+) -> list[SearchResult]:
+    """Select, merge and trim *results* to fit *token_budget*.
+
+    Parameters
+    ----------
+    results:
+        Ranked candidates, best first.
+    token_budget:
+        Approximate token budget for all reference material.
+    max_sources:
+        Optional cap on the number of sources returned.
+
+    Returns
+    -------
+    list[SearchResult]
+        Sources in rank order.  The top source is always included
+        (trimmed if needed) so a small budget never yields no context.
+    """
+    candidates = _merge_adjacent(_drop_contained(results))
+    packed: list[SearchResult] = []
+    remaining = token_budget
+    for result in candidates:
+        if max_sources is not None and len(packed) >= max_sources:
+            break
+        cost = _source_tokens(result)
+        if cost <= remaining:
+            packed.append(result)
+            remaining -= cost
+        elif not packed or remaining >= _MIN_TRIM_TOKENS:
+            trimmed = _trim(result, max(remaining, _MIN_TRIM_TOKENS))
+            if trimmed.content.strip() != _TRIM_MARKER.strip():
+                packed.append(trimmed)
+                remaining -= _source_tokens(trimmed)
+    return packed
+
+
+__all__ = ["estimate_tokens", "pack_context"]
@@ -0,0 +1,264 @@
+"""Conversation-aware retrieval queries and rolling history summaries.
+
+Two problems with sending the raw conversation around:
+
+- Retrieval embedded only the latest message, so follow-ups such as
+  "and how do I close it?" searched for "close it".
+  ``build_retrieval_query()`` turns such a follow-up into a standalone
+  query by carrying over the previous question and the API identifiers
+  from the last answer.  With ``Settings.chat_condense_model`` set,
+  ``condense_query()`` asks that (small) model to rewrite the query
+  instead, under a latency budget, and falls back to the heuristic.
+- Claude received the whole ``chat_max_history`` window every turn.
+  ``compact_history()`` keeps the most recent turns verbatim (at most
+  ``chat_max_history`` messages) and folds all older ones into an
+  extractive summary (question plus the first sentence of each answer)
+  that is prepended to the first kept turn.
+
+The summary is deterministic and older turns are folded in blocks, so
+the compacted prefix stays byte-identical across several turns and
+remains a prompt-cache hit (see ``chat.prompt.build_cached_prompt``).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import re
+
+from anthropic import AsyncAnthropic
+
+from bbj_rag.config import Settings
+
+logger = logging.getLogger(__name__)
+
+# Leading words that mark a message as a continuation of the last turn
+_FOLLOW_UP_RE = re.compile(
+    r"^\s*(and|also|but|so|then|ok|okay|what about|how about|same for)\b",
+    re.IGNORECASE,
+)
+
+# Pronouns that may point back at the previous turn ("that" is left out:
+# it is far more often a conjunction, as in "make sure that ...")
+_ANAPHORA = frozenset({"it", "its", "this", "these", "those", "them", "they"})
+
+# Function words that carry no topic of their own
+_STOPWORDS = frozenset(
+    {
+        "a", "an", "the", "and", "or", "of", "to", "in", "on", "at", "for",
+        "with", "by", "from", "as", "into", "is", "are", "was", "were", "be",
+        "been", "do", "does", "did", "can", "could", "should", "would", "will",
+        "i", "me", "my", "we", "you", "your", "how", "what", "which", "who",
+        "why", "when", "where", "there", "that", "one", "if", "not", "no",
+        "please", "show", "tell", "example", "get", "use",
+    }
+)  # fmt: skip
+
+# A message with a pronoun still names its own topic with this many
+# content words (or any API identifier)
+_MIN_TOPIC_WORDS = 3
+
+# Messages shorter than this (in words) are follow-ups unless they name
+# a topic (two content words or an API identifier)
+_SHORT_QUERY_WORDS = 6
+
+# API names worth carrying into the next query: BBj classes, camelCase
+# methods, and upper-case keywords (SETERR, PRINT)
+_IDENTIFIER_RE = re.compile(r"\b(?:BBj[A-Z]\w*|[a-z]+[A-Z]\w*|[A-Z]{3,}[A-Z0-9$]*)\b")
+
+_MAX_CARRIED_IDENTIFIERS = 5
+_MAX_QUERY_WORDS = 60
+
+# History folded into the summary in blocks of this many messages, so
+# the compacted prefix only changes every few turns
+_SUMMARY_BLOCK = 4
+_MAX_SUMMARY_LINES = 20
+_SUMMARY_ANSWER_CHARS = 160
+
+_FENCE_RE = re.compile(r"```.*?(?:```|$)", re.DOTALL)
+
+_CONDENSE_PROMPT = (
+    "Rewrite the user's last message as a standalone search query for the "
+    "BBj documentation. Resolve pronouns using the conversation. Reply with "
+    "the query only, no quotes or explanation.\n\n"
+)
+
+
+def _words(text: str) -> list[str]:
+    return re.findall(r"[\w$']+", text.lower())
+
+
+def is_follow_up(text: str) -> bool:
+    """Heuristically decide whether *text* depends on earlier turns.
+
+    Continuation openers ("and ...", "what about ...") always count.
+    Otherwise a message that names an API identifier, or enough content
+    words, is a new topic even when it contains a pronoun; only
+    pronoun-led or very short messages without a topic are follow-ups.
+    """
+    words = _words(text)
+    if not words:
+        return False
+    if _FOLLOW_UP_RE.match(text):
+        return True
+    if _IDENTIFIER_RE.search(text):
+        return False
+    content = [w for w in words if w not in _STOPWORDS and w not in _ANAPHORA]
+    if any(w in _ANAPHORA for w in words):
+        return len(content) < _MIN_TOPIC_WORDS
+    return len(words) < _SHORT_QUERY_WORDS and len(content) < 2
+
+
+def _identifiers(text: str) -> list[str]:
+    found: dict[str, None] = {}
+    for match in _IDENTIFIER_RE.finditer(text):
+        found.setdefault(match.group(0), None)
+        if len(found) >= _MAX_CARRIED_IDENTIFIERS:
+            break
+    return list(found)
+
+
+def build_retrieval_query(messages: list[dict[str, str]]) -> str:
+    """Return a standalone search query for the latest user message.
+
+    Standalone messages are returned unchanged.  Follow-ups are prefixed
+    with the previous user question and identifiers from the previous
+    assistant answer, capped at ``_MAX_QUERY_WORDS`` words.
+    """
+    if not messages:
+        return ""
+    latest = messages[-1]["content"]
+    if len(messages) < 2 or not is_follow_up(latest):
+        return latest
+
+    previous_question = ""
+    previous_answer = ""
+    for message in reversed(messages[:-1]):
+        if message["role"] == "assistant" and not previous_answer:
+            previous_answer = message["content"]
+        elif message["role"] == "user":
+            previous_question = message["content"]
+            break
+
+    carried = [
+        ident
+        for ident in _identifiers(previous_answer)
+        if ident.lower() not in previous_question.lower()
+        and ident.lower() not in latest.lower()
+    ]
+    parts = [previous_question, " ".join(carried), latest]
+    words = " ".join(p for p in parts if p).split()
+    return " ".join(words[-_MAX_QUERY_WORDS:])
+
+
+async def condense_query(
+    messages: list[dict[str, str]],
+    settings: Settings,
+    client: AsyncAnthropic | None = None,
+) -> str:
+    """Return a standalone retrieval query, optionally via a small model.
+
+    Uses ``settings.chat_condense_model`` for follow-ups when it is set,
+    bounded by ``settings.chat_condense_timeout`` seconds.  Timeouts and
+    API errors fall back to ``build_retrieval_query()``.
+    """
+    heuristic = build_retrieval_query(messages)
+    if (
+        not settings.chat_condense_model
+        or len(messages) < 2
+        or not is_follow_up(messages[-1]["content"])
+    ):
+        return heuristic
+
+    transcript = "\n".join(
+        f"{m['role']}: {_FENCE_RE.sub('[code]', m['content'])[:600]}"
+        for m in messages[-5:]
+    )
+    client = client or AsyncAnthropic()
+    try:
+        response = await asyncio.wait_for(
+            client.messages.create(
+                model=settings.chat_condense_model,
+                max_tokens=64,
+                messages=[{"role": "user", "content": _CONDENSE_PROMPT + transcript}],
+            ),
+            timeout=settings.chat_condense_timeout,
+        )
+    except Exception as exc:
+        logger.info("Query condensation fell back to heuristic: %s", exc)
+        return heuristic
+
+    text = "".join(getattr(block, "text", "") for block in response.content).strip()
+    return text.strip('"') or heuristic
+
+
+def _first_sentence(text: str) -> str:
+    text = " ".join(_FENCE_RE.sub(" ", text).split())
+    match = re.search(r"^.+?[.!?](?=\s|$)", text)
+    sentence = match.group(0) if match else text
+    if len(sentence) > _SUMMARY_ANSWER_CHARS:
+        sentence = sentence[: _SUMMARY_ANSWER_CHARS - 3].rstrip() + "..."
+    return sentence
+
+
+def summarize_turns(messages: list[dict[str, str]]) -> str:
+    """Extractive summary: one line per question/answer exchange."""
+    lines: list[str] = []
+    question = ""
+    for message in messages:
+        if message["role"] == "user":
+            if question:
+                lines.append(f"- Asked: {question}")
+            question = " ".join(message["content"].split())[:200]
+        else:
+            answer = _first_sentence(message["content"])
+            idents = _identifiers(message["content"])
+            line = f"- Asked: {question} -> {answer}" if question else f"- {answer}"
+            if idents:
+                line += f" [{', '.join(idents)}]"
+            lines.append(line)
+            question = ""
+    if question:
+        lines.append(f"- Asked: {question}")
+    return "\n".join(lines[-_MAX_SUMMARY_LINES:])
+
+
+def compact_history(
+    messages: list[dict[str, str]],
+    keep_messages: int,
+) -> list[dict[str, str]]:
+    """Keep recent turns verbatim and fold older ones into a summary.
+
+    The kept window always starts with a user message.  Older messages
+    are folded in blocks of ``_SUMMARY_BLOCK``, so the result only
+    changes shape every few turns.  The summary is prepended to the first
+    kept message inside ``<conversation_summary>`` tags.
+    """
+    overflow = len(messages) - max(1, keep_messages)
+    if overflow <= 0:
+        return [dict(m) for m in messages]
+
+    cut = -(-overflow // _SUMMARY_BLOCK) * _SUMMARY_BLOCK
+    cut = min(cut, len(messages) - 1)
+    while cut < len(messages) - 1 and messages[cut]["role"] != "user":
+        cut += 1
+
+    summary = summarize_turns(messages[:cut])
+    kept = [dict(m) for m in messages[cut:]]
+    if summary:
+        kept[0]["content"] = (
+            "<conversation_summary>\n"
+            f"{summary}\n"
+            "</conversation_summary>\n\n"
+            f"{kept[0]['content']}"
+        )
+    return kept
+
+
+__all__ = [
+    "build_retrieval_query",
+    "compact_history",
+    "condense_query",
+    "is_follow_up",
+    "summarize_turns",
+]
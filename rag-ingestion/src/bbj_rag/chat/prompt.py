@@ -1,14 +1,85 @@
 """System prompt construction with RAG context and citation instructions.
 
-Builds a grounded system prompt that instructs Claude to answer using
-only the provided reference material, citing sources inline with
+Builds a grounded prompt that instructs Claude to answer using only the
+provided reference material, citing sources inline with
 [Source N](url) markdown link notation.
+
+For prompt caching the prompt is split in two: the instructions are a
+static system block that is byte-identical on every request, and the
+per-query reference material travels in the latest user message.
+``build_cached_prompt()`` places cache breakpoints on the system block
+and on the end of the conversation history, so follow-up turns re-read
+both from Anthropic's prompt cache instead of processing them again.
+``build_rag_system_prompt()`` still returns the single-string layout.
 """
 
 from __future__ import annotations
 
+from dataclasses import dataclass
+from typing import cast
+
+from anthropic.types import MessageParam, TextBlockParam
+
 from bbj_rag.search import SearchResult
 
+_ROLE = (
+    "You are a BBj programming assistant embedded in the official "
+    "BBj documentation site."
+)
+
+_CITATIONS = (
+    "Cite sources inline using markdown links with descriptive text. "
+    "Use the source title or a natural phrase as the link text, like: "
+    '"see the [BBjWindow documentation](url)" or "as described in '
+    '[Creating Windows in BBj](url)". Do NOT use generic text like '
+    '"Source 1" or "click here". For each claim, cite the 1-3 most '
+    "relevant sources with their URLs from the reference material."
+)
+
+_LOW_CONFIDENCE = (
+    "Note: Limited reference material was found for this query. "
+    "Indicate this to the user and be transparent about what you "
+    "can and cannot confirm from the available sources."
+)
+
+_FORMATTING = (
+    "Format your response using Markdown. Use ```bbj for BBj code "
+    "blocks. Keep answers focused and practical."
+)
+
+_NO_RESULTS = (
+    "No reference material was found for this query. "
+    "Let the user know you could not find relevant documentation."
+)
+
+# Static instructions for the cached layout.  Must not depend on the
+# query: any byte change invalidates the cached prefix.
+STATIC_SYSTEM_PROMPT = "\n\n".join(
+    [
+        _ROLE,
+        "Each user question is preceded by <reference_material> for that "
+        "question. Answer using ONLY that reference material. " + _CITATIONS,
+        _FORMATTING,
+    ]
+)
+
+_EPHEMERAL = {"type": "ephemeral"}
+
+
+def _format_sources(results: list[SearchResult]) -> str:
+    context_blocks: list[str] = []
+    for i, r in enumerate(results, 1):
+        url = r.display_url or r.source_url
+        source_type = r.source_type or "Documentation"
+        block = f"[Source {i}: {r.title}]\n"
+        block += f"URL: {url}\n"
+        block += f"Type: {source_type}\n"
+        if r.context_header:
+            block += f"Context: {r.context_header}\n"
+        block += f"\n{r.content}"
+        context_blocks.append(block)
+    return "\n---\n".join(context_blocks)
+
 
 def build_rag_system_prompt(
     results: list[SearchResult],
@@ -29,59 +100,124 @@ def build_rag_system_prompt(
     str
         The assembled system prompt string.
     """
+    sections: list[str] = [
+        _ROLE,
+        "Answer questions using ONLY the reference material provided below. "
+        + _CITATIONS,
+    ]
+    if low_confidence:
+        sections.append(_LOW_CONFIDENCE)
+    sections.append(_FORMATTING)
+    if results:
+        sections.append(f"Reference Material:\n{_format_sources(results)}")
+    else:
+        sections.append(_NO_RESULTS)
+    return "\n\n".join(sections)
+
+
+def build_reference_context(
+    results: list[SearchResult],
+    low_confidence: bool = False,
+) -> str:
+    """Build the per-query reference block sent with the user message."""
     sections: list[str] = []
+    if low_confidence:
+        sections.append(_LOW_CONFIDENCE)
+    sections.append(_format_sources(results) if results else _NO_RESULTS)
+    body = "\n\n".join(sections)
+    return f"<reference_material>\n{body}\n</reference_material>"
 
-    # Role
-    sections.append(
-        "You are a BBj programming assistant embedded in the official "
-        "BBj documentation site."
-    )
 
-    # Citation instructions
-    sections.append(
-        "Answer questions using ONLY the reference material provided below. "
-        "Cite sources inline using markdown links with descriptive text. "
-        "Use the source title or a natural phrase as the link text, like: "
-        '"see the [BBjWindow documentation](url)" or "as described in '
-        '[Creating Windows in BBj](url)". Do NOT use generic text like '
-        '"Source 1" or "click here". For each claim, cite the 1-3 most '
-        "relevant sources with their URLs from the reference material."
-    )
+@dataclass
+class CachedPrompt:
+    """Anthropic request parts laid out for prompt caching.
 
-    # Low confidence caveat
-    if low_confidence:
-        sections.append(
-            "Note: Limited reference material was found for this query. "
-            "Indicate this to the user and be transparent about what you "
-            "can and cannot confirm from the available sources."
-        )
+    Attributes:
+        system: The static system block, marked as a cache breakpoint.
+        messages: History with a breakpoint on its last turn, followed
+            by the latest user message carrying the reference material.
+    """
+
+    system: list[TextBlockParam]
+    messages: list[MessageParam]
+
+
+def build_cached_prompt(
+    messages: list[dict[str, str]],
+    results: list[SearchResult],
+    low_confidence: bool = False,
+) -> CachedPrompt:
+    """Lay out a chat request as a cacheable prefix plus variable context.
+
+    Parameters
+    ----------
+    messages:
+        Conversation as role/content dicts; the last one is the user's
+        current question.
+    results:
+        Ranked search results for the current question.
+    low_confidence:
+        Whether RAG results indicate low confidence.
 
-    # Formatting instructions
-    sections.append(
-        "Format your response using Markdown. Use ```bbj for BBj code "
-        "blocks. Keep answers focused and practical."
+    Returns
+    -------
+    CachedPrompt
+        Uses two of the four breakpoints Anthropic allows: one after the
+        system block and one after the history.  The reference material
+        is only ever attached to the newest message, so earlier turns
+        stay byte-identical and the history prefix is a cache hit on
+        the next turn.
+    """
+    system = cast(
+        list[TextBlockParam],
+        [{"type": "text", "text": STATIC_SYSTEM_PROMPT, "cache_control": _EPHEMERAL}],
     )
+    history = [dict(m) for m in messages[:-1]]
+    latest = messages[-1] if messages else {"role": "user", "content": ""}
 
-    # Reference material
-    if results:
-        context_blocks: list[str] = []
-        for i, r in enumerate(results, 1):
-            url = r.display_url or r.source_url
-            source_type = r.source_type or "Documentation"
-            block = f"[Source {i}: {r.title}]\n"
-            block += f"URL: {url}\n"
-            block += f"Type: {source_type}\n"
-            if r.context_header:
-                block += f"Context: {r.context_header}\n"
-            block += f"\n{r.content}"
-            context_blocks.append(block)
-
-        context_text = "\n---\n".join(context_blocks)
-        sections.append(f"Reference Material:\n{context_text}")
-    else:
-        sections.append(
-            "No reference material was found for this query. "
-            "Let the user know you could not find relevant documentation."
+    out: list[MessageParam] = []
+    for i, message in enumerate(history):
+        if i == len(history) - 1:
+            out.append(
+                cast(
+                    MessageParam,
+                    {
+                        "role": message["role"],
+                        "content": [
+                            {
+                                "type": "text",
+                                "text": message["content"],
+                                "cache_control": _EPHEMERAL,
+                            }
+                        ],
+                    },
+                )
+            )
+        else:
+            out.append(cast(MessageParam, message))
+
+    out.append(
+        cast(
+            MessageParam,
+            {
+                "role": latest["role"],
+                "content": [
+                    {
+                        "type": "text",
+                        "text": build_reference_context(results, low_confidence),
+                    },
+                    {"type": "text", "text": latest["content"]},
+                ],
+            },
         )
+    )
+    return CachedPrompt(system=system, messages=out)
 
-    return "\n\n".join(sections)
+
+__all__ = [
+    "STATIC_SYSTEM_PROMPT",
+    "CachedPrompt",
+    "build_cached_prompt",
+    "build_rag_system_prompt",
+    "build_reference_context",
+]
@@ -2,69 +2,50 @@
 
 Provides an async generator that streams Claude API responses as
 dict events compatible with sse-starlette's EventSourceResponse.
-Events: sources, validation_warning, delta, done, error.
-
-BBj code blocks are validated via bbjcpl before streaming. Invalid
-code triggers automatic fix attempts (up to 3 total). Persistently
-invalid code is shown with a validation_warning event.
+Events: sources, validation_warning, delta, done, error.  Event data is
+encoded with ``fastjson.dumps()`` (orjson when installed).
+
+Prose is forwarded as soon as Claude produces it.  BBj code blocks are
+held back until their closing fence arrives, validated via bbjcpl, and
+emitted only then.  Independent blocks are validated and fixed
+concurrently (bounded by ``Settings.chat_validation_concurrency``) while
+the rest of the response keeps streaming; output order is preserved.
+Invalid code triggers automatic fix attempts (up to 3 total) and the
+fixed block replaces the original.  Persistently invalid code is shown
+with a validation_warning event.  Blocks the compiler could not check
+(unavailable or timed out) are counted in ``done``'s
+``unverified_blocks``, so such answers are never cached as validated.
 """
 
 from __future__ import annotations
 
 import asyncio
-import json
 import logging
 import re
-from collections.abc import AsyncIterator, Iterator
-from typing import Any, cast
+import time
+from collections.abc import AsyncIterator
+from typing import Any
 
 from anthropic import AsyncAnthropic
-from anthropic.types import MessageParam
+from anthropic.types import MessageParam, TextBlockParam
 
-from bbj_rag.chat.prompt import build_rag_system_prompt
+from bbj_rag.chat.history import compact_history
+from bbj_rag.chat.prompt import build_cached_prompt
 from bbj_rag.chat.validation import (
+    CodeFenceSplitter,
+    FenceSegment,
     build_fix_prompt,
-    extract_code_blocks,
-    replace_code_block,
-    validate_code_blocks,
 )
+from bbj_rag.compiler import validate_bbj_syntax
 from bbj_rag.config import Settings
+from bbj_rag.fastjson import dumps
+from bbj_rag.metrics import record_stage, stage_timer
 from bbj_rag.search import SearchResult
 
 logger = logging.getLogger(__name__)
 
-
-async def _get_claude_response(
-    client: AsyncAnthropic,
-    settings: Settings,
-    system_prompt: str,
-    messages: list[MessageParam],
-) -> tuple[str, int, int]:
-    """Get a complete Claude response (non-streaming).
-
-    Args:
-        client: Anthropic API client
-        settings: Application settings
-        system_prompt: System prompt for the request
-        messages: Conversation messages
-
-    Returns:
-        Tuple of (response_text, input_tokens, output_tokens)
-    """
-    response = await client.messages.create(
-        model=settings.chat_model,
-        max_tokens=settings.chat_max_tokens,
-        system=system_prompt,
-        messages=messages,
-    )
-
-    # Extract text content
-    text = ""
-    for block in response.content:
-        if hasattr(block, "text"):
-            text += block.text
-
-    return text, response.usage.input_tokens, response.usage.output_tokens
+# Events for one output slot, and whether its code was verified
+_SlotEvents = tuple[list[dict[str, Any]], bool]
 
 
 async def _get_fix_from_claude(
@@ -109,152 +90,107 @@ async def _get_fix_from_claude(
     return fixed.strip()
 
 
-async def _validate_response_code(
+def _fence(language: str | None, code: str) -> str:
+    """Wrap *code* in a fence, keeping the closing fence on its own line."""
+    if not code.endswith("\n"):
+        code += "\n"
+    return f"```{language or ''}\n{code}```"
+
+
+async def _validate_block(
     client: AsyncAnthropic,
     settings: Settings,
-    response: str,
+    segment: FenceSegment,
     max_attempts: int = 3,
-) -> tuple[str, list[dict[str, Any]]]:
-    """Validate BBj code blocks and attempt fixes.
+) -> tuple[str, dict[str, Any] | None, bool]:
+    """Validate one streamed BBj code block and attempt fixes.
 
-    Extracts BBj code blocks, validates each via bbjcpl, and asks
-    Claude to fix any with errors. Continues until valid or max
-    attempts reached.
+    Validates the block via bbjcpl and asks Claude to fix it while it
+    has errors, up to *max_attempts* validations in total.
 
     Args:
         client: Anthropic API client
         settings: Application settings
-        response: The full response text containing code blocks
-        max_attempts: Maximum validation+fix attempts per block
+        segment: Completed fence segment whose ``block`` is BBj code
+        max_attempts: Maximum validation+fix attempts for the block
 
     Returns:
-        Tuple of (final_response, warnings_list)
-        warnings_list contains dicts for blocks that couldn't be fixed
+        Tuple of (fenced_text, warning, verified).  ``fenced_text``
+        carries the fixed code when a fix validated, otherwise the
+        original block.  ``warning`` is None unless the block could not
+        be validated.  ``verified`` is False when the compiler could not
+        give a verdict on the emitted code (unavailable or timed out).
+        Segments without a code block are returned unchanged.
     """
-    warnings: list[dict[str, Any]] = []
-    current_response = response
-
-    # Track offset adjustments when blocks are replaced
-    # (replacement may change block length)
-    blocks = extract_code_blocks(current_response)
-    bbj_blocks = [b for b in blocks if b.is_bbj]
-
-    if not bbj_blocks:
-        # No BBj code to validate
-        return current_response, warnings
-
-    # Validate all BBj blocks
-    await validate_code_blocks(bbj_blocks)
-
-    # Process each block, attempting fixes for invalid ones
-    for block_index, block in enumerate(bbj_blocks):
-        result = block.validation_result
-
-        # Skip if validation was unavailable or timed out (add warning but continue)
-        if result is None:
-            continue
-
-        if result.unavailable:
-            logger.debug("bbjcpl unavailable, skipping validation")
-            continue
-
-        if result.timed_out:
-            warnings.append(
-                {
-                    "code_index": block_index + 1,
-                    "errors": "Validation timed out",
-                    "code_preview": block.code[:50],
-                }
-            )
-            continue
-
-        # If valid, nothing to do
-        if result.valid:
-            continue
-
-        # Invalid code - attempt fixes
-        current_code = block.code
-        current_errors = result.errors
-
-        while block.attempts < max_attempts and not result.valid:
-            logger.info(
-                f"BBj validation failed (attempt {block.attempts}/{max_attempts}), "
-                f"requesting fix"
-            )
-
-            # Ask Claude to fix the code
-            try:
-                fixed_code = await _get_fix_from_claude(
-                    client, settings, current_code, current_errors
-                )
-            except Exception as exc:
-                logger.warning(f"Fix request failed: {exc}")
-                break
-
-            # Re-validate the fixed code
-            from bbj_rag.compiler import validate_bbj_syntax
-
-            result = await validate_bbj_syntax(fixed_code)
-            block.attempts += 1
-            block.validation_result = result
+    block = segment.block
+    if block is None:
+        return segment.text, None, True
+
+    result = await validate_bbj_syntax(block.code)
+    block.attempts += 1
+    block.validation_result = result
+
+    if result.unavailable:
+        logger.debug("bbjcpl unavailable, skipping validation")
+        return segment.text, None, False
+
+    if result.timed_out:
+        warning = {
+            "code_index": segment.code_index,
+            "errors": "Validation timed out",
+            "code_preview": block.code[:50],
+        }
+        return segment.text, warning, False
+
+    original_errors = result.errors
+    current_code = block.code
+    while not result.valid and block.attempts < max_attempts:
+        logger.info(
+            f"BBj validation failed (attempt {block.attempts}/{max_attempts}), "
+            f"requesting fix"
+        )
 
-            if result.valid:
-                # Fix worked - replace in response
-                current_response = replace_code_block(
-                    current_response, block, fixed_code
-                )
-                # Re-extract blocks to update positions after replacement
-                blocks = extract_code_blocks(current_response)
-                bbj_blocks = [b for b in blocks if b.is_bbj]
-                # Update the block reference for subsequent iterations
-                if block_index < len(bbj_blocks):
-                    block = bbj_blocks[block_index]
-                break
-            else:
-                current_code = fixed_code
-                current_errors = result.errors
-
-        # If still invalid after max attempts, add warning
-        if not result.valid and not result.unavailable and not result.timed_out:
-            warnings.append(
-                {
-                    "code_index": block_index + 1,
-                    "errors": result.errors,
-                    "code_preview": current_code[:50],
-                }
+        # Ask Claude to fix the code
+        try:
+            fixed_code = await _get_fix_from_claude(
+                client, settings, current_code, result.errors
             )
+        except Exception as exc:
+            logger.warning(f"Fix request failed: {exc}")
+            break
 
-    return current_response, warnings
-
+        # Re-validate the fixed code
+        result = await validate_bbj_syntax(fixed_code)
+        block.attempts += 1
+        block.validation_result = result
+        current_code = fixed_code
 
-def _split_into_chunks(text: str, chunk_size: int = 50) -> Iterator[str]:
-    """Split text into chunks for simulated streaming.
-
-    Prefers splitting at word boundaries when possible.
-
-    Args:
-        text: Text to split
-        chunk_size: Target chunk size in characters
-
-    Yields:
-        Text chunks
-    """
-    if not text:
-        return
-
-    pos = 0
-    while pos < len(text):
-        end = min(pos + chunk_size, len(text))
-
-        # If not at end, try to split at word boundary
-        if end < len(text):
-            # Look for last space in chunk
-            space_pos = text.rfind(" ", pos, end)
-            if space_pos > pos:
-                end = space_pos + 1  # Include the space
-
-        yield text[pos:end]
-        pos = end
+        if result.valid:
+            return _fence(block.language, fixed_code), None, True
+        if result.unavailable or result.timed_out:
+            break  # no errors to hand back to Claude
+
+    if result.valid:
+        return segment.text, None, True
+    if result.unavailable or result.timed_out:
+        # The fix could not be checked: keep the original, which is known
+        # to be invalid, and report its errors
+        warning = {
+            "code_index": segment.code_index,
+            "errors": original_errors,
+            "code_preview": block.code[:50],
+        }
+        return segment.text, warning, False
+    # Still invalid after max attempts
+    return (
+        segment.text,
+        {
+            "code_index": segment.code_index,
+            "errors": result.errors,
+            "code_preview": current_code[:50],
+        },
+        True,
+    )
 
 
 async def stream_chat_response(
@@ -262,21 +198,27 @@ async def stream_chat_response(
     search_results: list[SearchResult],
     settings: Settings,
     low_confidence: bool,
+    client: AsyncAnthropic | None = None,
 ) -> AsyncIterator[dict[str, Any]]:
     """Stream a Claude chat response as SSE event dicts.
 
-    BBj code blocks are validated via bbjcpl before streaming.
-    Invalid code triggers automatic fix attempts (up to 3 total).
+    Prose is streamed token by token.  BBj code blocks are buffered
+    until they close, validated via bbjcpl, and fixed (up to 3 attempts
+    in total) before they are emitted.
 
     Yields dicts with ``event`` and ``data`` keys suitable for
     sse-starlette's ``EventSourceResponse``.
 
     Event sequence:
     1. ``sources`` -- metadata about RAG results used for context
-    2. ``validation_warning`` (0 or more) -- errors for unfixable code
-    3. ``delta`` (repeated) -- incremental text chunks
-    4. ``done`` -- token usage summary
-    5. ``error`` (on failure) -- error message
+    2. ``delta`` (repeated) -- incremental text chunks, interleaved with
+       ``validation_warning`` events for code that could not be verified
+       (``code_index`` counts all fenced blocks in the response, 1-based)
+    3. ``done`` -- token usage summary, including prompt-cache write
+       (``cache_creation_input_tokens``) and read
+       (``cache_read_input_tokens``) counts, plus ``unverified_blocks``:
+       BBj blocks the compiler could not check
+    4. ``error`` (on failure) -- error message
 
     Parameters
     ----------
@@ -288,14 +230,20 @@ async def stream_chat_response(
         Application settings (model name, max tokens, etc.).
     low_confidence:
         Whether RAG results indicate low confidence.
+    client:
+        Shared Anthropic client (``app.state.anthropic_client``).  A
+        new client is created when omitted.
     """
-    client = AsyncAnthropic()
-
-    # Build system prompt from RAG results
-    system_prompt = build_rag_system_prompt(search_results, low_confidence)
-
-    # Truncate messages to sliding window and cast to SDK type
-    truncated = cast(list[MessageParam], messages[-settings.chat_max_history :])
+    client = client or AsyncAnthropic()
+
+    # All older turns fold into a summary (chat_max_history only bounds
+    # the verbatim part); the static system block is cached and RAG
+    # context rides on the last message
+    history = compact_history(
+        messages,
+        min(settings.chat_history_keep_messages, settings.chat_max_history),
+    )
+    prompt = build_cached_prompt(history, search_results, low_confidence)
 
     # Build sources metadata
     sources_list = [
@@ -310,45 +258,130 @@ async def stream_chat_response(
     ]
 
     try:
-        # Phase 1: Get complete response for validation
-        initial_response, input_tokens, output_tokens = await _get_claude_response(
-            client, settings, system_prompt, truncated
-        )
-
-        # Phase 2: Validate and fix BBj code blocks
-        validated_response, warnings = await _validate_response_code(
-            client, settings, initial_response, max_attempts=3
+        # Sources are known before generation starts
+        yield {"event": "sources", "data": dumps(sources_list)}
+
+        # The producer consumes Claude's stream and queues one slot per
+        # segment; BBj blocks are validated in background tasks so later
+        # blocks compile while earlier ones are still being fixed.  Slots
+        # are drained in order, so output order matches generation order.
+        slots: asyncio.Queue[asyncio.Future[_SlotEvents] | None] = asyncio.Queue()
+        semaphore = asyncio.Semaphore(settings.chat_validation_concurrency)
+        producer = asyncio.create_task(
+            _produce_segments(
+                client, settings, prompt.system, prompt.messages, slots, semaphore
+            )
         )
+        unverified = 0
+        try:
+            while (slot := await slots.get()) is not None:
+                events, verified = await slot
+                unverified += not verified
+                for event in events:
+                    yield event
+            usage = await producer
+        finally:
+            if not producer.done():
+                producer.cancel()
+            while not slots.empty():
+                pending = slots.get_nowait()
+                if pending is not None:
+                    pending.cancel()
 
-        # Phase 3: Emit sources
-        yield {"event": "sources", "data": json.dumps(sources_list)}
-
-        # Phase 4: Emit validation warnings (if any)
-        for warning in warnings:
-            yield {
-                "event": "validation_warning",
-                "data": json.dumps(warning),
-            }
-
-        # Phase 5: Stream the validated response as deltas (simulated streaming)
-        for chunk in _split_into_chunks(validated_response, chunk_size=50):
-            yield {"event": "delta", "data": json.dumps({"text": chunk})}
-            await asyncio.sleep(0.01)  # Small delay for streaming feel
-
-        # Phase 6: Done
         yield {
             "event": "done",
-            "data": json.dumps(
-                {
-                    "input_tokens": input_tokens,
-                    "output_tokens": output_tokens,
-                }
-            ),
+            "data": dumps({**usage, "unverified_blocks": unverified}),
         }
 
     except Exception as exc:
         logger.exception("Chat stream error")
         yield {
             "event": "error",
-            "data": json.dumps({"message": str(exc)}),
+            "data": dumps({"message": str(exc)}),
         }
+
+
+async def _produce_segments(
+    client: AsyncAnthropic,
+    settings: Settings,
+    system: list[TextBlockParam],
+    messages: list[MessageParam],
+    slots: asyncio.Queue[asyncio.Future[_SlotEvents] | None],
+    semaphore: asyncio.Semaphore,
+) -> dict[str, int]:
+    """Stream Claude's response into *slots* and return token usage.
+
+    Prose segments are queued as already-resolved futures; BBj code
+    segments are queued as tasks that validate (and fix) the block under
+    *semaphore*.  A terminating ``None`` is always queued, even on error.
+    """
+    loop = asyncio.get_running_loop()
+
+    def schedule(segment: FenceSegment) -> None:
+        if segment.block is None:
+            ready: asyncio.Future[_SlotEvents] = loop.create_future()
+            ready.set_result(([_delta(segment.text)], True))
+            slots.put_nowait(ready)
+        else:
+            slots.put_nowait(
+                asyncio.ensure_future(
+                    _validated_events(client, settings, segment, semaphore)
+                )
+            )
+
+    splitter = CodeFenceSplitter()
+    start = time.perf_counter()
+    first_token = True
+    try:
+        async with client.messages.stream(
+            model=settings.chat_model,
+            max_tokens=settings.chat_max_tokens,
+            system=system,
+            messages=messages,
+        ) as stream:
+            async for text in stream.text_stream:
+                if first_token:
+                    record_stage("claude_ttft", time.perf_counter() - start)
+                    first_token = False
+                for segment in splitter.feed(text):
+                    schedule(segment)
+            for segment in splitter.flush():
+                schedule(segment)
+            final = await stream.get_final_message()
+        record_stage("claude", time.perf_counter() - start)
+    finally:
+        slots.put_nowait(None)
+
+    usage = final.usage
+    return {
+        "input_tokens": usage.input_tokens,
+        "output_tokens": usage.output_tokens,
+        "cache_creation_input_tokens": usage.cache_creation_input_tokens or 0,
+        "cache_read_input_tokens": usage.cache_read_input_tokens or 0,
+    }
+
+
+def _delta(text: str) -> dict[str, Any]:
+    return {"event": "delta", "data": dumps({"text": text})}
+
+
+async def _validated_events(
+    client: AsyncAnthropic,
+    settings: Settings,
+    segment: FenceSegment,
+    semaphore: asyncio.Semaphore,
+) -> _SlotEvents:
+    """Validate one BBj block and return its events and verified flag.
+
+    A warning, if any, precedes the block's delta.
+    """
+    async with semaphore:
+        with stage_timer("validate"):
+            text, warning, verified = await _validate_block(
+                client, settings, segment, max_attempts=3
+            )
+    events: list[dict[str, Any]] = []
+    if warning is not None:
+        events.append({"event": "validation_warning", "data": dumps(warning)})
+    events.append(_delta(text))
+    return events, verified
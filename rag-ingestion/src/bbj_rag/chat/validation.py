@@ -2,10 +2,16 @@
 
 Extracts fenced code blocks from chat responses, validates BBj code
 via bbjcpl, and provides fix prompt generation for automatic repair.
+
+``CodeFenceSplitter`` does the same extraction incrementally over a
+token stream: prose and non-BBj code pass straight through, while
+BBj (and untagged) fences are held back until they close so they can
+be validated and fixed before the client sees them.
 """
 
 from __future__ import annotations
 
+import asyncio
 import re
 from dataclasses import dataclass, field
 
@@ -44,6 +50,15 @@ _CODE_BLOCK_PATTERN = re.compile(
 )
 
 
+def _is_bbj_block(language_tag: str | None, code: str) -> bool:
+    """Return True if a fence with *language_tag* holds BBj code."""
+    if language_tag:
+        # Explicit BBj/BASIC tag
+        return language_tag.lower() in ("bbj", "basic")
+    # No tag or empty tag - use heuristic detection
+    return detect_bbj_code(code)
+
+
 def extract_code_blocks(text: str) -> list[CodeBlock]:
     """Extract all fenced code blocks from text.
 
@@ -65,22 +80,13 @@ def extract_code_blocks(text: str) -> list[CodeBlock]:
         start_pos = match.start()
         end_pos = match.end()
 
-        # Determine if this is BBj code
-        if language_tag:
-            language_lower = language_tag.lower()
-            # Explicit BBj/BASIC tag
-            is_bbj = language_lower in ("bbj", "basic")
-        else:
-            # No tag or empty tag - use heuristic detection
-            is_bbj = detect_bbj_code(code)
-
         blocks.append(
             CodeBlock(
                 code=code,
                 language=language_tag,
                 start_pos=start_pos,
                 end_pos=end_pos,
-                is_bbj=is_bbj,
+                is_bbj=_is_bbj_block(language_tag, code),
             )
         )
 
@@ -90,28 +96,169 @@ def extract_code_blocks(text: str) -> list[CodeBlock]:
 async def validate_code_blocks(
     blocks: list[CodeBlock],
     timeout: float = 10.0,
+    concurrency: int = 4,
 ) -> list[CodeBlock]:
     """Validate BBj code blocks via bbjcpl.
 
     Only validates blocks where is_bbj is True. Stores results
     in each block's validation_result field and increments attempts.
+    Blocks are compiled concurrently, at most *concurrency* at a time,
+    so total latency follows the slowest block rather than the sum.
 
     Args:
         blocks: List of CodeBlock objects to validate
         timeout: Timeout per validation call in seconds
+        concurrency: Maximum number of simultaneous compiler runs
 
     Returns:
         The same list with validation_result populated for BBj blocks
     """
-    for block in blocks:
-        if block.is_bbj:
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def validate(block: CodeBlock) -> None:
+        async with semaphore:
             result = await validate_bbj_syntax(block.code, timeout)
-            block.validation_result = result
-            block.attempts += 1
+        block.validation_result = result
+        block.attempts += 1
 
+    await asyncio.gather(*(validate(b) for b in blocks if b.is_bbj))
     return blocks
 
 
+_FENCE = "```"
+_LANGUAGE_TAG_PATTERN = re.compile(r"\w*")
+
+
+@dataclass
+class FenceSegment:
+    """A piece of streamed text ready to be emitted.
+
+    Attributes:
+        text: Raw text to forward (the whole fenced block for code)
+        block: The completed BBj code block awaiting validation, or None
+            for prose and for code that needs no validation
+        code_index: 1-based position of the block among all fenced
+            blocks in the response (0 for prose)
+    """
+
+    text: str
+    block: CodeBlock | None = None
+    code_index: int = 0
+
+
+class CodeFenceSplitter:
+    """Split a streamed response into prose and complete code fences.
+
+    Feed text deltas as they arrive; each call returns the segments that
+    can be emitted so far.  Prose is released immediately except for a
+    trailing run of backticks that might start a fence.  Fences tagged
+    with a non-BBj language stream through as prose.  BBj-tagged and
+    untagged fences are buffered until the closing fence and returned as
+    a single segment, with ``block`` set when the code is BBj.
+
+    Fence recognition mirrors ``extract_code_blocks``: a fence opens with
+    three backticks, an optional word-character language tag and a newline, and
+    closes at the next three backticks.
+
+    Usage::
+
+        splitter = CodeFenceSplitter()
+        for delta in deltas:
+            for segment in splitter.feed(delta):
+                ...
+        for segment in splitter.flush():
+            ...
+    """
+
+    def __init__(self) -> None:
+        self._buf = ""
+        self._state = "prose"  # prose | header | buffered | passthrough
+        self._pos = 0  # offset of _buf[0] in the full response
+        self._header_end = 0
+        self._language: str | None = None
+        self.code_blocks = 0
+
+    def feed(self, text: str) -> list[FenceSegment]:
+        """Consume *text* and return the segments that are now complete."""
+        self._buf += text
+        segments: list[FenceSegment] = []
+        while self._step(segments):
+            pass
+        return [s for s in segments if s.text]
+
+    def flush(self) -> list[FenceSegment]:
+        """Return everything still buffered (unclosed fences stay raw)."""
+        text, self._buf = self._buf, ""
+        self._pos += len(text)
+        self._state = "prose"
+        return [FenceSegment(text)] if text else []
+
+    def _take(self, length: int) -> str:
+        text, self._buf = self._buf[:length], self._buf[length:]
+        self._pos += length
+        return text
+
+    def _releasable(self) -> int:
+        """Length of the buffer prefix that cannot start a fence."""
+        stripped = self._buf.rstrip("`")
+        return len(stripped) if len(self._buf) - len(stripped) < 3 else 0
+
+    def _step(self, segments: list[FenceSegment]) -> bool:
+        """Advance the state machine once; return True to keep going."""
+        if self._state in ("prose", "passthrough"):
+            idx = self._buf.find(_FENCE)
+            if idx < 0:
+                segments.append(FenceSegment(self._take(self._releasable())))
+                return False
+            if self._state == "passthrough":
+                segments.append(FenceSegment(self._take(idx + len(_FENCE))))
+                self._state = "prose"
+                return True
+            segments.append(FenceSegment(self._take(idx)))
+            self._state = "header"
+            return True
+
+        if self._state == "header":
+            newline = self._buf.find("\n", len(_FENCE))
+            if newline < 0:
+                return False
+            tag = self._buf[len(_FENCE) : newline]
+            if not _LANGUAGE_TAG_PATTERN.fullmatch(tag):
+                # Not a fence opener (e.g. inline backticks); emit as prose.
+                segments.append(FenceSegment(self._take(len(_FENCE))))
+                self._state = "prose"
+                return True
+            self.code_blocks += 1
+            self._language = tag or None
+            if tag and tag.lower() not in ("bbj", "basic"):
+                segments.append(FenceSegment(self._take(newline + 1)))
+                self._state = "passthrough"
+                return True
+            self._header_end = newline + 1
+            self._state = "buffered"
+            return True
+
+        # buffered: wait for the closing fence
+        close = self._buf.find(_FENCE, self._header_end)
+        if close < 0:
+            return False
+        start_pos = self._pos
+        code = self._buf[self._header_end : close]
+        raw = self._take(close + len(_FENCE))
+        self._state = "prose"
+        block = None
+        if _is_bbj_block(self._language, code):
+            block = CodeBlock(
+                code=code,
+                language=self._language,
+                start_pos=start_pos,
+                end_pos=start_pos + len(raw),
+                is_bbj=True,
+            )
+        segments.append(FenceSegment(raw, block, self.code_blocks))
+        return True
+
+
 def build_fix_prompt(code: str, errors: str) -> str:
     """Build a prompt asking Claude to fix BBj syntax errors.
 
@@ -1,7 +1,10 @@
 """Click CLI entry point for the BBj RAG ingestion pipeline.
 
 Provides commands for full pipeline execution (ingest), parse-only
-debugging (parse), and search validation (validate, placeholder).
+debugging (parse), search validation (validate, placeholder),
+golden-set search quality/latency evaluation (evaluate), bulk
+compilation of corpus BBj code blocks (validate-code), and the
+multi-worker API launcher (serve).
 """
 
 from __future__ import annotations
@@ -101,11 +104,38 @@ def ingest(source: str, resume: bool, batch_size: int) -> None:
             f"  Chunks stored:    {stats['chunks_stored']}"
         )
 
-        # Auto-print quality report after successful ingestion
+        # Recompute /stats counters, then print the quality report from them.
+        # Non-fatal like the synonym refresh: /stats keeps the previous
+        # counters, and the version bump below must run.
+        from bbj_rag.intelligence.corpus_stats import refresh_corpus_stats
         from bbj_rag.intelligence.report import print_quality_report
 
-        click.echo()  # blank line separator
-        print_quality_report(conn)
+        try:
+            refresh_corpus_stats(conn)
+        except Exception as exc:
+            conn.rollback()
+            logger.exception("Corpus statistics refresh failed")
+            click.echo(f"WARNING: Corpus statistics refresh failed: {exc}", err=True)
+        else:
+            click.echo()  # blank line separator
+            print_quality_report(conn)
+
+        # Rebuild the query synonym dictionary from the new corpus (non-fatal;
+        # the API keeps the previous map)
+        from bbj_rag.intelligence.synonyms import refresh_synonyms
+
+        try:
+            count = refresh_synonyms(conn)
+            click.echo(f"\nQuery synonyms refreshed: {count} terms")
+        except Exception as exc:
+            conn.rollback()
+            logger.exception("Synonym refresh failed")
+            click.echo(f"WARNING: Query synonym refresh failed: {exc}", err=True)
+
+        # Invalidate cached chat answers built from the previous corpus
+        from bbj_rag.chat.answer_cache import bump_corpus_version
+
+        bump_corpus_version(conn)
     except Exception as exc:
         logger.exception("Pipeline failed")
         # Check for common Ollama errors.
@@ -149,9 +179,15 @@ def parse(source: str) -> None:
 
 
 @cli.command()
-def report() -> None:
+@click.option(
+    "--refresh",
+    is_flag=True,
+    help="Recompute the stored corpus statistics before reporting",
+)
+def report(refresh: bool) -> None:
     """Show post-ingestion quality report."""
     from bbj_rag.db import get_connection
+    from bbj_rag.intelligence.corpus_stats import refresh_corpus_stats
     from bbj_rag.intelligence.report import print_quality_report
 
     settings = Settings()
@@ -165,6 +201,8 @@ def report() -> None:
         )
         sys.exit(1)
     try:
+        if refresh:
+            refresh_corpus_stats(conn)
         print_quality_report(conn)
     finally:
         conn.close()
@@ -200,6 +238,277 @@ def validate(val_verbose: bool) -> None:
     sys.exit(result.returncode)
 
 
+@cli.command()
+@click.option(
+    "--golden",
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+    default=None,
+    help="Golden query set (default: tests/golden_queries.yaml)",
+)
+@click.option(
+    "--mode",
+    "modes",
+    type=click.Choice(["dense", "bm25", "hybrid", "hybrid_rerank"]),
+    multiple=True,
+    help="Retrieval mode to evaluate (repeatable; default: all)",
+)
+@click.option("-k", "k", default=5, type=int, help="Cutoff rank for metrics")
+@click.option(
+    "--repeat",
+    default=3,
+    type=int,
+    help="Runs per query and mode; the fastest is kept for latency",
+)
+@click.option(
+    "--fixture",
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+    default=None,
+    help="Restore this pg_dump (.sql or -Fc archive) before evaluating",
+)
+@click.option(
+    "--baseline",
+    type=click.Path(dir_okay=False, path_type=Path),
+    default=None,
+    help="Baseline report JSON to diff against",
+)
+@click.option(
+    "--write-baseline",
+    is_flag=True,
+    help="Overwrite --baseline with this run's report",
+)
+@click.option(
+    "--output",
+    type=click.Path(dir_okay=False, path_type=Path),
+    default=None,
+    help="Write this run's report JSON here",
+)
+def evaluate(
+    golden: Path | None,
+    modes: tuple[str, ...],
+    k: int,
+    repeat: int,
+    fixture: Path | None,
+    baseline: Path | None,
+    write_baseline: bool,
+    output: Path | None,
+) -> None:
+    """Score search quality and latency against the golden query set."""
+    import json
+    import subprocess
+
+    from bbj_rag.db import get_connection
+    from bbj_rag.embedder import create_embedder
+    from bbj_rag.evaluation import (
+        DEFAULT_GOLDEN_PATH,
+        MODES,
+        diff_reports,
+        format_report,
+        load_golden_set,
+        restore_fixture,
+        run_evaluation,
+    )
+
+    if write_baseline and baseline is None:
+        _fatal("Error: --write-baseline requires --baseline PATH.")
+
+    settings = Settings()
+    golden_set = load_golden_set(golden or DEFAULT_GOLDEN_PATH)
+
+    if fixture is not None:
+        try:
+            restore_fixture(settings.database_url, fixture)
+        except (OSError, subprocess.CalledProcessError) as exc:
+            _fatal(f"Fixture restore failed: {exc}")
+
+    try:
+        conn = get_connection(settings.database_url)
+    except Exception as exc:
+        safe_url = _mask_password(settings.database_url)
+        _fatal(f"Database connection failed: {exc}\nURL: {safe_url}")
+
+    try:
+        report_data = run_evaluation(
+            conn,
+            create_embedder(settings),
+            golden_set,
+            k=k,
+            modes=modes or MODES,
+            repeat=repeat,
+        )
+    finally:
+        conn.close()
+
+    click.echo(format_report(report_data))
+    if output is not None:
+        output.write_text(json.dumps(report_data, indent=2) + "\n")
+
+    if baseline is None:
+        return
+    if write_baseline:
+        baseline.write_text(json.dumps(report_data, indent=2) + "\n")
+        click.echo(f"\nBaseline written to {baseline}")
+        return
+    if not baseline.is_file():
+        _fatal(f"Error: baseline not found: {baseline}")
+
+    regressions, changes = diff_reports(json.loads(baseline.read_text()), report_data)
+    click.echo(f"\nChanges vs {baseline}:")
+    for line in changes or ["(none)"]:
+        click.echo(f"  {line}")
+    if regressions:
+        click.echo("\nRegressions:", err=True)
+        for line in regressions:
+            click.echo(f"  {line}", err=True)
+        sys.exit(1)
+
+
+@cli.command("validate-code")
+@click.option(
+    "--training-data",
+    "training_data",
+    type=click.Path(file_okay=False, path_type=Path),
+    default=None,
+    help="Training-data directory (default: the repo's training-data/)",
+)
+@click.option(
+    "--chunks/--no-chunks",
+    default=True,
+    help="Also check code blocks in the chunks table",
+)
+@click.option(
+    "--output",
+    type=click.Path(dir_okay=False, path_type=Path),
+    default=Path("code-validation.jsonl"),
+    show_default=True,
+    help="Per-block status table (JSON lines)",
+)
+@click.option(
+    "--workers",
+    default=4,
+    type=int,
+    help="Concurrent bbjcpl processes",
+)
+@click.option(
+    "--fail-on-invalid",
+    is_flag=True,
+    help="Exit 1 when any block fails to compile",
+)
+def validate_code(
+    training_data: Path | None,
+    chunks: bool,
+    output: Path,
+    workers: int,
+    fail_on_invalid: bool,
+) -> None:
+    """Compile every BBj code block in training-data and ingested chunks."""
+    import itertools
+    from collections.abc import Iterable
+
+    from bbj_rag.compiler import CompilerPool
+    from bbj_rag.corpus_validation import (
+        STATUSES,
+        iter_chunk_blocks,
+        iter_markdown_blocks,
+        run_corpus_validation,
+    )
+    from bbj_rag.db import get_connection
+
+    settings = Settings()
+    root = training_data or Path(__file__).resolve().parents[3] / "training-data"
+    sources: list[Iterable[tuple[str, str]]] = []
+    if root.is_dir():
+        sources.append(iter_markdown_blocks(root))
+    elif training_data is not None:
+        _fatal(f"Error: training-data directory not found: {root}")
+
+    conn = None
+    if chunks:
+        try:
+            conn = get_connection(settings.database_url)
+        except Exception as exc:
+            safe_url = _mask_password(settings.database_url)
+            _fatal(f"Database connection failed: {exc}\nURL: {safe_url}")
+        sources.append(iter_chunk_blocks(conn))
+
+    pool = CompilerPool(
+        settings.compiler_path,
+        workers=workers,
+        batch_size=settings.compiler_batch_size,
+        queue_size=settings.compiler_queue_size,
+        timeout=settings.compiler_timeout,
+        work_dir=settings.compiler_work_dir or None,
+    )
+    try:
+        samples, counts, elapsed = run_corpus_validation(
+            itertools.chain.from_iterable(sources), pool, output
+        )
+    finally:
+        if conn is not None:
+            conn.close()
+
+    click.echo(f"Unique BBj code blocks: {len(samples)} ({elapsed:.1f}s)")
+    for status in STATUSES:
+        click.echo(f"  {status:<12} {counts[status]}")
+    click.echo(f"Report written to {output}")
+
+    if counts["unavailable"] == len(samples) and samples:
+        click.echo("Warning: bbjcpl not found; nothing was compiled.", err=True)
+    if fail_on_invalid and counts["invalid"]:
+        sys.exit(1)
+
+
+@cli.command()
+@click.option("--host", default="0.0.0.0", help="Bind address")
+@click.option("--port", default=8000, type=int, help="Bind port")
+@click.option(
+    "--workers",
+    type=int,
+    default=None,
+    help="Worker processes (default: BBJ_RAG_WORKERS; 0 = one per CPU core)",
+)
+@click.option(
+    "--graceful-timeout",
+    default=30,
+    type=int,
+    help="Seconds a stopping worker may spend finishing in-flight requests",
+)
+def serve(host: str, port: int, workers: int | None, graceful_timeout: int) -> None:
+    """Serve the REST API, chat and MCP endpoints with uvicorn workers.
+
+    With more than one worker, SIGHUP replaces the workers one at a time
+    (zero-downtime reload, e.g. after an ingest), and SIGTTIN / SIGTTOU
+    add or remove a worker.
+    """
+    import os
+
+    import uvicorn
+
+    settings = Settings() if workers is None else Settings(workers=workers)
+    count = settings.worker_count
+    # Workers build their own Settings; pin the resolved count so every
+    # worker derives the same share of the connection budget
+    os.environ["BBJ_RAG_WORKERS"] = str(count)
+    pool_min, pool_max = settings.db_pool_limits
+    if settings.db_max_connections and settings.db_max_connections < count:
+        click.echo(
+            f"Warning: BBJ_RAG_DB_MAX_CONNECTIONS={settings.db_max_connections} "
+            f"is below the worker count; each worker still opens 1 connection.",
+            err=True,
+        )
+    click.echo(
+        f"Starting {count} worker(s) on {host}:{port} "
+        f"(DB pool per worker: min={pool_min}, max={pool_max}; "
+        f"total max={pool_max * count})"
+    )
+    uvicorn.run(
+        "bbj_rag.app:app",
+        host=host,
+        port=port,
+        workers=count,
+        timeout_graceful_shutdown=graceful_timeout,
+    )
+
+
 def _create_parser(source: str, settings: Settings) -> DocumentParser:
     """Create a DocumentParser for the given source.
 
@@ -7,17 +7,37 @@ BBj code snippets in chat responses.
 Key functions:
 - detect_bbj_code(): Heuristic detection of BBj code vs other languages
 - validate_bbj_syntax(): Async validation via bbjcpl subprocess
+- CompilerPool: Long-lived workers that batch many snippets into one
+  bbjcpl invocation (installed by the API lifespan via set_default_pool)
+- ValidationCache: LRU of results keyed by normalised code hash and
+  compiler fingerprint, consulted by validate_bbj_syntax()
+
+bbjcpl has no daemon or stdin mode, so the per-call cost is process
+startup.  The pool amortises it by compiling every queued snippet in a
+single ``bbjcpl -N a.bbj b.bbj ...`` run and attributing the
+``filename: error at line NN`` stderr lines back to their snippets.
 """
 
 from __future__ import annotations
 
 import asyncio
+import contextlib
+import functools
+import hashlib
+import itertools
+import json
+import logging
 import os
 import re
+import shutil
 import tempfile
+import threading
+from collections import OrderedDict
 from dataclasses import dataclass
 from pathlib import Path
 
+logger = logging.getLogger(__name__)
+
 
 @dataclass
 class ValidationResult:
@@ -155,14 +175,60 @@ def detect_bbj_code(code: str) -> bool:
     return indicators >= 2
 
 
+def _compiler_settings(timeout: float | None) -> tuple[str, float]:
+    """Resolve compiler path and timeout from env vars.
+
+    Env vars are read directly to avoid a circular import with config.py.
+    """
+    if timeout is None:
+        timeout = float(os.environ.get("BBJ_RAG_COMPILER_TIMEOUT", "10.0"))
+    return os.environ.get("BBJ_RAG_COMPILER_PATH", "bbjcpl"), timeout
+
+
+async def _run_compiler(
+    compiler_path: str, paths: list[Path], timeout: float
+) -> tuple[int, str] | None:
+    """Run ``bbjcpl -N`` on *paths* and return (returncode, stderr).
+
+    Returns None when the run exceeds *timeout* (the process is killed).
+    Raises FileNotFoundError when the compiler is not installed.
+    """
+    process = await asyncio.create_subprocess_exec(
+        compiler_path,
+        "-N",
+        *(str(p) for p in paths),
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    try:
+        _, stderr = await asyncio.wait_for(process.communicate(), timeout=timeout)
+    except TimeoutError:
+        process.kill()
+        await process.wait()
+        return None
+    returncode = process.returncode if process.returncode is not None else -1
+    return returncode, stderr.decode("utf-8", errors="replace").strip()
+
+
+def _result_from_stderr(stderr_text: str) -> ValidationResult:
+    """bbjcpl always exits 0: empty stderr means valid."""
+    if stderr_text:
+        return ValidationResult(valid=False, errors=stderr_text)
+    return ValidationResult(valid=True, errors="")
+
+
 async def validate_bbj_syntax(
     code: str, timeout: float | None = None
 ) -> ValidationResult:
     """Validate BBj code syntax via the bbjcpl compiler.
 
-    Creates a temporary .bbj file, runs bbjcpl -N (syntax check only),
-    and returns the result. The bbjcpl compiler always exits 0; errors
-    are reported via stderr.
+    Results are looked up in the validation cache first (see
+    ValidationCache); definitive results are stored there afterwards.
+    When a CompilerPool has been installed with set_default_pool(), the
+    snippet is queued there and compiled in a batch.  Otherwise a
+    temporary .bbj file is created and bbjcpl -N (syntax check only) is
+    run on it.  The bbjcpl compiler always exits 0; errors are reported
+    via stderr.
 
     Args:
         code: BBj source code to validate
@@ -172,10 +238,31 @@ async def validate_bbj_syntax(
     Returns:
         ValidationResult with validation status and any errors
     """
-    # Get configuration from env vars (avoid circular import with config.py)
-    if timeout is None:
-        timeout = float(os.environ.get("BBJ_RAG_COMPILER_TIMEOUT", "10.0"))
-    compiler_path = os.environ.get("BBJ_RAG_COMPILER_PATH", "bbjcpl")
+    pool = (
+        _default_pool if _default_pool is not None and _default_pool.running else None
+    )
+    cache = get_validation_cache()
+    key = ""
+    if cache is not None:
+        compiler_path = pool.compiler_path if pool else _compiler_settings(None)[0]
+        key = cache_key(code, compiler_path)
+        cached = await cache.async_get(key)
+        if cached is not None:
+            return cached
+
+    if pool is not None:
+        result = await pool.submit(code, timeout)
+    else:
+        result = await _compile_snippet(code, timeout)
+
+    if cache is not None:
+        await cache.async_put(key, result)
+    return result
+
+
+async def _compile_snippet(code: str, timeout: float | None) -> ValidationResult:
+    """Compile one snippet with a dedicated bbjcpl process."""
+    compiler_path, timeout = _compiler_settings(timeout)
 
     # Create temp file with .bbj extension
     temp_path: Path | None = None
@@ -192,51 +279,511 @@ async def validate_bbj_syntax(
 
         # Run bbjcpl -N <file> (syntax check only, no output file)
         try:
-            process = await asyncio.create_subprocess_exec(
-                compiler_path,
-                "-N",
-                str(temp_path),
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-            )
+            outcome = await _run_compiler(compiler_path, [temp_path], timeout)
         except FileNotFoundError:
             # bbjcpl not found
-            return ValidationResult(
-                valid=False,
-                errors="",
-                unavailable=True,
-            )
+            return ValidationResult(valid=False, errors="", unavailable=True)
 
-        # Wait with timeout
-        try:
-            _, stderr = await asyncio.wait_for(
-                process.communicate(),
-                timeout=timeout,
-            )
-        except TimeoutError:
-            # Kill the process if it times out
-            process.kill()
-            await process.wait()
-            return ValidationResult(
-                valid=False,
-                errors="",
-                timed_out=True,
-            )
+        if outcome is None:
+            return ValidationResult(valid=False, errors="", timed_out=True)
 
         # Parse stderr: empty = valid, non-empty = errors
-        stderr_text = stderr.decode("utf-8", errors="replace").strip()
-        if stderr_text:
-            return ValidationResult(
-                valid=False,
-                errors=stderr_text,
-            )
-        else:
-            return ValidationResult(
-                valid=True,
-                errors="",
-            )
+        return _result_from_stderr(outcome[1])
 
     finally:
         # Clean up temp file
         if temp_path is not None and temp_path.exists():
             temp_path.unlink()
+
+
+# ---------------------------------------------------------------------------
+# Batched compiler pool
+# ---------------------------------------------------------------------------
+
+# Extra seconds a batch may take over its slowest snippet's timeout
+# (process startup is paid once; each extra file is cheap to parse)
+_BATCH_OVERHEAD = 2.0
+
+
+def _default_work_dir() -> Path:
+    """Prefer tmpfs (/dev/shm) so snippet files never touch disk."""
+    shm = Path("/dev/shm")
+    if shm.is_dir() and os.access(shm, os.W_OK):
+        return shm
+    return Path(tempfile.gettempdir())
+
+
+@dataclass
+class _Job:
+    code: str
+    timeout: float
+    future: asyncio.Future[ValidationResult]
+
+
+class CompilerPool:
+    """A pool of workers that compile queued snippets in batches.
+
+    Each worker takes the next job from a bounded queue plus whatever
+    else is already waiting (up to *batch_size*), writes the snippets
+    into a private work directory and runs one ``bbjcpl -N`` over all
+    of them.  Stderr lines are attributed to snippets by their filename
+    prefix.  A batch may run for its longest snippet timeout plus a
+    small fixed overhead.  When it crashes (non-zero exit), snippets
+    whose errors were already attributed keep them; the rest -- or the
+    whole batch after a timeout or unattributable stderr -- are retried
+    one snippet at a time, in sequence, each result delivered as soon
+    as it is known.  One bad snippet never decides the result of
+    another and a worker never runs more than one bbjcpl process.  A
+    snippet that still makes bbjcpl exit non-zero on its own is
+    reported as invalid.
+
+    Usage::
+
+        pool = CompilerPool(workers=2)
+        await pool.start()
+        set_default_pool(pool)
+        ...
+        await pool.close()
+    """
+
+    def __init__(
+        self,
+        compiler_path: str | None = None,
+        *,
+        workers: int = 2,
+        batch_size: int = 16,
+        queue_size: int = 256,
+        timeout: float | None = None,
+        work_dir: str | Path | None = None,
+    ) -> None:
+        default_path, default_timeout = _compiler_settings(timeout)
+        self.compiler_path = compiler_path or default_path
+        self.timeout = default_timeout
+        self.workers = max(1, workers)
+        self.batch_size = max(1, batch_size)
+        self._queue: asyncio.Queue[_Job] = asyncio.Queue(maxsize=max(1, queue_size))
+        self._base_dir = Path(work_dir) if work_dir else _default_work_dir()
+        self._work_dir: Path | None = None
+        self._tasks: list[asyncio.Task[None]] = []
+        self._names = itertools.count()
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    @property
+    def pending(self) -> int:
+        """Jobs queued but not yet picked up by a worker."""
+        return self._queue.qsize()
+
+    async def start(self) -> None:
+        """Create the work directory and spawn the worker tasks."""
+        if self._tasks:
+            return
+        self._base_dir.mkdir(parents=True, exist_ok=True)
+        self._work_dir = Path(tempfile.mkdtemp(prefix="bbjcpl-", dir=self._base_dir))
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"bbjcpl-worker-{i}")
+            for i in range(self.workers)
+        ]
+        logger.info(
+            "Compiler pool started: %d workers, batch=%d, dir=%s",
+            self.workers,
+            self.batch_size,
+            self._work_dir,
+        )
+
+    async def close(self) -> None:
+        """Stop the workers, fail queued jobs and remove the work directory."""
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+        self._tasks = []
+        while not self._queue.empty():
+            job = self._queue.get_nowait()
+            if not job.future.done():
+                job.future.set_result(
+                    ValidationResult(valid=False, errors="", unavailable=True)
+                )
+        if self._work_dir is not None:
+            shutil.rmtree(self._work_dir, ignore_errors=True)
+            self._work_dir = None
+
+    async def submit(self, code: str, timeout: float | None = None) -> ValidationResult:
+        """Queue *code* for compilation and wait for its result.
+
+        Waits for queue space when the queue is full (backpressure).
+        """
+        if not self._tasks:
+            raise RuntimeError("CompilerPool is not running; call start() first")
+        future: asyncio.Future[ValidationResult] = (
+            asyncio.get_running_loop().create_future()
+        )
+        job = _Job(code, self.timeout if timeout is None else timeout, future)
+        await self._queue.put(job)
+        return await future
+
+    async def _worker(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                await self._compile_batch(batch)
+            except Exception as exc:
+                # Keep the worker alive; the next batch gets a fresh process
+                logger.exception("Compiler worker failed, restarting")
+                for job in batch:
+                    if not job.future.done():
+                        job.future.set_exception(exc)
+            finally:
+                for job in batch:
+                    if not job.future.done():
+                        job.future.cancel()
+                    self._queue.task_done()
+
+    def _write(self, jobs: list[_Job]) -> list[Path]:
+        assert self._work_dir is not None
+        paths = []
+        for job in jobs:
+            path = self._work_dir / f"s{next(self._names)}.bbj"
+            path.write_text(job.code, encoding="utf-8")
+            paths.append(path)
+        return paths
+
+    async def _compile_batch(self, batch: list[_Job]) -> None:
+        jobs = [job for job in batch if not job.future.cancelled()]
+        if not jobs:
+            return
+        paths = self._write(jobs)
+        try:
+            results = await self._compile(jobs, paths)
+        finally:
+            for path in paths:
+                path.unlink(missing_ok=True)
+        for job, result in zip(jobs, results, strict=True):
+            if not job.future.done():
+                job.future.set_result(result)
+
+    async def _compile(
+        self, jobs: list[_Job], paths: list[Path]
+    ) -> list[ValidationResult]:
+        try:
+            timeout = max(job.timeout for job in jobs)
+            if len(jobs) > 1:
+                timeout += _BATCH_OVERHEAD
+            outcome = await _run_compiler(self.compiler_path, paths, timeout)
+        except FileNotFoundError:
+            return [ValidationResult(valid=False, errors="", unavailable=True)] * len(
+                jobs
+            )
+
+        if len(jobs) == 1:
+            if outcome is None:
+                return [ValidationResult(valid=False, errors="", timed_out=True)]
+            returncode, stderr_text = outcome
+            if returncode != 0:
+                # The compiler ran but choked on this snippet: that is an error
+                logger.warning("bbjcpl exited with %d: %s", returncode, stderr_text)
+                errors = stderr_text or f"bbjcpl exited with status {returncode}"
+                return [ValidationResult(valid=False, errors=errors)]
+            return [_result_from_stderr(stderr_text)]
+
+        results: list[ValidationResult | None] = [None] * len(jobs)
+        if outcome is not None:
+            returncode, stderr_text = outcome
+            attributed = _attribute_errors(stderr_text, paths)
+            if attributed is not None and returncode == 0:
+                return [_result_from_stderr(text) for text in attributed]
+            if attributed is not None:
+                # Crashed part-way: errors reported so far are definitive
+                results = [
+                    ValidationResult(valid=False, errors=text) if text else None
+                    for text in attributed
+                ]
+
+        # Isolate the snippets without a result, one at a time so a worker
+        # never runs more than one bbjcpl; each caller is answered as soon
+        # as its own snippet is done.
+        retry = [i for i, result in enumerate(results) if result is None]
+        logger.info(
+            "Batch of %d fell back to %d single compiles", len(jobs), len(retry)
+        )
+        for i in retry:
+            (single,) = await self._compile([jobs[i]], [paths[i]])
+            if not jobs[i].future.done():
+                jobs[i].future.set_result(single)
+            results[i] = single
+        return [result for result in results if result is not None]
+
+
+def _attribute_errors(stderr_text: str, paths: list[Path]) -> list[str] | None:
+    """Split batched bbjcpl stderr into per-file error text.
+
+    Lines starting with ``<path>:`` (full path or file name) begin a
+    file's errors; following lines without a prefix belong to the same
+    file.  Returns None when output precedes any recognised prefix.
+    """
+    prefixes = {}
+    for index, path in enumerate(paths):
+        prefixes[f"{path}:"] = index
+        prefixes[f"{path.name}:"] = index
+    per_file: list[list[str]] = [[] for _ in paths]
+    current: int | None = None
+    for line in stderr_text.splitlines():
+        for prefix, index in prefixes.items():
+            if line.startswith(prefix):
+                current = index
+                break
+        if current is None:
+            if line.strip():
+                return None
+            continue
+        per_file[current].append(line)
+    return ["\n".join(lines).strip() for lines in per_file]
+
+
+_default_pool: CompilerPool | None = None
+
+
+def set_default_pool(pool: CompilerPool | None) -> None:
+    """Route validate_bbj_syntax() through *pool* (None restores spawning)."""
+    global _default_pool
+    _default_pool = pool
+
+
+def get_default_pool() -> CompilerPool | None:
+    return _default_pool
+
+
+# ---------------------------------------------------------------------------
+# Validation result cache
+# ---------------------------------------------------------------------------
+
+
+def normalize_code(code: str) -> str:
+    """Normalise *code* for cache keys.
+
+    Line endings are unified, trailing whitespace is stripped from each
+    line and trailing blank lines are dropped -- none of these change
+    what bbjcpl reports.  Leading blank lines are kept: they shift the
+    line numbers in its error messages.
+    """
+    lines = code.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    return "\n".join(line.rstrip() for line in lines).rstrip("\n")
+
+
+@functools.lru_cache(maxsize=16)
+def _resolve_compiler(compiler_path: str) -> str | None:
+    found = shutil.which(compiler_path)
+    return os.path.realpath(found) if found else None
+
+
+def _compiler_fingerprint(compiler_path: str) -> str:
+    """Identify the installed compiler version by its resolved binary.
+
+    The binary's size and mtime change whenever BBj is upgraded, which
+    invalidates every cached result for the old compiler.
+    """
+    resolved = _resolve_compiler(compiler_path)
+    if resolved is None:
+        return f"{compiler_path}:missing"
+    try:
+        st = os.stat(resolved)
+    except OSError:
+        return f"{resolved}:missing"
+    return f"{resolved}:{st.st_size}:{st.st_mtime_ns}"
+
+
+def cache_key(code: str, compiler_path: str) -> str:
+    """SHA-256 over the normalised code and the compiler fingerprint."""
+    digest = hashlib.sha256()
+    digest.update(_compiler_fingerprint(compiler_path).encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(normalize_code(code).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class ValidationCache:
+    """LRU cache of ValidationResult keyed by cache_key().
+
+    Valid and invalid results are both cached (the latter is a negative
+    cache for known-bad snippets).  Unavailable and timed-out results
+    are never cached: they say nothing about the code.  With *cache_dir*
+    set, entries are also written as ``<key>.json`` files so they
+    survive restarts and are shared between worker processes.  The
+    directory is bounded by *max_disk_entries*: once it holds more
+    files, the least recently used ones (by mtime; disk hits touch the
+    file) are removed.  ``async_get()`` / ``async_put()`` do the disk
+    I/O in a thread so the event loop never blocks on it.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 2048,
+        cache_dir: str | Path | None = None,
+        max_disk_entries: int = 20_000,
+    ):
+        self.max_entries = max(1, max_entries)
+        self.max_disk_entries = max(1, max_disk_entries)
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self._entries: OrderedDict[str, ValidationResult] = OrderedDict()
+        self._disk_lock = threading.Lock()
+        self._disk_count = 0
+        self.hits = 0
+        self.misses = 0
+        if self.cache_dir is not None:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            self._disk_count = sum(1 for _ in self.cache_dir.glob("*.json"))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> ValidationResult | None:
+        result = self._entries.get(key)
+        if result is None and self.cache_dir is not None:
+            return self._found(key, self._read(key), from_disk=True)
+        return self._found(key, result)
+
+    async def async_get(self, key: str) -> ValidationResult | None:
+        """Like get(), reading the disk entry in a worker thread."""
+        result = self._entries.get(key)
+        if result is None and self.cache_dir is not None:
+            disk = await asyncio.to_thread(self._read, key)
+            return self._found(key, disk, from_disk=True)
+        return self._found(key, result)
+
+    def put(self, key: str, result: ValidationResult) -> None:
+        stored = self._store(key, result)
+        if stored is not None and self.cache_dir is not None:
+            self._write(key, stored)
+
+    async def async_put(self, key: str, result: ValidationResult) -> None:
+        """Like put(), writing the disk entry in a worker thread."""
+        stored = self._store(key, result)
+        if stored is not None and self.cache_dir is not None:
+            await asyncio.to_thread(self._write, key, stored)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def _found(
+        self, key: str, result: ValidationResult | None, from_disk: bool = False
+    ) -> ValidationResult | None:
+        if result is None:
+            self.misses += 1
+            return None
+        if from_disk:
+            self._remember(key, result)
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return ValidationResult(result.valid, result.errors)
+
+    def _store(self, key: str, result: ValidationResult) -> ValidationResult | None:
+        if result.unavailable or result.timed_out:
+            return None
+        stored = ValidationResult(result.valid, result.errors)
+        self._remember(key, stored)
+        return stored
+
+    def _remember(self, key: str, result: ValidationResult) -> None:
+        self._entries[key] = result
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _read(self, key: str) -> ValidationResult | None:
+        assert self.cache_dir is not None
+        path = self.cache_dir / f"{key}.json"
+        try:
+            data = json.loads(path.read_text("utf-8"))
+            result = ValidationResult(valid=bool(data["valid"]), errors=data["errors"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        with contextlib.suppress(OSError):
+            os.utime(path)
+        return result
+
+    def _write(self, key: str, result: ValidationResult) -> None:
+        assert self.cache_dir is not None
+        path = self.cache_dir / f"{key}.json"
+        tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            existed = path.exists()
+            tmp.write_text(
+                json.dumps({"valid": result.valid, "errors": result.errors}), "utf-8"
+            )
+            tmp.replace(path)
+        except OSError:
+            logger.warning("Could not write validation cache entry %s", path)
+            return
+        if existed:
+            return
+        with self._disk_lock:
+            self._disk_count += 1
+            if self._disk_count > self.max_disk_entries:
+                self._prune()
+
+    def _prune(self) -> None:
+        """Drop the oldest files until the directory is at 90% of its bound.
+
+        Recounts the directory, since other processes write to it too.
+        """
+        assert self.cache_dir is not None
+        entries = []
+        for path in self.cache_dir.glob("*.json"):
+            with contextlib.suppress(OSError):
+                entries.append((path.stat().st_mtime_ns, path))
+        entries.sort()
+        excess = len(entries) - self.max_disk_entries * 9 // 10
+        for _, path in entries[: max(0, excess)]:
+            with contextlib.suppress(OSError):
+                path.unlink()
+        self._disk_count = len(entries) - max(0, excess)
+
+
+_validation_cache: ValidationCache | None = None
+_validation_cache_loaded = False
+
+
+def get_validation_cache() -> ValidationCache | None:
+    """Return the process-wide cache, created from env vars on first use.
+
+    ``BBJ_RAG_COMPILER_CACHE_SIZE`` (default 2048, 0 disables caching),
+    ``BBJ_RAG_COMPILER_CACHE_DIR`` (default: memory only) and
+    ``BBJ_RAG_COMPILER_CACHE_DISK_SIZE`` (files kept there, default 20000).
+    """
+    global _validation_cache, _validation_cache_loaded
+    if not _validation_cache_loaded:
+        _validation_cache_loaded = True
+        size = int(os.environ.get("BBJ_RAG_COMPILER_CACHE_SIZE", "2048"))
+        cache_dir = os.environ.get("BBJ_RAG_COMPILER_CACHE_DIR", "")
+        disk_size = int(os.environ.get("BBJ_RAG_COMPILER_CACHE_DISK_SIZE", "20000"))
+        _validation_cache = (
+            ValidationCache(size, cache_dir or None, disk_size) if size > 0 else None
+        )
+    return _validation_cache
+
+
+def set_validation_cache(cache: ValidationCache | None) -> None:
+    """Replace the process-wide cache (None disables caching)."""
+    global _validation_cache, _validation_cache_loaded
+    _validation_cache = cache
+    _validation_cache_loaded = True
+
+
+__all__ = [
+    "CompilerPool",
+    "ValidationCache",
+    "ValidationResult",
+    "cache_key",
+    "detect_bbj_code",
+    "get_default_pool",
+    "get_validation_cache",
+    "normalize_code",
+    "set_default_pool",
+    "set_validation_cache",
+    "validate_bbj_syntax",
+]
@@ -45,11 +45,44 @@ class Settings(BaseSettings):
     db_password: str = Field(default="postgres")
     db_name: str = Field(default="bbj_rag")
 
+    # -- API connection pool: grows from min to max while requests wait,
+    # shrinks back after max_idle seconds; checkout waits at most
+    # db_pool_timeout seconds before the request fails with 503 --
+    db_pool_min_size: int = Field(default=2, ge=1)
+    db_pool_max_size: int = Field(default=10, ge=1)
+    db_pool_timeout: float = Field(default=5.0, gt=0)
+    db_pool_max_idle: float = Field(default=300.0, gt=0)
+
+    # -- API worker processes (``bbj-rag serve``); 0 = one per CPU core.
+    # db_max_connections is the connection budget shared by all workers
+    # (0 = no budget, every worker may open db_pool_max_size) --
+    workers: int = Field(default=1, ge=0)
+    db_max_connections: int = Field(default=0, ge=0)
+
     # -- Embedding configuration --
     embedding_model: str = Field(default="qwen3-embedding:0.6b")
     embedding_dimensions: int = Field(default=1024)
     embedding_provider: str = Field(default="ollama")
     embedding_batch_size: int = Field(default=64)
+    # API query embedding: concurrent Ollama calls, distinct queries that
+    # may wait (more get 503), and micro-batching of concurrent queries
+    embed_max_concurrency: int = Field(default=2, ge=1)
+    embed_queue_size: int = Field(default=64, ge=1)
+    embed_max_batch: int = Field(default=16, ge=1)
+    embed_batch_window: float = Field(default=0.005, ge=0)
+    embed_timeout: float = Field(default=30.0, gt=0)
+
+    # -- Per-client rate limits (token buckets: requests/s refill rate
+    # and burst size; a rate of 0 disables that endpoint's limit) --
+    rate_limit_enabled: bool = Field(default=True)
+    rate_limit_search_rate: float = Field(default=5.0, ge=0)
+    rate_limit_search_burst: int = Field(default=20, ge=1)
+    rate_limit_chat_rate: float = Field(default=0.2, ge=0)
+    rate_limit_chat_burst: int = Field(default=5, ge=1)
+    rate_limit_max_clients: int = Field(default=10_000, ge=1)
+    # Peers (addresses or CIDR ranges, besides loopback) whose X-Client-Id
+    # header is trusted, e.g. a reverse proxy that authenticates clients
+    rate_limit_trusted_proxies: list[str] = Field(default_factory=list)
 
     # -- Chunking --
     chunk_size: int = Field(default=400)
@@ -59,12 +92,39 @@ class Settings(BaseSettings):
     chat_model: str = Field(default="claude-sonnet-4-5-20250929")
     chat_max_tokens: int = Field(default=2048)
     chat_max_history: int = Field(default=20)
+    # Most recent messages sent verbatim; older ones become a summary
+    chat_history_keep_messages: int = Field(default=6, ge=1)
+    # Optional small model for rewriting follow-ups ("" = heuristic only)
+    chat_condense_model: str = Field(default="")
+    chat_condense_timeout: float = Field(default=1.0)
     chat_confidence_min_results: int = Field(default=2)
+    # Shared Anthropic client: "" keeps the SDK default / ANTHROPIC_BASE_URL
+    # (set to a local stub server for tests and benchmarks)
+    chat_api_base_url: str = Field(default="")
+    chat_http_max_connections: int = Field(default=20, ge=1)
+    chat_http_max_keepalive: int = Field(default=10, ge=0)
+    chat_http_keepalive_expiry: float = Field(default=60.0)
     chat_confidence_min_score: float = Field(default=0.025)
+    # Replay cached answers to repeated single-turn questions (0 = off)
+    chat_answer_cache_ttl: float = Field(default=0.0, ge=0)
+    chat_answer_cache_size: int = Field(default=512, ge=1)
+    # Approximate token budget for RAG reference material per request
+    chat_context_token_budget: int = Field(default=3000, ge=200)
+    # Code blocks validated/fixed at once per response
+    chat_validation_concurrency: int = Field(default=4, ge=1)
 
     # -- BBj compiler validation --
     compiler_timeout: float = Field(default=10.0)
     compiler_path: str = Field(default="bbjcpl")
+    # Batched compiler pool used by the API (see compiler.CompilerPool)
+    compiler_workers: int = Field(default=2, ge=1)
+    compiler_batch_size: int = Field(default=16, ge=1)
+    compiler_queue_size: int = Field(default=256, ge=1)
+    compiler_work_dir: str = Field(default="")  # "" = /dev/shm when writable
+    # Validation result cache (0 disables; "" dir = in-memory only)
+    compiler_cache_size: int = Field(default=2048, ge=0)
+    compiler_cache_dir: str = Field(default="")
+    compiler_cache_disk_size: int = Field(default=20_000, ge=1)
 
     # -- Parallel ingestion --
     ingest_workers: int = Field(default=4)
@@ -86,6 +146,16 @@ class Settings(BaseSettings):
         # Check legacy OLLAMA_HOST env var as fallback
         return os.environ.get("OLLAMA_HOST", "http://localhost:11434")
 
+    # -- Observability --
+    metrics_server_timing: bool = Field(default=False)
+    # Background dependency probes behind /health and /health/ready
+    health_interval: float = Field(default=15.0, gt=0)
+    health_timeout: float = Field(default=5.0, gt=0)
+    # Upper bound on the startup embedding warm-up that gates readiness
+    warmup_timeout: float = Field(default=120.0, gt=0)
+    # Seconds /stats reuses its in-process copy of the corpus_stats table
+    stats_cache_ttl: float = Field(default=60.0, ge=0)
+
     # -- Source paths --
     flare_source_path: str = Field(default="")
     crawl_source_urls: list[str] = Field(default_factory=list)
@@ -107,6 +177,24 @@ class Settings(BaseSettings):
             f"@{self.db_host}:{self.db_port}/{self.db_name}"
         )
 
+    @property
+    def worker_count(self) -> int:
+        """Number of API worker processes (``workers``, 0 = CPU count)."""
+        return self.workers or os.cpu_count() or 1
+
+    @property
+    def db_pool_limits(self) -> tuple[int, int]:
+        """Per-worker ``(min_size, max_size)`` for the API connection pool.
+
+        With a ``db_max_connections`` budget, each worker gets an equal
+        share (at least one connection) so all workers together never
+        exceed it.
+        """
+        max_size = max(self.db_pool_min_size, self.db_pool_max_size)
+        if self.db_max_connections:
+            max_size = max(1, self.db_max_connections // self.worker_count)
+        return min(self.db_pool_min_size, max_size), max_size
+
     @classmethod
     def settings_customise_sources(
         cls,
@@ -0,0 +1,199 @@
+"""Bulk compile check of every BBj code block in the corpus.
+
+Nothing else verifies that the BBj samples we ship actually compile:
+``training-data/scripts/validate.py`` only checks front matter, and
+ingested chunks are never compiled at all.  This module collects every
+BBj fenced block from the training-data Markdown files and from the
+``chunks`` table (using ``chat.validation.extract_code_blocks`` so the
+same blocks are found as in chat responses), dedups them by normalised
+code hash, and compiles the unique blocks through a batched
+``CompilerPool``.
+
+The result is a per-block status table: one JSON line per unique block
+with its status (``valid``, ``invalid``, ``timed_out``, ``unavailable``),
+compiler errors, and every location it was found at.  It is driven by
+``bbj-rag validate-code`` and is meant to run as a background job after
+an ingest or before publishing training data.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from collections import Counter
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+import psycopg
+
+from bbj_rag.chat.validation import extract_code_blocks
+from bbj_rag.compiler import (
+    CompilerPool,
+    ValidationResult,
+    normalize_code,
+    set_default_pool,
+    validate_bbj_syntax,
+)
+
+logger = logging.getLogger(__name__)
+
+# Documentation files in training-data, not examples
+_SKIP_FILES = frozenset({"README.md", "FORMAT.md", "CONTRIBUTING.md"})
+
+# Chunks without a fence cannot contain a block; filter them in SQL
+_CHUNK_SQL = "SELECT id, source_url, content FROM chunks WHERE content LIKE %s"
+
+STATUSES = ("valid", "invalid", "timed_out", "unavailable")
+
+
+@dataclass
+class CodeSample:
+    """A unique BBj code block and every place it occurs.
+
+    Attributes:
+        key: SHA-256 of the normalised code.
+        code: The code as first seen.
+        locations: ``path:line`` or ``source_url#chunk-id`` references.
+        result: Compiler result, filled in by validate_samples().
+    """
+
+    key: str
+    code: str
+    locations: list[str] = field(default_factory=list)
+    result: ValidationResult | None = None
+
+    @property
+    def status(self) -> str:
+        result = self.result
+        if result is None or result.unavailable:
+            return "unavailable"
+        if result.timed_out:
+            return "timed_out"
+        return "valid" if result.valid else "invalid"
+
+    def to_record(self) -> dict[str, Any]:
+        return {
+            "hash": self.key,
+            "status": self.status,
+            "errors": self.result.errors if self.result else "",
+            "lines": self.code.count("\n") + 1,
+            "locations": self.locations,
+            "preview": self.code.strip().splitlines()[0][:80] if self.code else "",
+        }
+
+
+def iter_markdown_blocks(root: Path) -> Iterator[tuple[str, str]]:
+    """Yield ``(location, code)`` for BBj blocks in Markdown under *root*."""
+    for path in sorted(root.rglob("*.md")):
+        if path.name in _SKIP_FILES:
+            continue
+        text = path.read_text(encoding="utf-8")
+        for block in extract_code_blocks(text):
+            if block.is_bbj:
+                line = text.count("\n", 0, block.start_pos) + 1
+                yield f"{path}:{line}", block.code
+
+
+def iter_chunk_blocks(conn: psycopg.Connection[Any]) -> Iterator[tuple[str, str]]:
+    """Yield ``(location, code)`` for BBj blocks in ingested chunks."""
+    with conn.cursor(name="corpus_validation") as cur:
+        cur.execute(_CHUNK_SQL, ("%```%",))
+        for chunk_id, source_url, content in cur:
+            for block in extract_code_blocks(content):
+                if block.is_bbj:
+                    yield f"{source_url}#chunk-{chunk_id}", block.code
+
+
+def dedupe_blocks(blocks: Iterable[tuple[str, str]]) -> list[CodeSample]:
+    """Group blocks by normalised code hash, keeping first-seen order.
+
+    Blocks that are empty after normalisation are dropped.
+    """
+    samples: dict[str, CodeSample] = {}
+    for location, code in blocks:
+        normalized = normalize_code(code)
+        if not normalized.strip():
+            continue
+        key = hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+        sample = samples.get(key)
+        if sample is None:
+            sample = samples[key] = CodeSample(key, code)
+        sample.locations.append(location)
+    return list(samples.values())
+
+
+async def validate_samples(
+    samples: list[CodeSample],
+    pool: CompilerPool,
+    progress_every: int = 500,
+) -> None:
+    """Compile every sample through *pool*, storing results in place.
+
+    Goes through validate_bbj_syntax() so results land in (and come
+    from) the shared validation cache.  A fixed set of tasks (enough to
+    fill every pool worker's batches twice over) pulls samples from a
+    shared iterator, so memory stays flat however many samples there
+    are.
+    """
+    done = 0
+    pending = iter(samples)
+
+    async def check() -> None:
+        nonlocal done
+        for sample in pending:
+            sample.result = await validate_bbj_syntax(sample.code)
+            done += 1
+            if progress_every and done % progress_every == 0:
+                logger.info("Validated %d/%d code blocks", done, len(samples))
+
+    tasks = min(len(samples), 2 * pool.workers * pool.batch_size)
+    await pool.start()
+    set_default_pool(pool)
+    try:
+        await asyncio.gather(*(check() for _ in range(tasks)))
+    finally:
+        set_default_pool(None)
+        await pool.close()
+
+
+def write_report(samples: list[CodeSample], output: Path) -> Counter[str]:
+    """Write one JSON line per sample to *output*; return status counts."""
+    counts: Counter[str] = Counter()
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with output.open("w", encoding="utf-8") as fh:
+        for sample in samples:
+            record = sample.to_record()
+            counts[record["status"]] += 1
+            fh.write(json.dumps(record) + "\n")
+    return counts
+
+
+def run_corpus_validation(
+    blocks: Iterable[tuple[str, str]],
+    pool: CompilerPool,
+    output: Path,
+) -> tuple[list[CodeSample], Counter[str], float]:
+    """Dedupe, compile and report; returns (samples, counts, seconds)."""
+    start = time.perf_counter()
+    samples = dedupe_blocks(blocks)
+    logger.info("Compiling %d unique BBj code blocks", len(samples))
+    asyncio.run(validate_samples(samples, pool))
+    counts = write_report(samples, output)
+    return samples, counts, time.perf_counter() - start
+
+
+__all__ = [
+    "STATUSES",
+    "CodeSample",
+    "dedupe_blocks",
+    "iter_chunk_blocks",
+    "iter_markdown_blocks",
+    "run_corpus_validation",
+    "validate_samples",
+    "write_report",
+]
@@ -1,15 +1,27 @@
 """Database connection and chunk insert operations for the RAG pipeline.
 
-Provides connection management with pgvector type registration, and
-idempotent chunk insertion with ON CONFLICT content_hash deduplication.
+Provides connection management with pgvector type registration (type
+OIDs are looked up once per process and database, then reused for every
+connection, sync or async), and idempotent chunk insertion with ON
+CONFLICT content_hash deduplication.
 """
 
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any
 
 import psycopg
-from pgvector.psycopg import register_vector  # type: ignore[import-untyped]
+from pgvector.psycopg.bit import register_bit_info  # type: ignore[import-untyped]
+from pgvector.psycopg.halfvec import (  # type: ignore[import-untyped]
+    register_halfvec_info,
+)
+from pgvector.psycopg.sparsevec import (  # type: ignore[import-untyped]
+    register_sparsevec_info,
+)
+from pgvector.psycopg.vector import (  # type: ignore[import-untyped]
+    register_vector_info,
+)
+from psycopg.types import TypeInfo
 from psycopg.types.json import Json
 
 from bbj_rag.models import Chunk
@@ -31,6 +43,71 @@ RETURNING id
 """
 
 
+# pgvector types registered on every connection; halfvec and sparsevec
+# are optional (older pgvector versions lack them)
+_VECTOR_TYPES = ("vector", "bit", "halfvec", "sparsevec")
+_REGISTER_INFO = {
+    "vector": register_vector_info,
+    "bit": register_bit_info,
+    "halfvec": register_halfvec_info,
+    "sparsevec": register_sparsevec_info,
+}
+
+# Process-wide TypeInfo per database: the OIDs stay fixed for the life of
+# the extension, so only the first connection pays the catalog lookups
+_type_info_cache: dict[str, dict[str, TypeInfo | None]] = {}
+
+
+def _database_key(conn: psycopg.Connection[Any] | psycopg.AsyncConnection[Any]) -> str:
+    info = conn.info
+    return f"{info.host}:{info.port}/{info.dbname}"
+
+
+def _register_type_infos(
+    conn: psycopg.Connection[Any] | psycopg.AsyncConnection[Any],
+    infos: dict[str, TypeInfo | None],
+) -> None:
+    for name, info in infos.items():
+        if info is not None or name == "vector":  # vector raises when missing
+            _REGISTER_INFO[name](conn, info)
+
+
+def register_vector_types(conn: psycopg.Connection[Any]) -> None:
+    """Register pgvector types on *conn*, using the process-wide cache.
+
+    Equivalent to ``pgvector.psycopg.register_vector`` but fetches the
+    type OIDs only once per database and process.
+    """
+    key = _database_key(conn)
+    infos = _type_info_cache.get(key)
+    if infos is None:
+        infos = {name: TypeInfo.fetch(conn, name) for name in _VECTOR_TYPES}
+        if infos["vector"] is not None:
+            _type_info_cache[key] = infos
+    _register_type_infos(conn, infos)
+
+
+async def async_register_vector_types(conn: psycopg.AsyncConnection[Any]) -> None:
+    """Async variant of ``register_vector_types()``.
+
+    Used as the ``configure=`` hook of the API and ingestion connection
+    pools, so each new pooled connection is registered once, without a
+    round trip once the cache is warm.
+    """
+    key = _database_key(conn)
+    infos = _type_info_cache.get(key)
+    if infos is None:
+        infos = {name: await TypeInfo.fetch(conn, name) for name in _VECTOR_TYPES}
+        if infos["vector"] is not None:
+            _type_info_cache[key] = infos
+    _register_type_infos(conn, infos)
+
+
+def clear_vector_type_cache() -> None:
+    """Forget cached pgvector type OIDs (after DROP/CREATE EXTENSION)."""
+    _type_info_cache.clear()
+
+
 def get_connection(
     database_url: str | None = None,
     *,
@@ -58,7 +135,7 @@ def get_connection(
             password=password,
             dbname=dbname,
         )
-    register_vector(conn)
+    register_vector_types(conn)
     return conn
 
 
@@ -0,0 +1,513 @@
+"""Offline search-quality and latency evaluation against a golden query set.
+
+The golden set (``tests/golden_queries.yaml``) is a versioned list of
+queries with graded relevance judgments.  Each judgment names a
+substring of the ``source_url`` of a relevant document and a grade
+(1 = relevant, 2 = highly relevant, 3 = the canonical answer).  A result
+is relevant when its source_url contains the judgment's substring,
+case-insensitively.  Each judgment is credited at most once, at the
+first rank it matches, so several chunks of one document do not inflate
+the scores.
+
+``run_evaluation()`` runs every golden query through each retrieval mode
+(dense, BM25, hybrid RRF, and hybrid followed by diversity reranking)
+against a live database and reports recall@k, MRR, nDCG@k and p50/p95
+latency per mode.  ``diff_reports()`` compares a report with a stored
+baseline so that search-tuning changes are judged on numbers instead of
+anecdotes.  The metric functions are pure and are unit-tested without a
+database; the database-backed pieces are driven by ``bbj-rag evaluate``.
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import subprocess
+import time
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+import psycopg
+import yaml
+
+from bbj_rag.embedder import Embedder
+from bbj_rag.search import (
+    SearchResult,
+    bm25_search,
+    dense_search,
+    hybrid_search,
+    rerank_for_diversity,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_GOLDEN_PATH = Path(__file__).resolve().parents[2] / "tests/golden_queries.yaml"
+
+# Retrieval modes in report order.
+MODES: tuple[str, ...] = ("dense", "bm25", "hybrid", "hybrid_rerank")
+
+# Absolute drop in a quality metric reported as a regression.
+DEFAULT_TOLERANCE = 0.01
+
+# Relative p95 latency increase reported as a regression.
+DEFAULT_LATENCY_TOLERANCE = 0.25
+
+_QUALITY_METRICS: tuple[str, ...] = ("recall", "mrr", "ndcg")
+
+
+# ---------------------------------------------------------------------------
+# Golden set
+# ---------------------------------------------------------------------------
+
+
+@dataclass(frozen=True, slots=True)
+class Judgment:
+    """A graded relevance judgment for one golden query.
+
+    Attributes:
+        url_contains: Case-insensitive substring of a relevant source_url.
+        grade: Relevance grade, 1 (relevant) to 3 (canonical answer).
+    """
+
+    url_contains: str
+    grade: int = 1
+
+    def matches(self, source_url: str) -> bool:
+        """Return True if *source_url* is judged relevant by this judgment."""
+        return self.url_contains.lower() in source_url.lower()
+
+
+@dataclass(frozen=True, slots=True)
+class GoldenQuery:
+    """A golden query with its relevance judgments."""
+
+    id: str
+    query: str
+    judgments: tuple[Judgment, ...]
+    generation_filter: str | None = None
+
+
+@dataclass(frozen=True, slots=True)
+class GoldenSet:
+    """A versioned collection of golden queries."""
+
+    version: int
+    queries: tuple[GoldenQuery, ...]
+
+
+def load_golden_set(path: Path = DEFAULT_GOLDEN_PATH) -> GoldenSet:
+    """Load and validate a golden query set from YAML.
+
+    Raises:
+        ValueError: If the file is malformed, a query has no judgments,
+            or query ids are not unique.
+    """
+    with path.open() as f:
+        data = yaml.safe_load(f) or {}
+
+    if "version" not in data:
+        msg = f"{path}: golden set has no 'version'"
+        raise ValueError(msg)
+
+    queries: list[GoldenQuery] = []
+    seen: set[str] = set()
+    for raw in data.get("queries", []):
+        qid = str(raw["id"])
+        if qid in seen:
+            msg = f"{path}: duplicate golden query id '{qid}'"
+            raise ValueError(msg)
+        seen.add(qid)
+
+        judgments = tuple(
+            Judgment(str(j["url_contains"]), int(j.get("grade", 1)))
+            for j in raw.get("relevant", [])
+        )
+        if not judgments:
+            msg = f"{path}: golden query '{qid}' has no relevance judgments"
+            raise ValueError(msg)
+
+        queries.append(
+            GoldenQuery(
+                id=qid,
+                query=str(raw["query"]),
+                judgments=judgments,
+                generation_filter=raw.get("filter_generation"),
+            )
+        )
+
+    return GoldenSet(version=int(data["version"]), queries=tuple(queries))
+
+
+# ---------------------------------------------------------------------------
+# Metrics
+# ---------------------------------------------------------------------------
+
+
+def graded_ranking(urls: Sequence[str], judgments: Sequence[Judgment]) -> list[int]:
+    """Return the relevance grade of each ranked result.
+
+    Each judgment is credited once, at the first result it matches; when
+    several unclaimed judgments match one result, the highest grade wins.
+    """
+    claimed: set[int] = set()
+    grades: list[int] = []
+    for url in urls:
+        best_idx = -1
+        for idx, judgment in enumerate(judgments):
+            if idx in claimed or not judgment.matches(url):
+                continue
+            if best_idx < 0 or judgment.grade > judgments[best_idx].grade:
+                best_idx = idx
+        if best_idx >= 0:
+            claimed.add(best_idx)
+            grades.append(judgments[best_idx].grade)
+        else:
+            grades.append(0)
+    return grades
+
+
+def recall_at_k(grades: Sequence[int], n_relevant: int, k: int) -> float:
+    """Fraction of judged-relevant documents found in the top *k*."""
+    if n_relevant <= 0:
+        return 0.0
+    return sum(1 for g in grades[:k] if g > 0) / n_relevant
+
+
+def reciprocal_rank(grades: Sequence[int], k: int) -> float:
+    """Reciprocal of the rank of the first relevant result in the top *k*."""
+    for rank, grade in enumerate(grades[:k], start=1):
+        if grade > 0:
+            return 1.0 / rank
+    return 0.0
+
+
+def _dcg(grades: Sequence[int]) -> float:
+    return sum((2.0**g - 1) / math.log2(rank + 1) for rank, g in enumerate(grades, 1))
+
+
+def ndcg_at_k(grades: Sequence[int], judgments: Sequence[Judgment], k: int) -> float:
+    """Normalised discounted cumulative gain over the top *k* results."""
+    ideal = _dcg(sorted((j.grade for j in judgments), reverse=True)[:k])
+    if ideal == 0:
+        return 0.0
+    return _dcg(grades[:k]) / ideal
+
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    """Return the *pct* percentile (0-100) of *values* by linear interpolation."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    pos = (len(ordered) - 1) * pct / 100
+    lower = math.floor(pos)
+    upper = math.ceil(pos)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (pos - lower)
+
+
+# ---------------------------------------------------------------------------
+# Reports
+# ---------------------------------------------------------------------------
+
+
+@dataclass(slots=True)
+class QueryRun:
+    """Ranked source URLs and latency for one query in one mode."""
+
+    query_id: str
+    urls: list[str]
+    seconds: float
+
+
+@dataclass(slots=True)
+class ModeReport:
+    """Aggregate quality and latency for one retrieval mode."""
+
+    mode: str
+    recall: float
+    mrr: float
+    ndcg: float
+    p50_ms: float
+    p95_ms: float
+    rankings: dict[str, list[str]] = field(default_factory=dict)
+
+    def to_dict(self) -> dict[str, Any]:
+        """Return a JSON-serialisable representation."""
+        return {
+            "recall": round(self.recall, 4),
+            "mrr": round(self.mrr, 4),
+            "ndcg": round(self.ndcg, 4),
+            "p50_ms": round(self.p50_ms, 2),
+            "p95_ms": round(self.p95_ms, 2),
+            "rankings": self.rankings,
+        }
+
+
+def score_mode(
+    mode: str,
+    golden: GoldenSet,
+    runs: Sequence[QueryRun],
+    k: int,
+) -> ModeReport:
+    """Aggregate per-query runs into mean metrics and latency percentiles."""
+    by_id = {q.id: q for q in golden.queries}
+    recalls: list[float] = []
+    rrs: list[float] = []
+    ndcgs: list[float] = []
+    latencies: list[float] = []
+    rankings: dict[str, list[str]] = {}
+
+    for run in runs:
+        query = by_id[run.query_id]
+        grades = graded_ranking(run.urls, query.judgments)
+        recalls.append(recall_at_k(grades, len(query.judgments), k))
+        rrs.append(reciprocal_rank(grades, k))
+        ndcgs.append(ndcg_at_k(grades, query.judgments, k))
+        latencies.append(run.seconds * 1000)
+        rankings[run.query_id] = run.urls[:k]
+
+    def mean(values: list[float]) -> float:
+        return sum(values) / len(values) if values else 0.0
+
+    return ModeReport(
+        mode=mode,
+        recall=mean(recalls),
+        mrr=mean(rrs),
+        ndcg=mean(ndcgs),
+        p50_ms=percentile(latencies, 50),
+        p95_ms=percentile(latencies, 95),
+        rankings=rankings,
+    )
+
+
+def build_report(
+    golden: GoldenSet,
+    k: int,
+    modes: Sequence[ModeReport],
+    embed_latencies_ms: Sequence[float] = (),
+) -> dict[str, Any]:
+    """Assemble a JSON-serialisable evaluation report."""
+    return {
+        "golden_version": golden.version,
+        "k": k,
+        "queries": len(golden.queries),
+        "embed_p50_ms": round(percentile(embed_latencies_ms, 50), 2),
+        "embed_p95_ms": round(percentile(embed_latencies_ms, 95), 2),
+        "modes": {m.mode: m.to_dict() for m in modes},
+    }
+
+
+def diff_reports(
+    baseline: dict[str, Any],
+    current: dict[str, Any],
+    tolerance: float = DEFAULT_TOLERANCE,
+    latency_tolerance: float = DEFAULT_LATENCY_TOLERANCE,
+) -> tuple[list[str], list[str]]:
+    """Compare *current* with *baseline*.
+
+    Returns:
+        A ``(regressions, changes)`` pair of human-readable lines.
+        Regressions are quality drops larger than *tolerance* (absolute)
+        and p95 latency increases larger than *latency_tolerance*
+        (relative).  Changes list every metric movement and every query
+        whose top-k ranking differs from the baseline.
+    """
+    regressions: list[str] = []
+    changes: list[str] = []
+
+    if baseline.get("golden_version") != current.get("golden_version"):
+        changes.append(
+            f"golden set version {baseline.get('golden_version')} -> "
+            f"{current.get('golden_version')}; per-query diffs may be partial"
+        )
+
+    for mode, cur in current.get("modes", {}).items():
+        base = baseline.get("modes", {}).get(mode)
+        if base is None:
+            changes.append(f"{mode}: new mode (no baseline)")
+            continue
+
+        for metric in _QUALITY_METRICS:
+            delta = cur[metric] - base[metric]
+            if abs(delta) < 1e-9:
+                continue
+            line = f"{mode}.{metric}: {base[metric]:.4f} -> {cur[metric]:.4f}"
+            changes.append(f"{line} ({delta:+.4f})")
+            if delta < -tolerance:
+                regressions.append(line)
+
+        base_p95 = base["p95_ms"]
+        if base_p95 > 0 and cur["p95_ms"] > base_p95 * (1 + latency_tolerance):
+            regressions.append(f"{mode}.p95_ms: {base_p95:.1f} -> {cur['p95_ms']:.1f}")
+
+        base_rankings = base.get("rankings", {})
+        for qid, urls in cur.get("rankings", {}).items():
+            if qid in base_rankings and base_rankings[qid] != urls:
+                changes.append(f"{mode}[{qid}]: top-k ranking changed")
+
+    return regressions, changes
+
+
+# ---------------------------------------------------------------------------
+# Database-backed runs
+# ---------------------------------------------------------------------------
+
+SearchFn = Callable[[GoldenQuery, list[float], int], list[SearchResult]]
+
+
+def _mode_functions(conn: psycopg.Connection[object]) -> dict[str, SearchFn]:
+    """Map mode names to search callables mirroring the API's behaviour."""
+
+    def dense(q: GoldenQuery, vec: list[float], k: int) -> list[SearchResult]:
+        return dense_search(conn, vec, limit=k, generation_filter=q.generation_filter)
+
+    def bm25(q: GoldenQuery, vec: list[float], k: int) -> list[SearchResult]:
+        return bm25_search(
+            conn, q.query, limit=k, generation_filter=q.generation_filter
+        )
+
+    def hybrid(q: GoldenQuery, vec: list[float], k: int) -> list[SearchResult]:
+        return hybrid_search(
+            conn, vec, q.query, limit=k, generation_filter=q.generation_filter
+        )
+
+    def hybrid_rerank(q: GoldenQuery, vec: list[float], k: int) -> list[SearchResult]:
+        # Same over-fetch factor as POST /search.
+        raw = hybrid_search(
+            conn, vec, q.query, limit=k * 2, generation_filter=q.generation_filter
+        )
+        return rerank_for_diversity(raw, limit=k)
+
+    return {
+        "dense": dense,
+        "bm25": bm25,
+        "hybrid": hybrid,
+        "hybrid_rerank": hybrid_rerank,
+    }
+
+
+def run_evaluation(
+    conn: psycopg.Connection[object],
+    embedder: Embedder,
+    golden: GoldenSet,
+    k: int = 5,
+    modes: Sequence[str] = MODES,
+    repeat: int = 1,
+) -> dict[str, Any]:
+    """Run every golden query through each mode and build a report.
+
+    Query embeddings are computed once per query and shared by all modes,
+    so mode latencies cover SQL and reranking only; embedding latency is
+    reported separately.  With ``repeat > 1`` each query is run several
+    times per mode and the fastest run is kept, damping cold-cache noise.
+    """
+    functions = _mode_functions(conn)
+    unknown = [m for m in modes if m not in functions]
+    if unknown:
+        msg = f"Unknown evaluation mode(s): {', '.join(unknown)}"
+        raise ValueError(msg)
+
+    embeddings: dict[str, list[float]] = {}
+    embed_ms: list[float] = []
+    for query in golden.queries:
+        start = time.perf_counter()
+        embeddings[query.id] = embedder.embed_batch([query.query])[0]
+        embed_ms.append((time.perf_counter() - start) * 1000)
+
+    reports: list[ModeReport] = []
+    for mode in modes:
+        search = functions[mode]
+        runs: list[QueryRun] = []
+        for query in golden.queries:
+            attempts: list[QueryRun] = []
+            for _ in range(max(1, repeat)):
+                start = time.perf_counter()
+                results = search(query, embeddings[query.id], k)
+                elapsed = time.perf_counter() - start
+                attempts.append(
+                    QueryRun(query.id, [r.source_url for r in results], elapsed)
+                )
+            # Keep the fastest repeat
+            runs.append(min(attempts, key=lambda run: run.seconds))
+        reports.append(score_mode(mode, golden, runs, k))
+        logger.info("Evaluated mode %s over %d queries", mode, len(runs))
+
+    return build_report(golden, k, reports, embed_ms)
+
+
+def restore_fixture(database_url: str, dump_path: Path) -> None:
+    """Load a fixture dump into *database_url*.
+
+    Plain ``.sql`` dumps are replayed with ``psql``; anything else is
+    treated as a ``pg_dump -Fc`` archive and restored with ``pg_restore``
+    (existing objects are dropped first).
+
+    Raises:
+        subprocess.CalledProcessError: If the restore command fails.
+    """
+    if dump_path.suffix == ".sql":
+        args = [
+            "psql",
+            "--quiet",
+            "-v",
+            "ON_ERROR_STOP=1",
+            "-d",
+            database_url,
+            "-f",
+            str(dump_path),
+        ]
+    else:
+        args = [
+            "pg_restore",
+            "--clean",
+            "--if-exists",
+            "--no-owner",
+            "-d",
+            database_url,
+            str(dump_path),
+        ]
+    logger.info("Restoring fixture %s", dump_path)
+    subprocess.run(args, check=True)
+
+
+def format_report(report: dict[str, Any]) -> str:
+    """Render a report as a fixed-width summary table."""
+    k = report["k"]
+    lines = [
+        f"Golden set v{report['golden_version']}: {report['queries']} queries, k={k}",
+        f"Query embedding: p50 {report['embed_p50_ms']:.1f} ms, "
+        f"p95 {report['embed_p95_ms']:.1f} ms",
+        "",
+        f"{'mode':<15}{f'recall@{k}':>10}{'MRR':>8}{f'nDCG@{k}':>9}"
+        f"{'p50 ms':>9}{'p95 ms':>9}",
+    ]
+    for mode, m in report["modes"].items():
+        lines.append(
+            f"{mode:<15}{m['recall']:>10.3f}{m['mrr']:>8.3f}{m['ndcg']:>9.3f}"
+            f"{m['p50_ms']:>9.1f}{m['p95_ms']:>9.1f}"
+        )
+    return "\n".join(lines)
+
+
+__all__ = [
+    "DEFAULT_GOLDEN_PATH",
+    "MODES",
+    "GoldenQuery",
+    "GoldenSet",
+    "Judgment",
+    "ModeReport",
+    "QueryRun",
+    "build_report",
+    "diff_reports",
+    "format_report",
+    "graded_ranking",
+    "load_golden_set",
+    "ndcg_at_k",
+    "percentile",
+    "recall_at_k",
+    "reciprocal_rank",
+    "restore_fixture",
+    "run_evaluation",
+    "score_mode",
+]
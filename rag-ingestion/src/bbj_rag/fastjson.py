@@ -0,0 +1,54 @@
+"""Fast JSON encoding for API responses and SSE events.
+
+Uses orjson (a project dependency) and falls back to the standard
+library when it is missing, e.g. in an environment synced from an older
+lock file; both produce compact UTF-8 JSON.
+
+``FastJSONResponse`` lets handlers return plain dicts and lists that
+skip FastAPI's response_model validation and re-serialisation.  Routes
+keep ``response_model=`` for the OpenAPI schema; FastAPI does not
+validate a returned ``Response``.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any
+
+from fastapi.responses import Response
+
+try:
+    import orjson
+
+    _HAS_ORJSON = True
+except ImportError:  # pragma: no cover - depends on the environment
+    _HAS_ORJSON = False
+
+BACKEND = "orjson" if _HAS_ORJSON else "json"
+
+
+def dumps_bytes(obj: Any) -> bytes:
+    """Encode *obj* as compact UTF-8 JSON bytes."""
+    if _HAS_ORJSON:
+        data: bytes = orjson.dumps(obj)
+        return data
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def dumps(obj: Any) -> str:
+    """Encode *obj* as a compact JSON string (SSE ``data`` fields)."""
+    if _HAS_ORJSON:
+        return dumps_bytes(obj).decode("utf-8")
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+class FastJSONResponse(Response):
+    """JSON response rendered with ``dumps_bytes()``."""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps_bytes(content)
+
+
+__all__ = ["BACKEND", "FastJSONResponse", "dumps", "dumps_bytes"]
@@ -1,15 +1,27 @@
-"""Health check endpoint for the BBJ RAG application.
+"""Health check endpoints for the BBJ RAG application.
 
-Reports database and Ollama connectivity status with three-tier
-readiness semantics:
+``HealthMonitor`` probes the database (through the async connection
+pool), Ollama (through the shared ``AsyncClient``) and the bbjcpl
+compiler in the background every ``Settings.health_interval`` seconds
+and keeps the latest results.  The endpoints only read that snapshot,
+so they answer instantly and never block the event loop:
 
-- **healthy** (200): all checks pass
-- **degraded** (503): some checks pass, some fail
-- **unhealthy** (503): all checks fail
+- ``GET /health``: per-check detail with three-tier semantics --
+  **healthy** (200, all required checks pass), **degraded** (503, some
+  pass), **unhealthy** (503, none pass).
+- ``GET /health/live``: liveness; 200 whenever the process can serve
+  requests at all.
+- ``GET /health/ready``: readiness; 200 only when every required check
+  passes and every startup phase has finished, 503 otherwise.
 
-The database check uses the async connection pool from ``app.state``
-when available, falling back to a standalone ``psycopg.connect()`` if
-the pool is not yet initialised (early startup race).
+Startup work that runs in the background after the app starts serving
+(index loads, embedding warm-up; see ``app.lifespan``) is registered
+with ``begin_phases()`` and reported by ``finish_phase()``.  Until all
+phases finish, /health reports ``starting``.
+
+The database and Ollama checks are required.  The compiler check is
+informational: chat and MCP code validation degrade to "unavailable"
+without bbjcpl, so a missing compiler never marks the service unready.
 
 Docker HEALTHCHECK uses ``curl -f`` which fails on non-2xx responses,
 so the 503 status correctly triggers container health failure.
@@ -17,64 +29,219 @@ so the 503 status correctly triggers container health failure.
 
 from __future__ import annotations
 
-import os
+import asyncio
+import logging
+import shutil
+import time
+from collections.abc import Awaitable
+from dataclasses import dataclass
 from typing import Any
 
-import httpx
-import psycopg
 from fastapi import APIRouter, Request
 from fastapi.responses import JSONResponse
+from ollama import AsyncClient as OllamaAsyncClient
+from psycopg_pool import AsyncConnectionPool
+
+from bbj_rag.compiler import get_default_pool
+
+logger = logging.getLogger(__name__)
+
+REQUIRED_CHECKS = ("database", "ollama")
+
+
+@dataclass(frozen=True, slots=True)
+class ProbeResult:
+    """Outcome of one probe: ``ok``, ``unavailable`` or ``error: ...``."""
+
+    status: str
+    latency_ms: float
+    checked_at: float
+
+    @property
+    def ok(self) -> bool:
+        return self.status == "ok"
+
+
+class HealthMonitor:
+    """Background prober that caches dependency health.
+
+    Usage::
+
+        monitor = HealthMonitor(pool, ollama_client, compiler_path="bbjcpl")
+        monitor.begin_phases("embedding_warmup")
+        await monitor.start()   # probes run in the background
+        ...
+        monitor.finish_phase("embedding_warmup")
+        monitor.snapshot()      # latest ProbeResult per check
+        await monitor.close()
+    """
+
+    def __init__(
+        self,
+        pool: AsyncConnectionPool[Any],
+        ollama_client: OllamaAsyncClient,
+        *,
+        compiler_path: str = "bbjcpl",
+        interval: float = 15.0,
+        timeout: float = 5.0,
+    ) -> None:
+        self.pool = pool
+        self.ollama_client = ollama_client
+        self.compiler_path = compiler_path
+        self.interval = interval
+        self.timeout = timeout
+        self._results: dict[str, ProbeResult] = {}
+        self._phases: dict[str, str] = {}
+        self._task: asyncio.Task[None] | None = None
+
+    async def start(self) -> None:
+        """Start probing in the background (first round immediately)."""
+        if self._task is not None:
+            return
+        self._task = asyncio.create_task(self._loop(), name="health-monitor")
+
+    async def close(self) -> None:
+        """Stop the background probe task."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def snapshot(self) -> dict[str, ProbeResult]:
+        """Return the latest result per check (empty before the first probe)."""
+        return dict(self._results)
+
+    def begin_phases(self, *names: str) -> None:
+        """Register startup phases that must finish before readiness."""
+        for name in names:
+            self._phases[name] = "pending"
+
+    def finish_phase(self, name: str, status: str = "ok") -> None:
+        """Record a startup phase outcome (``ok`` or ``error: ...``)."""
+        self._phases[name] = status
+
+    def phases(self) -> dict[str, str]:
+        """Return the status of every registered startup phase."""
+        return dict(self._phases)
+
+    def starting(self) -> bool:
+        """True while any startup phase is still pending."""
+        return any(status == "pending" for status in self._phases.values())
+
+    def ready(self) -> bool:
+        """True when startup finished and every required check passed."""
+        return not self.starting() and all(
+            name in self._results and self._results[name].ok for name in REQUIRED_CHECKS
+        )
+
+    async def probe(self) -> dict[str, ProbeResult]:
+        """Probe all dependencies concurrently and store the results."""
+        names = ("database", "ollama", "compiler")
+        results = await asyncio.gather(
+            self._timed(self._check_database()),
+            self._timed(self._check_ollama()),
+            self._timed(self._check_compiler()),
+        )
+        self._results = dict(zip(names, results, strict=True))
+        return self.snapshot()
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                await self.probe()
+            except Exception:
+                logger.exception("Health probe round failed")
+            await asyncio.sleep(self.interval)
+
+    async def _timed(self, check: Awaitable[str]) -> ProbeResult:
+        start = time.perf_counter()
+        try:
+            status = await asyncio.wait_for(check, timeout=self.timeout)
+        except TimeoutError:
+            status = f"error: timed out after {self.timeout:.1f}s"
+        except Exception as exc:
+            status = f"error: {exc}"
+        return ProbeResult(
+            status=status,
+            latency_ms=round((time.perf_counter() - start) * 1000, 1),
+            checked_at=time.time(),
+        )
+
+    async def _check_database(self) -> str:
+        async with self.pool.connection(timeout=self.timeout) as conn:
+            await conn.execute("SELECT 1")
+        return "ok"
+
+    async def _check_ollama(self) -> str:
+        await self.ollama_client.list()
+        return "ok"
+
+    async def _check_compiler(self) -> str:
+        if shutil.which(self.compiler_path) is None:
+            return "unavailable"
+        pool = get_default_pool()
+        if pool is not None and not pool.running:
+            return "error: compiler pool stopped"
+        return "ok"
+
+
+def _monitor(request: Request) -> HealthMonitor | None:
+    return getattr(request.app.state, "health_monitor", None)
 
-from bbj_rag.config import Settings
 
 router = APIRouter()
 
 
 @router.get("/health")
 async def health(request: Request) -> JSONResponse:
-    """Check database and Ollama connectivity."""
-    checks: dict[str, str] = {}
-
-    # -- Database check (prefer pool, fallback to standalone connect) --
-    try:
-        pool = getattr(request.app.state, "pool", None)
-        if pool is not None:
-            async with pool.connection() as conn:
-                await conn.execute("SELECT 1")
-        else:
-            # Fallback for early startup before pool initialisation
-            settings = Settings()
-            sync_conn = psycopg.connect(
-                host=settings.db_host,
-                port=settings.db_port,
-                user=settings.db_user,
-                password=settings.db_password,
-                dbname=settings.db_name,
-            )
-            sync_conn.execute("SELECT 1")
-            sync_conn.close()
-        checks["database"] = "ok"
-    except Exception as exc:
-        checks["database"] = f"error: {exc}"
-
-    # -- Ollama check --
-    ollama_host = os.environ.get("OLLAMA_HOST", "http://127.0.0.1:11434")
-    try:
-        async with httpx.AsyncClient() as client:
-            resp = await client.get(f"{ollama_host}/api/tags", timeout=5.0)
-            resp.raise_for_status()
-        checks["ollama"] = "ok"
-    except Exception as exc:
-        checks["ollama"] = f"error: {exc}"
-
-    # -- Three-tier readiness semantics --
-    ok_count = sum(1 for v in checks.values() if v == "ok")
-    if ok_count == len(checks):
+    """Report the latest cached database, Ollama and compiler checks."""
+    monitor = _monitor(request)
+    results = monitor.snapshot() if monitor is not None else {}
+    phases = monitor.phases() if monitor is not None else {}
+    if not results:
+        return JSONResponse(
+            content={"status": "starting", "checks": {}, "startup": phases},
+            status_code=503,
+        )
+
+    checks = {name: r.status for name, r in results.items()}
+    ok_count = sum(1 for name in REQUIRED_CHECKS if results[name].ok)
+    if monitor is not None and monitor.starting():
+        status, status_code = "starting", 503
+    elif ok_count == len(REQUIRED_CHECKS):
         status, status_code = "healthy", 200
     elif ok_count > 0:
         status, status_code = "degraded", 503
     else:
         status, status_code = "unhealthy", 503
 
-    result: dict[str, Any] = {"status": status, "checks": checks}
+    result: dict[str, Any] = {
+        "status": status,
+        "checks": checks,
+        "latency_ms": {name: r.latency_ms for name, r in results.items()},
+        "checked_at": min(r.checked_at for r in results.values()),
+        "startup": phases,
+    }
     return JSONResponse(content=result, status_code=status_code)
+
+
+@router.get("/health/live")
+async def live() -> JSONResponse:
+    """Liveness: the process is up and its event loop is responsive."""
+    return JSONResponse(content={"status": "alive"})
+
+
+@router.get("/health/ready")
+async def ready(request: Request) -> JSONResponse:
+    """Readiness: every required dependency passed its latest probe."""
+    monitor = _monitor(request)
+    if monitor is None or not monitor.ready():
+        return JSONResponse(content={"status": "not ready"}, status_code=503)
+    return JSONResponse(content={"status": "ready"})
+
+
+__all__ = ["REQUIRED_CHECKS", "HealthMonitor", "ProbeResult", "router"]
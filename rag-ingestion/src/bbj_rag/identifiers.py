@@ -0,0 +1,263 @@
+"""In-memory identifier index for BBj API-name autocomplete.
+
+Collects class names and method names from JavaDoc reference cards
+(``bbj_api://`` chunks) plus Flare topic titles (``flare://`` chunks)
+into a sorted prefix index.  Lookups are a binary search over lowercased
+keys, so completions never touch Ollama or the database after the index
+has been loaded once at startup.
+
+The same index backs the search fast path: ``is_identifier_query()``
+recognises single-identifier queries (``BBjWindow``, ``addButton``,
+``BBjWindow::addButton``) and ``IdentifierIndex.lookup()`` resolves them
+to their defining documents without an embedding call.
+"""
+
+from __future__ import annotations
+
+import bisect
+import heapq
+import logging
+import re
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass
+from typing import Any
+
+import psycopg
+
+logger = logging.getLogger(__name__)
+
+# JavaDoc reference cards list methods as "- `addButton(p_id, ...)` - ..."
+# (see parsers/javadoc.py::_format_method_line).
+_METHOD_LINE_RE = re.compile(r"^- `(\w+)\(", re.MULTILINE)
+
+_API_PREFIX = "bbj_api://"
+_FLARE_PREFIX = "flare://"
+
+# Kind ordering for ranking: classes first, then methods, then topics.
+_KIND_RANK: dict[str, int] = {"class": 0, "method": 1, "topic": 2}
+
+# Sorts after every key sharing a prefix; bounds the prefix range
+_MAX_CHAR = chr(0x10FFFF)
+
+# Prefixes up to this length cover most of the index; their top
+# completions are ranked once and reused (the index is immutable).
+_SHORT_PREFIX = 2
+_SHORT_PREFIX_TOP = 50
+
+# A single identifier, optionally qualified (Class::member or Class.member)
+# and optionally followed by an empty call suffix: BBjWindow, addButton(),
+# BBjWindow::addButton, BBjWindow.addButton().
+_IDENTIFIER_QUERY_RE = re.compile(
+    r"^[A-Za-z_]\w*(?:(?:::|\.)[A-Za-z_]\w*)?(?:\(\))?$",
+)
+
+# Shorter tokens ("on", "if") are too ambiguous to pin.
+_MIN_IDENTIFIER_LENGTH = 3
+
+_IDENTIFIER_SQL = (
+    "SELECT source_url, title, display_url, "
+    "CASE WHEN source_url LIKE %s THEN content ELSE '' END "
+    "FROM chunks "
+    "WHERE source_url LIKE %s OR source_url LIKE %s"
+)
+
+
+@dataclass(frozen=True, slots=True)
+class Identifier:
+    """A completable API name or topic title.
+
+    Attributes:
+        name: Display label (e.g. ``BBjWindow`` or ``addButton``).
+        kind: One of ``class``, ``method`` or ``topic``.
+        owner: Owning class for methods, empty otherwise.
+        source_url: Internal source URL of the defining document.
+        url: User-facing URL (display_url, or source_url as fallback).
+    """
+
+    name: str
+    kind: str
+    owner: str
+    source_url: str
+    url: str
+
+
+def _normalize_identifier(query: str) -> str:
+    """Lowercase *query*, drop a trailing ``()`` and unify ``.`` to ``::``."""
+    name = query.strip().lower().removesuffix("()")
+    return name.replace(".", "::")
+
+
+def is_identifier_query(query: str) -> bool:
+    """Return True if *query* is a single API identifier rather than prose."""
+    stripped = query.strip()
+    return len(stripped) >= _MIN_IDENTIFIER_LENGTH and bool(
+        _IDENTIFIER_QUERY_RE.match(stripped)
+    )
+
+
+def _keys_for(identifier: Identifier) -> list[str]:
+    """Return the lowercased lookup keys for an identifier.
+
+    Flare method topics are titled ``BBjWindow::addButton``; they are
+    indexed under both the full title and the bare method name so that
+    typing either form completes them.
+    """
+    name = identifier.name.lower()
+    keys = [name]
+    if "::" in name:
+        member = name.split("::", 1)[1].strip()
+        if member:
+            keys.append(member)
+    return keys
+
+
+class IdentifierIndex:
+    """Sorted prefix index over API identifiers.
+
+    Usage::
+
+        index = IdentifierIndex(identifiers)
+        index.complete("addBut", limit=5)
+    """
+
+    def __init__(self, identifiers: Iterable[Identifier] = ()) -> None:
+        unique: dict[tuple[str, str, str, str], Identifier] = {}
+        for ident in identifiers:
+            unique.setdefault(
+                (ident.kind, ident.owner, ident.name, ident.source_url), ident
+            )
+        self._entries: list[Identifier] = list(unique.values())
+
+        pairs = sorted(
+            (key, slot)
+            for slot, ident in enumerate(self._entries)
+            for key in _keys_for(ident)
+        )
+        self._keys: list[str] = [key for key, _ in pairs]
+        self._slots: list[int] = [slot for _, slot in pairs]
+        # Completion rank per slot (exact matches aside), computed once
+        self._rank: list[tuple[int, int, str]] = [
+            (_KIND_RANK.get(i.kind, len(_KIND_RANK)), len(i.name), i.name.lower())
+            for i in self._entries
+        ]
+        self._short_top: dict[str, list[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def lookup(self, query: str) -> list[Identifier]:
+        """Return identifiers whose name equals *query* (case-insensitive).
+
+        ``Class::member`` and ``Class.member`` forms match Flare topics
+        with that exact title plus JavaDoc methods named ``member`` on
+        ``Class``.  Results are ordered classes, methods, then topics.
+        """
+        needle = _normalize_identifier(query)
+        if not needle:
+            return []
+
+        owner = ""
+        if "::" in needle:
+            owner, needle_member = needle.split("::", 1)
+        else:
+            needle_member = needle
+
+        matches: list[Identifier] = []
+        seen: set[int] = set()
+        for key in dict.fromkeys((needle, needle_member)):
+            pos = bisect.bisect_left(self._keys, key)
+            while pos < len(self._keys) and self._keys[pos] == key:
+                slot = self._slots[pos]
+                ident = self._entries[slot]
+                pos += 1
+                if slot in seen:
+                    continue
+                if owner and ident.kind == "method":
+                    if ident.owner.lower() != owner:
+                        continue
+                elif owner and ident.name.lower() != needle:
+                    continue
+                seen.add(slot)
+                matches.append(ident)
+
+        matches.sort(key=lambda i: _KIND_RANK.get(i.kind, len(_KIND_RANK)))
+        return matches
+
+    def complete(self, prefix: str, limit: int = 10) -> list[Identifier]:
+        """Return up to *limit* identifiers whose name starts with *prefix*.
+
+        Matching is case-insensitive.  Results are ranked exact match
+        first, then classes before methods before topics, then shorter
+        names first, then alphabetically.  The whole prefix range is
+        ranked (a bounded heap), so short prefixes such as ``"b"`` are
+        not cut off alphabetically before ranking.
+        """
+        needle = prefix.strip().lower()
+        if not needle or limit <= 0:
+            return []
+        if len(needle) <= _SHORT_PREFIX and limit <= _SHORT_PREFIX_TOP:
+            top = self._short_top.get(needle)
+            if top is None:
+                top = self._short_top[needle] = self._top(needle, _SHORT_PREFIX_TOP)
+            return [self._entries[slot] for slot in top[:limit]]
+        return [self._entries[slot] for slot in self._top(needle, limit)]
+
+    def _top(self, needle: str, limit: int) -> list[int]:
+        """Slots of the *limit* best completions of lowercased *needle*."""
+        start = bisect.bisect_left(self._keys, needle)
+        exact_end = bisect.bisect_right(self._keys, needle, lo=start)
+        end = bisect.bisect_left(self._keys, needle + _MAX_CHAR, lo=exact_end)
+
+        rank = self._rank.__getitem__
+        exact = sorted(set(self._slots[start:exact_end]), key=rank)[:limit]
+        rest = set(self._slots[exact_end:end]).difference(exact)
+        return exact + heapq.nsmallest(limit - len(exact), rest, key=rank)
+
+
+def identifiers_from_rows(rows: Iterable[Sequence[Any]]) -> list[Identifier]:
+    """Build identifiers from ``(source_url, title, display_url, content)`` rows.
+
+    ``bbj_api://`` rows contribute the class name (title) plus every
+    method listed in the reference card content.  ``flare://`` rows
+    contribute their topic title.  Other rows are ignored.
+    """
+    identifiers: list[Identifier] = []
+    for row in rows:
+        source_url, title, display_url, content = (str(v or "") for v in row[:4])
+        url = display_url or source_url
+        if not title:
+            continue
+
+        if source_url.startswith(_API_PREFIX):
+            identifiers.append(Identifier(title, "class", "", source_url, url))
+            for method in _METHOD_LINE_RE.findall(content):
+                identifiers.append(Identifier(method, "method", title, source_url, url))
+        elif source_url.startswith(_FLARE_PREFIX):
+            identifiers.append(Identifier(title, "topic", "", source_url, url))
+
+    return identifiers
+
+
+async def load_identifier_index(
+    conn: psycopg.AsyncConnection[Any],
+) -> IdentifierIndex:
+    """Load an IdentifierIndex from the ``bbj_api://`` and ``flare://`` chunks."""
+    async with conn.cursor() as cur:
+        await cur.execute(
+            _IDENTIFIER_SQL,
+            (f"{_API_PREFIX}%", f"{_API_PREFIX}%", f"{_FLARE_PREFIX}%"),
+        )
+        rows = await cur.fetchall()
+
+    index = IdentifierIndex(identifiers_from_rows(rows))
+    logger.info("Identifier index loaded: %d entries", len(index))
+    return index
+
+
+__all__ = [
+    "Identifier",
+    "IdentifierIndex",
+    "identifiers_from_rows",
+    "is_identifier_query",
+    "load_identifier_index",
+]
@@ -20,6 +20,7 @@ from typing import Any
 
 import click
 
+from bbj_rag.chat.answer_cache import bump_corpus_version
 from bbj_rag.chunker import chunk_document
 from bbj_rag.config import Settings
 from bbj_rag.db import get_connection_from_settings
@@ -28,6 +29,8 @@ from bbj_rag.intelligence import (
     build_context_header,
     classify_doc_type,
     extract_heading_hierarchy,
+    refresh_corpus_stats,
+    refresh_synonyms,
     tag_generation,
 )
 from bbj_rag.models import Chunk
@@ -93,6 +96,50 @@ def _clean_source_chunks(conn: Any, prefix: str) -> int:
     return count
 
 
+# ---------------------------------------------------------------------------
+# Post-ingest refresh
+# ---------------------------------------------------------------------------
+
+
+def _refresh_derived_tables(settings: Settings) -> None:
+    """Rebuild tables derived from the chunks table after ingestion.
+
+    Currently the query synonym dictionary, the precomputed corpus
+    statistics behind /stats, and the corpus version that invalidates
+    cached chat answers.  Failures are reported but do not fail the run;
+    the API keeps serving the previous data.
+    """
+    try:
+        conn = get_connection_from_settings(settings)
+    except Exception as exc:
+        logger.exception("Derived table refresh failed")
+        click.echo(f"WARNING: Derived table refresh failed: {exc}", err=True)
+        return
+    try:
+        try:
+            count = refresh_synonyms(conn)
+            click.echo(f"Query synonyms refreshed: {count} terms")
+        except Exception as exc:
+            conn.rollback()
+            logger.exception("Synonym refresh failed")
+            click.echo(f"WARNING: Query synonym refresh failed: {exc}", err=True)
+        try:
+            stats = refresh_corpus_stats(conn)
+            click.echo(f"Corpus statistics refreshed: {stats.total:,} chunks")
+        except Exception as exc:
+            conn.rollback()
+            logger.exception("Corpus statistics refresh failed")
+            click.echo(f"WARNING: Corpus statistics refresh failed: {exc}", err=True)
+        try:
+            bump_corpus_version(conn)
+        except Exception as exc:
+            conn.rollback()
+            logger.exception("Corpus version bump failed")
+            click.echo(f"WARNING: Corpus version bump failed: {exc}", err=True)
+    finally:
+        conn.close()
+
+
 # ---------------------------------------------------------------------------
 # Parser factory
 # ---------------------------------------------------------------------------
@@ -665,6 +712,9 @@ def ingest_all(
     # ---- 9. Print summary table ----
     _print_summary_table(results, failures, mode_label)
 
+    # ---- 9b. Rebuild derived tables (non-fatal) ----
+    _refresh_derived_tables(settings)
+
     # ---- 10. Exit code ----
     if failures:
         click.echo(
@@ -8,18 +8,24 @@ from bbj_rag.intelligence.context_headers import (
     build_context_header,
     extract_heading_hierarchy,
 )
+from bbj_rag.intelligence.corpus_stats import CorpusStats, refresh_corpus_stats
 from bbj_rag.intelligence.doc_types import DocType, classify_doc_type
 from bbj_rag.intelligence.generations import Generation, tag_generation
 from bbj_rag.intelligence.report import build_report, print_quality_report, print_report
+from bbj_rag.intelligence.synonyms import SynonymMap, refresh_synonyms
 
 __all__ = [
+    "CorpusStats",
     "DocType",
     "Generation",
+    "SynonymMap",
     "build_context_header",
     "build_report",
     "classify_doc_type",
     "extract_heading_hierarchy",
     "print_quality_report",
     "print_report",
+    "refresh_corpus_stats",
+    "refresh_synonyms",
     "tag_generation",
 ]
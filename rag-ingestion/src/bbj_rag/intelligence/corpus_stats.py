@@ -0,0 +1,163 @@
+"""Precomputed corpus statistics shared by /stats and the quality report.
+
+Counting chunks by doc_type, source and generation needs full scans of
+the chunks table (the generation breakdown also unnests every array).
+``refresh_corpus_stats()`` runs those aggregates once after each ingest
+and stores the results in the small ``corpus_stats`` table, one row per
+(dimension, key).  Readers load that table instead:
+
+- ``GET /stats`` through ``async_load_corpus_stats()`` plus an
+  in-process ``StatsCache`` with a TTL, so polling dashboards cost one
+  dictionary lookup per request;
+- ``bbj-rag report`` (``intelligence.report``) through
+  ``load_corpus_stats()``.
+
+Databases that predate the table, or have not been ingested since,
+fall back to computing the same aggregates live.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from collections import Counter
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass, field
+from typing import Any
+
+import psycopg
+
+logger = logging.getLogger(__name__)
+
+DIMENSIONS = ("total", "source", "doc_type", "generation")
+
+# Source family derived from the source_url scheme/host
+_SOURCE_CASE_SQL = """
+    CASE
+        WHEN source_url LIKE 'flare://%' THEN 'flare'
+        WHEN source_url LIKE '%basis.cloud/advantage%' THEN 'advantage'
+        WHEN source_url LIKE '%basis.cloud/knowledge%' THEN 'kb'
+        WHEN source_url LIKE 'pdf://%' THEN 'pdf'
+        WHEN source_url LIKE 'file://%' THEN 'bbj-source'
+        WHEN source_url LIKE 'dwc-course://%' THEN 'mdx'
+        WHEN source_url LIKE 'mdx-%://%' THEN 'mdx'
+        WHEN source_url LIKE '%documentation.basis.cloud%' THEN 'web-crawl'
+        ELSE 'unknown'
+    END
+"""
+
+# All breakdowns as (dimension, key, count) rows
+_AGGREGATE_SQL = f"""
+    SELECT 'total', '', count(*) FROM chunks
+    UNION ALL
+    SELECT 'source', src, count(*)
+    FROM (SELECT {_SOURCE_CASE_SQL} AS src FROM chunks) AS s
+    GROUP BY src
+    UNION ALL
+    SELECT 'doc_type', doc_type, count(*) FROM chunks GROUP BY doc_type
+    UNION ALL
+    SELECT 'generation', g, count(*)
+    FROM chunks, unnest(generations) AS g
+    GROUP BY g
+"""
+
+_LOAD_SQL = "SELECT dimension, key, count FROM corpus_stats"
+
+
+@dataclass(frozen=True, slots=True)
+class CorpusStats:
+    """Chunk counts overall and per source family, doc_type and generation.
+
+    Breakdowns are ordered by descending count.
+    """
+
+    total: int = 0
+    by_source: dict[str, int] = field(default_factory=dict)
+    by_doc_type: dict[str, int] = field(default_factory=dict)
+    by_generation: dict[str, int] = field(default_factory=dict)
+
+
+def stats_from_rows(rows: Iterable[Sequence[Any]]) -> CorpusStats:
+    """Build CorpusStats from ``(dimension, key, count)`` rows."""
+    total = 0
+    counters: dict[str, Counter[str]] = {d: Counter() for d in DIMENSIONS[1:]}
+    for dimension, key, count in rows:
+        if dimension == "total":
+            total = int(count)
+        elif dimension in counters:
+            counters[str(dimension)][str(key)] = int(count)
+    return CorpusStats(
+        total=total,
+        by_source=dict(counters["source"].most_common()),
+        by_doc_type=dict(counters["doc_type"].most_common()),
+        by_generation=dict(counters["generation"].most_common()),
+    )
+
+
+def refresh_corpus_stats(conn: psycopg.Connection[Any]) -> CorpusStats:
+    """Recompute the ``corpus_stats`` table from the chunks table.
+
+    Runs in a single transaction so readers never observe a partial
+    table.  Returns the new statistics.
+    """
+    with conn.cursor() as cur:
+        cur.execute("DELETE FROM corpus_stats")
+        cur.execute(
+            "INSERT INTO corpus_stats (dimension, key, count) " + _AGGREGATE_SQL
+        )
+        cur.execute(_LOAD_SQL)
+        stats = stats_from_rows(cur.fetchall())
+    conn.commit()
+    logger.info("Corpus statistics refreshed: %d chunks", stats.total)
+    return stats
+
+
+def load_corpus_stats(conn: psycopg.Connection[Any]) -> CorpusStats:
+    """Load precomputed statistics, aggregating live if none are stored."""
+    with conn.cursor() as cur:
+        cur.execute(_LOAD_SQL)
+        rows = cur.fetchall()
+        if not rows:
+            cur.execute(_AGGREGATE_SQL)
+            rows = cur.fetchall()
+    return stats_from_rows(rows)
+
+
+async def async_load_corpus_stats(conn: psycopg.AsyncConnection[Any]) -> CorpusStats:
+    """Async variant of ``load_corpus_stats()`` for the API."""
+    async with conn.cursor() as cur:
+        await cur.execute(_LOAD_SQL)
+        rows = await cur.fetchall()
+        if not rows:
+            logger.info("corpus_stats is empty; aggregating chunks live")
+            await cur.execute(_AGGREGATE_SQL)
+            rows = await cur.fetchall()
+    return stats_from_rows(rows)
+
+
+class StatsCache:
+    """Single-entry TTL cache for the API's CorpusStats."""
+
+    def __init__(self, ttl: float) -> None:
+        self.ttl = ttl
+        self._stats: CorpusStats | None = None
+        self._expires = 0.0
+
+    def get(self) -> CorpusStats | None:
+        if self._stats is None or self._expires < time.monotonic():
+            return None
+        return self._stats
+
+    def put(self, stats: CorpusStats) -> None:
+        self._stats = stats
+        self._expires = time.monotonic() + self.ttl
+
+
+__all__ = [
+    "CorpusStats",
+    "StatsCache",
+    "async_load_corpus_stats",
+    "load_corpus_stats",
+    "refresh_corpus_stats",
+    "stats_from_rows",
+]
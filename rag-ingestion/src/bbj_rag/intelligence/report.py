@@ -3,8 +3,8 @@
 Prints and builds structured reports showing generation distribution,
 deprecated/superseded counts, and untagged document counts.
 
-Also provides post-ingestion quality reporting via database queries:
-chunk distributions by source, generation, and document type with
+Also provides post-ingestion quality reporting from the ``corpus_stats``
+table: chunk distributions by source, generation, and document type with
 automated anomaly warnings.
 """
 
@@ -16,6 +16,7 @@ from typing import Any
 import click
 import psycopg
 
+from bbj_rag.intelligence.corpus_stats import load_corpus_stats
 from bbj_rag.intelligence.generations import Generation
 from bbj_rag.models import Document
 
@@ -108,66 +109,12 @@ def print_report(documents: list[Document]) -> None:
 def _query_report_data(
     conn: psycopg.Connection[object],
 ) -> tuple[dict[str, int], dict[str, int], dict[str, int], int]:
-    """Query chunk distribution from the database.
+    """Read chunk distribution from the precomputed ``corpus_stats`` table.
 
     Returns (by_source, by_generation, by_doc_type, total).
     """
-    with conn.cursor() as cur:
-        # Total count
-        cur.execute("SELECT COUNT(*) FROM chunks")
-        row = cur.fetchone()
-        total = int(row[0]) if row else 0  # type: ignore[index]
-
-        # By source (derived from source_url prefix)
-        cur.execute("""
-            SELECT
-                CASE
-                    WHEN source_url LIKE 'flare://%%' THEN 'flare'
-                    WHEN source_url LIKE '%%basis.cloud/advantage%%' THEN 'advantage'
-                    WHEN source_url LIKE '%%basis.cloud/knowledge%%' THEN 'kb'
-                    WHEN source_url LIKE 'pdf://%%' THEN 'pdf'
-                    WHEN source_url LIKE 'file://%%' THEN 'bbj-source'
-                    WHEN source_url LIKE 'dwc-course://%%' THEN 'mdx'
-                    WHEN source_url LIKE 'mdx-%%://%%' THEN 'mdx'
-                    WHEN source_url LIKE '%%documentation.basis.cloud%%'
-                        THEN 'web-crawl'
-                    ELSE 'unknown'
-                END AS source,
-                COUNT(*) AS cnt
-            FROM chunks
-            GROUP BY source
-            ORDER BY cnt DESC
-        """)
-        by_source = {
-            str(r[0]): int(r[1])  # type: ignore[index]
-            for r in cur.fetchall()
-        }
-
-        # By generation (unnest array)
-        cur.execute("""
-            SELECT g, COUNT(*) AS cnt
-            FROM chunks, unnest(generations) AS g
-            GROUP BY g
-            ORDER BY cnt DESC
-        """)
-        by_generation = {
-            str(r[0]): int(r[1])  # type: ignore[index]
-            for r in cur.fetchall()
-        }
-
-        # By doc_type
-        cur.execute("""
-            SELECT doc_type, COUNT(*) AS cnt
-            FROM chunks
-            GROUP BY doc_type
-            ORDER BY cnt DESC
-        """)
-        by_doc_type = {
-            str(r[0]): int(r[1])  # type: ignore[index]
-            for r in cur.fetchall()
-        }
-
-    return by_source, by_generation, by_doc_type, total
+    stats = load_corpus_stats(conn)
+    return stats.by_source, stats.by_generation, stats.by_doc_type, stats.total
 
 
 def _check_anomalies(
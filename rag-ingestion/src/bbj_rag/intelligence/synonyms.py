@@ -0,0 +1,277 @@
+"""Query expansion from a precomputed synonym and mnemonic dictionary.
+
+BBj users often phrase questions in legacy Visual PRO/5 and
+character-mode vocabulary ("print mask", "SETERR", "'CS' mnemonic")
+while the documentation uses the keyword, the descriptive title, or a
+modern camelCase API name.  Full-text search only matches the words
+that were typed, so those queries fall back to the dense branch alone.
+
+The dictionary is derived from the ingested corpus after every ingest:
+
+- Flare reference titles such as ``SETERR Verb - Set Error Branch`` or
+  ``'CS' Mnemonic - Clear Screen`` map the keyword to its description
+  and the description back to the keyword.  Titles without the kind
+  word (``SETERR - Set Error Branch``) are accepted when the TOC
+  breadcrumb in the context header places them under a Verbs,
+  Functions, Mnemonics or System Variables section.
+- JavaDoc method names map their split form to the identifier
+  (``add button`` -> ``addButton``).
+- A small seed of legacy terms that cannot be derived from titles.
+
+``refresh_synonyms()`` rebuilds the ``query_synonyms`` table;
+``load_synonym_map()`` reads it once at API startup into a
+``SynonymMap``.  Expansion is a dictionary lookup over the query's word
+n-grams and only touches the ``plainto_tsquery`` side of search: the
+original query keeps its AND semantics and the expansions are OR-ed in
+via ``websearch_to_tsquery``.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+from collections.abc import Iterable, Mapping, Sequence
+from dataclasses import dataclass
+from typing import Any
+
+import psycopg
+
+from bbj_rag.identifiers import identifiers_from_rows
+
+logger = logging.getLogger(__name__)
+
+# "SETERR Verb - Set Error Branch", "'CS' Mnemonic - Clear Screen",
+# "MASK() Function - Set Output Mask", "DAY System Variable - ...".
+_TITLE_RE = re.compile(
+    r"^(?P<kw>'?[A-Za-z][\w$]*'?(?:\(\))?)\s+"
+    r"(?P<kind>verb|function|mnemonic|system variable|directive|command)\s*"
+    r"[-\u2013\u2014]\s*(?P<desc>.+)$",
+    re.IGNORECASE,
+)
+
+# "SETERR - Set Error Branch" under a keyword section of the TOC.
+_BARE_TITLE_RE = re.compile(
+    r"^(?P<kw>'?[A-Z][A-Z0-9_$]*'?(?:\(\))?)\s*[-\u2013\u2014]\s*(?P<desc>.+)$"
+)
+_KEYWORD_SECTIONS = ("verbs", "functions", "mnemonics", "system variables")
+
+_CAMEL_SPLIT_RE = re.compile(r"[A-Z]?[a-z0-9]+|[A-Z]+(?![a-z])")
+_WORD_RE = re.compile(r"[a-z0-9_$]+")
+
+# Dropped from n-grams so "add a button" still hits "add button".
+_STOPWORDS = frozenset({"a", "an", "the", "to", "of", "in", "on", "for", "my"})
+
+# Descriptions longer than this are not useful as lookup phrases.
+_MAX_PHRASE_WORDS = 5
+
+# Upper bound on expansions per query; keeps the OR-ed tsquery small.
+_MAX_EXPANSIONS = 8
+
+# Legacy vocabulary that titles cannot yield.
+LEGACY_TERMS: dict[str, tuple[str, ...]] = {
+    "print mask": ("mask", "output mask"),
+    "error trap": ("seterr", "error handling"),
+    "error handler": ("seterr", "error handling"),
+    "character mode": ("terminal", "text mode"),
+    "vpro5": ("visual pro 5",),
+    "visual pro 5": ("vpro5",),
+    "web component": ("dwc",),
+    "dwc": ("dynamic web client",),
+}
+
+_SYNONYM_SOURCE_SQL = (
+    "SELECT source_url, title, context_header, "
+    "CASE WHEN source_url LIKE %s THEN content ELSE '' END "
+    "FROM chunks "
+    "WHERE source_url LIKE %s OR source_url LIKE %s"
+)
+
+
+@dataclass(frozen=True, slots=True)
+class SynonymEntry:
+    """A dictionary entry mapping a normalised term to its expansions.
+
+    Attributes:
+        term: Space-joined lowercase words (stopwords removed).
+        expansions: Alternative phrasings OR-ed into the keyword query.
+        source: Where the entry came from (``title``, ``javadoc``, ``seed``).
+    """
+
+    term: str
+    expansions: tuple[str, ...]
+    source: str
+
+
+def _words(text: str) -> list[str]:
+    """Lowercase word tokens of *text* with stopwords removed."""
+    return [w for w in _WORD_RE.findall(text.lower()) if w not in _STOPWORDS]
+
+
+def normalize_term(text: str) -> str:
+    """Return the lookup key for *text* (``"'CS'"`` -> ``"cs"``)."""
+    return " ".join(_words(text))
+
+
+def _split_camel(name: str) -> str:
+    """Split ``addButton`` into ``add button``; empty if not compound."""
+    parts = _CAMEL_SPLIT_RE.findall(name)
+    return " ".join(p.lower() for p in parts) if len(parts) > 1 else ""
+
+
+def _clean_description(desc: str) -> str:
+    desc = re.sub(r"\([^)]*\)", " ", desc)
+    return " ".join(desc.strip(" .:;").split())
+
+
+class SynonymMap:
+    """In-memory term -> expansions dictionary used at query time.
+
+    Usage::
+
+        synonyms = SynonymMap({"seterr": ["set error branch"]})
+        synonyms.expansion_query("how does SETERR work")
+        # 'set error branch'
+    """
+
+    def __init__(self, entries: Mapping[str, Iterable[str]] | None = None) -> None:
+        self._map: dict[str, tuple[str, ...]] = {}
+        for term, expansions in (entries or {}).items():
+            key = normalize_term(term)
+            if key:
+                merged = dict.fromkeys((*self._map.get(key, ()), *expansions))
+                self._map[key] = tuple(merged)
+        self._max_words = max((k.count(" ") + 1 for k in self._map), default=0)
+
+    def __len__(self) -> int:
+        return len(self._map)
+
+    def expansions(self, query: str) -> list[str]:
+        """Return expansion phrases for the word n-grams of *query*.
+
+        Longer n-grams are matched first.  Expansions whose words all
+        already occur in the query are dropped, as are duplicates; at
+        most ``_MAX_EXPANSIONS`` are returned.
+        """
+        words = _words(query)
+        if not words or not self._map:
+            return []
+        present = set(words)
+        found: dict[str, None] = {}
+        for n in range(min(self._max_words, len(words)), 0, -1):
+            for i in range(len(words) - n + 1):
+                for expansion in self._map.get(" ".join(words[i : i + n]), ()):
+                    if set(_words(expansion)) <= present:
+                        continue
+                    found.setdefault(expansion, None)
+                    if len(found) >= _MAX_EXPANSIONS:
+                        return list(found)
+        return list(found)
+
+    def expansion_query(self, query: str) -> str:
+        """Return the expansions in ``websearch_to_tsquery`` syntax.
+
+        Each expansion's words are AND-ed and expansions are OR-ed
+        (``set error branch or seterr``).  Returns an empty string when
+        nothing expands, which callers treat as "no expansion".
+        """
+        phrases = []
+        for expansion in self.expansions(query):
+            # Only plain words: quotes, '-' and the 'or' keyword are
+            # websearch operators.
+            words = [w for w in _WORD_RE.findall(expansion.lower()) if w != "or"]
+            if words:
+                phrases.append(" ".join(words))
+        return " or ".join(phrases)
+
+
+def build_synonym_entries(rows: Iterable[Sequence[Any]]) -> list[SynonymEntry]:
+    """Derive dictionary entries from ``(source_url, title, context_header,
+    content)`` rows of ``flare://`` and ``bbj_api://`` chunks.
+
+    Seed entries from ``LEGACY_TERMS`` are always included.
+    """
+    collected: dict[str, tuple[dict[str, None], str]] = {}
+
+    def add(term: str, expansion: str, source: str) -> None:
+        key = normalize_term(term)
+        if not key or not expansion or normalize_term(expansion) == key:
+            return
+        expansions, _ = collected.setdefault(key, ({}, source))
+        expansions.setdefault(expansion, None)
+
+    for term, expansions in LEGACY_TERMS.items():
+        for expansion in expansions:
+            add(term, expansion, "seed")
+
+    materialised = [tuple(str(v or "") for v in row[:4]) for row in rows]
+    for source_url, title, context_header, _content in materialised:
+        if not source_url.startswith("flare://"):
+            continue
+        match = _TITLE_RE.match(title.strip())
+        if match is None and any(
+            section in context_header.lower() for section in _KEYWORD_SECTIONS
+        ):
+            match = _BARE_TITLE_RE.match(title.strip())
+        if match is None:
+            continue
+        keyword = match.group("kw").strip("'").removesuffix("()")
+        desc = _clean_description(match.group("desc"))
+        if not desc:
+            continue
+        add(keyword, desc, "title")
+        if len(_words(desc)) <= _MAX_PHRASE_WORDS:
+            add(desc, keyword, "title")
+
+    api_rows = [(url, title, "", content) for url, title, _, content in materialised]
+    for ident in identifiers_from_rows(api_rows):
+        if ident.kind == "method":
+            split = _split_camel(ident.name)
+            if split:
+                add(split, ident.name, "javadoc")
+
+    return [
+        SynonymEntry(term, tuple(expansions), source)
+        for term, (expansions, source) in sorted(collected.items())
+    ]
+
+
+def refresh_synonyms(conn: psycopg.Connection[Any]) -> int:
+    """Rebuild the ``query_synonyms`` table from the current corpus.
+
+    Runs in a single transaction so API instances never observe a
+    half-written dictionary.  Returns the number of entries stored.
+    """
+    with conn.cursor() as cur:
+        cur.execute(_SYNONYM_SOURCE_SQL, ("bbj_api://%", "bbj_api://%", "flare://%"))
+        entries = build_synonym_entries(cur.fetchall())
+
+        cur.execute("DELETE FROM query_synonyms")
+        cur.executemany(
+            "INSERT INTO query_synonyms (term, expansions, source) VALUES (%s, %s, %s)",
+            [(e.term, list(e.expansions), e.source) for e in entries],
+        )
+    conn.commit()
+    logger.info("Query synonym dictionary refreshed: %d entries", len(entries))
+    return len(entries)
+
+
+async def load_synonym_map(conn: psycopg.AsyncConnection[Any]) -> SynonymMap:
+    """Load the ``query_synonyms`` table into a SynonymMap."""
+    async with conn.cursor() as cur:
+        await cur.execute("SELECT term, expansions FROM query_synonyms")
+        rows = await cur.fetchall()
+
+    synonyms = SynonymMap({str(term): list(exp) for term, exp in rows})
+    logger.info("Query synonym map loaded: %d terms", len(synonyms))
+    return synonyms
+
+
+__all__ = [
+    "LEGACY_TERMS",
+    "SynonymEntry",
+    "SynonymMap",
+    "build_synonym_entries",
+    "load_synonym_map",
+    "normalize_term",
+    "refresh_synonyms",
+]
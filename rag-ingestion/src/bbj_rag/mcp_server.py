@@ -10,13 +10,17 @@ and the REST API.
 
 from __future__ import annotations
 
+import functools
 import logging
 import os
 import sys
-from typing import Literal
+from typing import TYPE_CHECKING, Any, Literal
 
 import httpx
-from mcp.server.fastmcp import FastMCP
+from mcp.server.fastmcp import Context, FastMCP
+
+if TYPE_CHECKING:
+    from bbj_rag.ratelimit import Network
 
 # Configure logging to stderr ONLY (stdout is the JSON-RPC channel)
 logging.basicConfig(
@@ -29,6 +33,10 @@ logger = logging.getLogger("bbj_mcp")
 # REST API base URL (configurable via env var in claude_desktop_config.json)
 API_BASE = os.environ.get("BBJ_RAG_API_URL", "http://localhost:10800")
 
+# Rate-limit identity for stdio clients (HTTP clients are identified per
+# request, see _client_id)
+CLIENT_ID = os.environ.get("BBJ_RAG_CLIENT_ID", "")
+
 mcp = FastMCP(
     "bbj-knowledge",
     stateless_http=True,
@@ -81,11 +89,45 @@ def _format_results(data: dict[str, object]) -> str:
     return header + "\n\n" + "\n\n---\n\n".join(blocks)
 
 
+@functools.lru_cache(maxsize=1)
+def _trusted_networks() -> tuple[Network, ...]:
+    """The ``rate_limit_trusted_proxies`` networks, parsed once."""
+    from bbj_rag.config import Settings
+    from bbj_rag.ratelimit import trusted_networks
+
+    return trusted_networks(Settings())
+
+
+def _client_id(ctx: Context[Any, Any, Any] | None) -> str:
+    """Return the id the REST API should rate-limit this MCP caller by.
+
+    Over the /mcp HTTP mount every tool call reaches /search from the
+    API's own (trusted loopback) address, so the caller's identity is
+    forwarded instead: its peer address, or its X-Client-Id header when
+    it is on loopback or a configured trusted proxy, exactly as the
+    rate-limit middleware decides (see ``ratelimit.client_key``).  Over
+    stdio it is BBJ_RAG_CLIENT_ID, if set.
+    """
+    from bbj_rag.ratelimit import client_key
+
+    request = None
+    if ctx is not None:
+        try:
+            request = ctx.request_context.request
+        except ValueError:
+            request = None
+    scope = getattr(request, "scope", None)
+    if scope is not None:
+        return f"mcp:{client_key(scope, _trusted_networks())}"
+    return CLIENT_ID
+
+
 @mcp.tool()
 async def search_bbj_knowledge(
     query: str,
     generation: Literal["all", "character", "vpro5", "bbj-gui", "dwc"] | None = None,
     limit: int = 5,
+    ctx: Context[Any, Any, Any] | None = None,
 ) -> str:
     """Search BBj documentation and code examples with generation-aware filtering.
 
@@ -102,9 +144,14 @@ async def search_bbj_knowledge(
     if generation is not None and generation != "all":
         payload["generation"] = generation
 
+    client_id = _client_id(ctx)
+    headers = {"X-Client-Id": client_id} if client_id else {}
+
     try:
         async with httpx.AsyncClient(timeout=30.0) as client:
-            resp = await client.post(f"{API_BASE}/search", json=payload)
+            resp = await client.post(
+                f"{API_BASE}/search", json=payload, headers=headers
+            )
             resp.raise_for_status()
     except httpx.ConnectError:
         return (
@@ -112,6 +159,9 @@ async def search_bbj_knowledge(
             "Start it with: cd rag-ingestion && docker compose up -d"
         )
     except httpx.HTTPStatusError as exc:
+        if exc.response.status_code == 429:
+            retry = exc.response.headers.get("Retry-After", "a few")
+            return f"Error: rate limit exceeded; retry in {retry} seconds."
         return f"Error: REST API returned {exc.response.status_code}"
 
     return _format_results(resp.json())
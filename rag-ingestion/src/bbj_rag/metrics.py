@@ -0,0 +1,377 @@
+"""Per-stage latency metrics exposed in Prometheus text format.
+
+Request handlers wrap each stage (embedding, pool checkout, SQL,
+reranking, Claude calls, code validation) in ``stage_timer()``.  The
+timings accumulate on a per-request ``RequestTimings`` object carried in
+a context variable, and ``MetricsMiddleware`` flushes them into
+histograms when the response finishes, labelled with low-cardinality
+request labels (endpoint, generation filter present, cache hit).
+
+``GET /metrics`` renders all histograms in the Prometheus text
+exposition format, followed by the API connection pool statistics
+(open, idle and waiting connections, checkout counts, wait and usage
+totals, failed checkouts including timeouts).  When
+``Settings.metrics_server_timing`` is enabled the middleware also adds a
+``Server-Timing`` header carrying the same per-stage breakdown, for
+ad-hoc debugging from browser dev tools or ``curl -i``.
+
+The registry is deliberately small and dependency-free; it is confined
+to the event loop of a single process.
+"""
+
+from __future__ import annotations
+
+import bisect
+import time
+from collections.abc import Iterator, Mapping, Sequence
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any
+
+from fastapi import APIRouter, Request
+from fastapi.responses import PlainTextResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Seconds; spans sub-millisecond pool checkouts up to slow Claude calls.
+DEFAULT_BUCKETS: tuple[float, ...] = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+
+# Request labels attached to every observation, with their defaults.
+REQUEST_LABELS: dict[str, str] = {"generation_filter": "false", "cache": "none"}
+
+_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    """Escape a label value for the Prometheus text format."""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(pairs: Sequence[tuple[str, str]]) -> str:
+    if not pairs:
+        return ""
+    inner = ",".join(f'{k}="{_escape(v)}"' for k, v in pairs)
+    return "{" + inner + "}"
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by a fixed set of label names."""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str],
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> (per-bucket counts incl. +Inf, sum, count)
+        self._series: dict[tuple[str, ...], tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        """Record one observation for the given label values."""
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        series = self._series.get(key)
+        if series is None:
+            series = ([0] * (len(self.buckets) + 1), [0.0])
+            self._series[key] = series
+        counts, total = series
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        total[0] += value
+
+    def render(self) -> list[str]:
+        """Return the exposition lines for this histogram."""
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} histogram",
+        ]
+        for key in sorted(self._series):
+            counts, total = self._series[key]
+            base = list(zip(self.labelnames, key, strict=True))
+            cumulative = 0
+            for bound, count in zip(
+                [*(repr(b) for b in self.buckets), "+Inf"], counts, strict=True
+            ):
+                cumulative += count
+                labels = _format_labels([*base, ("le", bound)])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(base)} {total[0]}")
+            lines.append(f"{self.name}_count{_format_labels(base)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Named collection of histograms rendered together at /metrics."""
+
+    def __init__(self) -> None:
+        self._histograms: dict[str, Histogram] = {}
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str],
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        """Return the histogram called *name*, creating it on first use."""
+        existing = self._histograms.get(name)
+        if existing is not None:
+            return existing
+        hist = Histogram(name, documentation, labelnames, buckets)
+        self._histograms[name] = hist
+        return hist
+
+    def render(self) -> str:
+        """Render every registered metric in Prometheus text format."""
+        lines: list[str] = []
+        for hist in self._histograms.values():
+            lines.extend(hist.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "bbj_rag_stage_duration_seconds",
+    "Latency of individual request stages.",
+    ("endpoint", "stage", *REQUEST_LABELS),
+)
+REQUEST_SECONDS = REGISTRY.histogram(
+    "bbj_rag_request_duration_seconds",
+    "End-to-end request latency including streamed bodies.",
+    ("endpoint", "status", *REQUEST_LABELS),
+)
+
+
+@dataclass
+class RequestTimings:
+    """Stage timings and labels collected while serving one request."""
+
+    stages: list[tuple[str, float]] = field(default_factory=list)
+    labels: dict[str, str] = field(default_factory=lambda: dict(REQUEST_LABELS))
+
+    def server_timing(self, total: float) -> str:
+        """Format stages plus *total* seconds as a ``Server-Timing`` value."""
+        entries = [*self.stages, ("total", total)]
+        return ", ".join(f"{name};dur={secs * 1000:.1f}" for name, secs in entries)
+
+
+_current_timings: ContextVar[RequestTimings | None] = ContextVar(
+    "bbj_rag_request_timings", default=None
+)
+
+
+def record_stage(stage: str, seconds: float) -> None:
+    """Attach a stage duration to the current request (no-op outside one)."""
+    timings = _current_timings.get()
+    if timings is not None:
+        timings.stages.append((stage, seconds))
+
+
+def set_request_label(name: str, value: str) -> None:
+    """Set a request-level label (one of ``REQUEST_LABELS``)."""
+    timings = _current_timings.get()
+    if timings is not None and name in REQUEST_LABELS:
+        timings.labels[name] = value
+
+
+@contextmanager
+def stage_timer(stage: str) -> Iterator[None]:
+    """Time the enclosed block and record it as *stage*."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - start)
+
+
+def _endpoint_label(scope: Scope) -> str:
+    """Return the matched route template, keeping label cardinality bounded.
+
+    Mounted sub-apps (``/mcp``, ``/static``) have no route object; they are
+    labelled by their mount prefix, which Starlette records as root_path.
+    """
+    route = scope.get("route")
+    path = getattr(route, "path", None) or scope.get("root_path")
+    return str(path) if path else "unmatched"
+
+
+class MetricsMiddleware:
+    """ASGI middleware that collects per-request stage timings.
+
+    Installs a fresh ``RequestTimings`` for every HTTP request, optionally
+    adds a ``Server-Timing`` header when the response starts, and flushes
+    all timings into the histograms once the last body chunk is sent (so
+    streamed SSE responses are measured to completion).
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = _current_timings.set(timings)
+        start = time.perf_counter()
+        status = 500
+        finished = False
+
+        def finish() -> None:
+            nonlocal finished
+            if finished:
+                return
+            finished = True
+            endpoint = _endpoint_label(scope)
+            for stage, seconds in timings.stages:
+                STAGE_SECONDS.observe(
+                    seconds, endpoint=endpoint, stage=stage, **timings.labels
+                )
+            REQUEST_SECONDS.observe(
+                time.perf_counter() - start,
+                endpoint=endpoint,
+                status=f"{status // 100}xx",
+                **timings.labels,
+            )
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = int(message["status"])
+                if _server_timing_enabled(scope):
+                    value = timings.server_timing(time.perf_counter() - start)
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", value.encode("latin-1")))
+                    message = {**message, "headers": headers}
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get(
+                "more_body", False
+            ):
+                finish()
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            finish()
+            _current_timings.reset(token)
+
+
+def _server_timing_enabled(scope: Scope) -> bool:
+    app: Any = scope.get("app")
+    settings = getattr(getattr(app, "state", None), "settings", None)
+    return bool(getattr(settings, "metrics_server_timing", False))
+
+
+# psycopg_pool ``get_stats()`` keys -> (metric name, type, help).  Keys
+# ending in ``_ms`` are converted to seconds.
+_POOL_METRICS: dict[str, tuple[str, str, str]] = {
+    "pool_max": ("bbj_rag_db_pool_max", "gauge", "Configured pool maximum size."),
+    "pool_size": (
+        "bbj_rag_db_pool_connections",
+        "gauge",
+        "Open connections, idle or in use.",
+    ),
+    "pool_available": (
+        "bbj_rag_db_pool_idle_connections",
+        "gauge",
+        "Idle connections ready for checkout.",
+    ),
+    "requests_waiting": (
+        "bbj_rag_db_pool_waiting_requests",
+        "gauge",
+        "Checkouts currently waiting for a connection.",
+    ),
+    "requests_num": (
+        "bbj_rag_db_pool_requests_total",
+        "counter",
+        "Connection checkouts requested.",
+    ),
+    "requests_queued": (
+        "bbj_rag_db_pool_queued_requests_total",
+        "counter",
+        "Checkouts that had to wait for a connection.",
+    ),
+    "requests_wait_ms": (
+        "bbj_rag_db_pool_wait_seconds_total",
+        "counter",
+        "Total time spent waiting for checkouts.",
+    ),
+    "requests_errors": (
+        "bbj_rag_db_pool_request_errors_total",
+        "counter",
+        "Checkouts that failed, including pool timeouts.",
+    ),
+    "usage_ms": (
+        "bbj_rag_db_pool_usage_seconds_total",
+        "counter",
+        "Total time connections were held by requests.",
+    ),
+}
+
+
+def render_pool_stats(stats: Mapping[str, int]) -> list[str]:
+    """Return exposition lines for a psycopg_pool ``get_stats()`` mapping.
+
+    psycopg_pool omits counters that were never incremented; they are
+    rendered as 0 so every series exists from the first scrape.
+    """
+    lines: list[str] = []
+    for key, (name, kind, documentation) in _POOL_METRICS.items():
+        value: float = stats.get(key, 0)
+        if key.endswith("_ms"):
+            value /= 1000
+        lines.extend(
+            [
+                f"# HELP {name} {documentation}",
+                f"# TYPE {name} {kind}",
+                f"{name} {value}",
+            ]
+        )
+    return lines
+
+
+router = APIRouter()
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics(request: Request) -> PlainTextResponse:
+    """Expose latency histograms and pool statistics in Prometheus format."""
+    body = REGISTRY.render()
+    pool = getattr(request.app.state, "pool", None)
+    if pool is not None:
+        body += "\n".join(render_pool_stats(pool.get_stats())) + "\n"
+    return PlainTextResponse(body, media_type=_CONTENT_TYPE)
+
+
+__all__ = [
+    "REGISTRY",
+    "Histogram",
+    "MetricsMiddleware",
+    "MetricsRegistry",
+    "RequestTimings",
+    "record_stage",
+    "render_pool_stats",
+    "router",
+    "set_request_label",
+    "stage_timer",
+]
@@ -3,6 +3,13 @@
 Provides a ParallelIngestor class that processes chunks in batches using
 multiple asyncio workers, with retry logic and failure tracking for
 partial failure recovery.
+
+Database connections come from a pool whose ``configure`` hook
+registers the pgvector types once per connection (with type OIDs cached
+process-wide, see ``db.async_register_vector_types``).  Each worker
+keeps one connection for all of its batches and hands it back to the
+pool only after a failed attempt, so the next attempt starts on a clean
+connection.
 """
 
 from __future__ import annotations
@@ -14,10 +21,10 @@ from dataclasses import dataclass, field
 from pathlib import Path
 from typing import TYPE_CHECKING, Any
 
-from pgvector.psycopg import register_vector_async  # type: ignore[import-untyped]
 from psycopg import AsyncConnection
 from psycopg_pool import AsyncConnectionPool
 
+from bbj_rag.db import async_register_vector_types
 from bbj_rag.embedder import AsyncOllamaEmbedder
 
 if TYPE_CHECKING:
@@ -25,6 +32,28 @@ if TYPE_CHECKING:
     from bbj_rag.models import Chunk
 
 
+class _ConnectionLease:
+    """One pooled connection reused by a worker across batches."""
+
+    def __init__(self, pool: AsyncConnectionPool[Any]) -> None:
+        self._pool = pool
+        self._conn: AsyncConnection[Any] | None = None
+
+    async def get(self) -> AsyncConnection[Any]:
+        """Return the worker's connection, checking one out if needed."""
+        if self._conn is not None and (self._conn.closed or self._conn.broken):
+            await self.release()
+        if self._conn is None:
+            self._conn = await self._pool.getconn()
+        return self._conn
+
+    async def release(self) -> None:
+        """Return the connection to the pool (which resets or discards it)."""
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            await self._pool.putconn(conn)
+
+
 @dataclass
 class IngestResult:
     """Result of a parallel ingestion run."""
@@ -103,14 +132,13 @@ class ParallelIngestor:
         result = IngestResult()
         result_lock = asyncio.Lock()
 
-        # Create connection pool
+        # Create connection pool (pgvector registered once per connection)
         async with AsyncConnectionPool(
-            db_url, min_size=1, max_size=self._num_workers + 1
+            db_url,
+            min_size=1,
+            max_size=self._num_workers + 1,
+            configure=async_register_vector_types,
         ) as pool:
-            # Register pgvector on pool connections
-            async with pool.connection() as conn:
-                await register_vector_async(conn)
-
             # Spawn workers
             workers = [
                 asyncio.create_task(
@@ -136,40 +164,47 @@ class ParallelIngestor:
         self,
         worker_id: int,
         queue: asyncio.Queue[tuple[int, list[Chunk]]],
-        pool: AsyncConnectionPool,
+        pool: AsyncConnectionPool[Any],
         result: IngestResult,
         result_lock: asyncio.Lock,
         total_batches: int,
     ) -> None:
-        """Worker coroutine that processes batches from the queue."""
+        """Worker coroutine that processes batches from the queue.
+
+        The worker reuses one pooled connection for all of its batches.
+        """
+        lease = _ConnectionLease(pool)
         async with AsyncOllamaEmbedder(
             model=self._settings.embedding_model,
             dimensions=self._settings.embedding_dimensions,
             host=self._settings.ollama_host,
         ) as embedder:
-            while True:
-                try:
-                    batch_idx, batch = queue.get_nowait()
-                except asyncio.QueueEmpty:
-                    break
-
-                success = await self._process_batch_with_retry(
-                    worker_id=worker_id,
-                    batch_idx=batch_idx,
-                    batch=batch,
-                    embedder=embedder,
-                    pool=pool,
-                    result=result,
-                    result_lock=result_lock,
-                    total_batches=total_batches,
-                )
+            try:
+                while True:
+                    try:
+                        batch_idx, batch = queue.get_nowait()
+                    except asyncio.QueueEmpty:
+                        break
+
+                    success = await self._process_batch_with_retry(
+                        worker_id=worker_id,
+                        batch_idx=batch_idx,
+                        batch=batch,
+                        embedder=embedder,
+                        lease=lease,
+                        result=result,
+                        result_lock=result_lock,
+                        total_batches=total_batches,
+                    )
 
-                if not success:
-                    async with result_lock:
-                        result.batches_failed += 1
-                        result.failed_chunks.extend(batch)
+                    if not success:
+                        async with result_lock:
+                            result.batches_failed += 1
+                            result.failed_chunks.extend(batch)
 
-                queue.task_done()
+                    queue.task_done()
+            finally:
+                await lease.release()
 
     async def _process_batch_with_retry(
         self,
@@ -177,7 +212,7 @@ class ParallelIngestor:
         batch_idx: int,
         batch: list[Chunk],
         embedder: AsyncOllamaEmbedder,
-        pool: AsyncConnectionPool,
+        lease: _ConnectionLease,
         result: IngestResult,
         result_lock: asyncio.Lock,
         total_batches: int,
@@ -193,10 +228,9 @@ class ParallelIngestor:
                 for chunk, vector in zip(batch, vectors, strict=True):
                     chunk.embedding = vector
 
-                # Store to database
-                async with pool.connection() as conn:
-                    await register_vector_async(conn)
-                    stored = await self._bulk_insert_async(conn, batch)
+                # Store to database on the worker's connection
+                conn = await lease.get()
+                stored = await self._bulk_insert_async(conn, batch)
 
                 async with result_lock:
                     result.chunks_embedded += len(batch)
@@ -211,6 +245,9 @@ class ParallelIngestor:
                 return True
 
             except Exception as e:
+                # Retry on a fresh connection; the pool rolls back or
+                # discards the one that failed
+                await lease.release()
                 if attempt < self._retries - 1:
                     backoff = 2**attempt  # 1s, 2s, 4s
                     if self._verbose:
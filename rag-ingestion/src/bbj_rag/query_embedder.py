@@ -0,0 +1,173 @@
+"""Admission control and micro-batching for API query embeddings.
+
+Every /search and /chat/stream request embeds its query through the
+single Ollama instance.  Sent unbounded, a burst of requests makes
+Ollama thrash until all of them time out together.  ``QueryEmbedder``
+sits between the handlers and ``ollama.AsyncClient.embed()``:
+
+- **Concurrency limit**: at most ``max_concurrency`` embed calls are in
+  flight at once.
+- **Bounded queue**: at most ``max_queue`` distinct queries wait for a
+  slot; further requests fail immediately with ``EmbeddingOverloaded``
+  (the API turns that into 503 + Retry-After) instead of piling up.
+- **Micro-batching**: queries that arrive within ``batch_window``
+  seconds, or while all slots are busy, are sent as one
+  ``embed(input=[...])`` call of up to ``max_batch`` texts.
+- **Coalescing**: identical queries waiting at the same time share one
+  embedding.
+
+The dispatcher runs as a background task on the API event loop; start
+it with ``start()`` and stop it with ``close()``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections import OrderedDict
+
+from ollama import AsyncClient as OllamaAsyncClient
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingOverloaded(Exception):
+    """Raised when the embedding queue is full."""
+
+
+class QueryEmbedder:
+    """Batched, concurrency-limited query embedding via Ollama.
+
+    Usage::
+
+        embedder = QueryEmbedder(client, "qwen3-embedding:0.6b")
+        await embedder.start()
+        vector = await embedder.embed("BBjGrid sorting")
+        await embedder.close()
+    """
+
+    def __init__(
+        self,
+        client: OllamaAsyncClient,
+        model: str,
+        *,
+        max_concurrency: int = 2,
+        max_queue: int = 64,
+        max_batch: int = 16,
+        batch_window: float = 0.005,
+        timeout: float = 30.0,
+    ) -> None:
+        self.client = client
+        self.model = model
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max(1, max_queue)
+        self.max_batch = max(1, max_batch)
+        self.batch_window = batch_window
+        self.timeout = timeout
+        self._pending: OrderedDict[str, asyncio.Future[list[float]]] = OrderedDict()
+        self._wakeup = asyncio.Event()
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+        self._dispatcher: asyncio.Task[None] | None = None
+        self._batches: set[asyncio.Task[None]] = set()
+
+    @property
+    def running(self) -> bool:
+        return self._dispatcher is not None and not self._dispatcher.done()
+
+    @property
+    def queued(self) -> int:
+        """Distinct queries waiting to be sent to Ollama."""
+        return len(self._pending)
+
+    async def start(self) -> None:
+        """Start the background dispatcher (idempotent)."""
+        if not self.running:
+            self._dispatcher = asyncio.create_task(
+                self._dispatch(), name="query-embedder"
+            )
+
+    async def close(self) -> None:
+        """Stop dispatching and fail every query that has not been sent."""
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            await asyncio.gather(self._dispatcher, return_exceptions=True)
+            self._dispatcher = None
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(EmbeddingOverloaded("embedder closed"))
+                future.exception()  # mark retrieved; waiters still raise
+        self._pending.clear()
+        await asyncio.gather(*self._batches, return_exceptions=True)
+
+    async def embed(self, text: str) -> list[float]:
+        """Return the embedding for *text*, batched with concurrent queries.
+
+        Raises EmbeddingOverloaded when the queue is full, and the
+        underlying error when the Ollama call fails or times out.
+        """
+        if not self.running:
+            raise EmbeddingOverloaded("embedder not running")
+        future = self._pending.get(text)
+        if future is None:
+            if len(self._pending) >= self.max_queue:
+                raise EmbeddingOverloaded(
+                    f"{len(self._pending)} queries already waiting for Ollama"
+                )
+            future = asyncio.get_running_loop().create_future()
+            self._pending[text] = future
+            self._wakeup.set()
+        # Shielded: one caller disconnecting must not cancel a shared result
+        return await asyncio.shield(future)
+
+    async def _dispatch(self) -> None:
+        while True:
+            await self._wakeup.wait()
+            if len(self._pending) < self.max_batch and self.batch_window > 0:
+                await asyncio.sleep(self.batch_window)
+            # Queries keep accumulating while every slot is busy
+            await self._slots.acquire()
+            batch = [
+                self._pending.popitem(last=False)
+                for _ in range(min(self.max_batch, len(self._pending)))
+            ]
+            if not self._pending:
+                self._wakeup.clear()
+            if not batch:
+                self._slots.release()
+                continue
+            task = asyncio.create_task(self._embed_batch(batch))
+            self._batches.add(task)
+            task.add_done_callback(self._batch_done)
+
+    def _batch_done(self, task: asyncio.Task[None]) -> None:
+        self._batches.discard(task)
+        self._slots.release()
+
+    async def _embed_batch(
+        self, batch: list[tuple[str, asyncio.Future[list[float]]]]
+    ) -> None:
+        texts = [text for text, _ in batch]
+        try:
+            response = await asyncio.wait_for(
+                self.client.embed(model=self.model, input=texts),
+                timeout=self.timeout,
+            )
+            embeddings = list(response["embeddings"])
+            if len(embeddings) != len(texts):
+                raise RuntimeError(
+                    f"Ollama returned {len(embeddings)} embeddings "
+                    f"for {len(texts)} inputs"
+                )
+        except Exception as exc:
+            logger.warning("Query embedding batch of %d failed: %s", len(texts), exc)
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+                    future.exception()  # mark retrieved; waiters still raise
+            return
+        for (_, future), embedding in zip(batch, embeddings, strict=True):
+            if not future.done():
+                future.set_result(list(embedding))
+
+
+__all__ = ["EmbeddingOverloaded", "QueryEmbedder"]
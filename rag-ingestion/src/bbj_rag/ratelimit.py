@@ -0,0 +1,230 @@
+"""Per-client token-bucket rate limiting for the expensive API endpoints.
+
+Each limited endpoint (``POST /search`` and ``/search/stream``, which
+share one, and ``POST /chat/stream``) has its own ``RateLimiter``: one
+token bucket per client that refills at ``rate`` tokens per second up
+to ``burst``.  A request takes one token or is rejected with 429 and
+``Retry-After``.  Chat, which costs an Ollama embedding plus a Claude
+stream, gets a much lower default rate than search, so one client's
+chat burst cannot starve everyone's searches.
+
+Clients are identified by their peer address.  The ``X-Client-Id``
+header is unauthenticated, so it is honoured only from trusted peers:
+loopback (the in-process MCP tool forwards one per MCP caller) and the
+networks in ``Settings.rate_limit_trusted_proxies``.  From anyone else
+it is ignored; otherwise a caller could mint a fresh bucket per request.
+``RateLimitMiddleware`` enforces the limits and reports them in the
+``RateLimit-Limit`` / ``RateLimit-Remaining`` / ``RateLimit-Reset``
+headers (IETF draft ``RateLimit`` header fields) on every limited
+response.
+
+Buckets live in process memory, bounded by ``max_clients`` (least
+recently seen clients are evicted).  Under ``bbj-rag serve`` each worker
+enforces its share of the configured rate (see ``from_settings()``).
+"""
+
+from __future__ import annotations
+
+import ipaddress
+import math
+import time
+from collections import OrderedDict
+from collections.abc import Sequence
+from dataclasses import dataclass
+
+from fastapi.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from bbj_rag.config import Settings
+
+CLIENT_ID_HEADER = "x-client-id"
+
+# Longest accepted client id; longer values are truncated
+_MAX_CLIENT_ID = 128
+
+Network = ipaddress.IPv4Network | ipaddress.IPv6Network
+
+
+@dataclass(slots=True)
+class Decision:
+    """Outcome of one ``RateLimiter.acquire()`` call."""
+
+    allowed: bool
+    limit: int
+    remaining: int
+    reset: float  # seconds until the bucket is full again
+    retry_after: float  # seconds until the request would be allowed
+
+    def headers(self) -> dict[str, str]:
+        """RateLimit-* headers (plus Retry-After when rejected)."""
+        headers = {
+            "RateLimit-Limit": str(self.limit),
+            "RateLimit-Remaining": str(self.remaining),
+            "RateLimit-Reset": str(math.ceil(self.reset)),
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(max(1, math.ceil(self.retry_after)))
+        return headers
+
+
+class RateLimiter:
+    """Token buckets keyed by client id, refilled at ``rate`` tokens/s."""
+
+    def __init__(self, rate: float, burst: int, max_clients: int = 10_000) -> None:
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.max_clients = max(1, max_clients)
+        # client -> (tokens, last refill time); most recently seen last
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def acquire(
+        self, client: str, cost: float = 1.0, now: float | None = None
+    ) -> Decision:
+        """Take *cost* tokens from *client*'s bucket if it has enough."""
+        now = time.monotonic() if now is None else now
+        tokens, updated = self._buckets.pop(client, (float(self.burst), now))
+        tokens = min(float(self.burst), tokens + (now - updated) * self.rate)
+        allowed = tokens >= cost
+        if allowed:
+            tokens -= cost
+        self._buckets[client] = (tokens, now)
+        if len(self._buckets) > self.max_clients:
+            self._buckets.popitem(last=False)
+        return Decision(
+            allowed=allowed,
+            limit=self.burst,
+            remaining=int(tokens),
+            reset=(self.burst - tokens) / self.rate,
+            retry_after=0.0 if allowed else (cost - tokens) / self.rate,
+        )
+
+
+def from_settings(settings: Settings) -> dict[str, RateLimiter]:
+    """Build the per-path limiters configured in *settings*.
+
+    Endpoints whose rate is 0 are not limited.  Rates and bursts are
+    divided between API workers, so the whole service stays close to the
+    configured limits.
+    """
+    if not settings.rate_limit_enabled:
+        return {}
+    workers = settings.worker_count
+    limits = {
+        "/search": (settings.rate_limit_search_rate, settings.rate_limit_search_burst),
+        "/chat/stream": (settings.rate_limit_chat_rate, settings.rate_limit_chat_burst),
+    }
+    limiters = {
+        path: RateLimiter(
+            rate / workers,
+            max(1, burst // workers),
+            settings.rate_limit_max_clients,
+        )
+        for path, (rate, burst) in limits.items()
+        if rate > 0
+    }
+    # Streaming search draws from the same per-client budget as /search
+    if "/search" in limiters:
+        limiters["/search/stream"] = limiters["/search"]
+    return limiters
+
+
+def trusted_networks(settings: Settings) -> tuple[Network, ...]:
+    """Parse ``rate_limit_trusted_proxies`` (addresses or CIDR ranges)."""
+    return tuple(
+        ipaddress.ip_network(entry, strict=False)
+        for entry in settings.rate_limit_trusted_proxies
+    )
+
+
+def _is_trusted(host: str, trusted: Sequence[Network]) -> bool:
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return address.is_loopback or any(address in net for net in trusted)
+
+
+def client_key(scope: Scope, trusted: Sequence[Network] = ()) -> str:
+    """Identify the caller by peer address.
+
+    A trusted peer (loopback or one of *trusted*) may name the client it
+    acts for with ``X-Client-Id``; from other peers the header is ignored.
+    """
+    peer = scope.get("client")
+    host = str(peer[0]) if peer else ""
+    if host and _is_trusted(host, trusted):
+        for name, value in scope.get("headers", []):
+            if name == CLIENT_ID_HEADER.encode("latin-1"):
+                client_id = value.decode("latin-1").strip()[:_MAX_CLIENT_ID]
+                if client_id:
+                    return f"id:{client_id}"
+    return f"ip:{host}" if host else "ip:unknown"
+
+
+class RateLimitMiddleware:
+    """ASGI middleware enforcing ``app.state.rate_limits`` on POST requests.
+
+    ``app.state.rate_limits`` maps a request path to its ``RateLimiter``;
+    when it is missing (e.g. before startup or in tests) every request
+    passes through.  ``app.state.rate_limit_trusted`` lists the networks
+    whose ``X-Client-Id`` header is honoured besides loopback.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        limiter = _limiter_for(scope)
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        state = getattr(scope.get("app"), "state", None)
+        trusted = getattr(state, "rate_limit_trusted", ())
+        decision = limiter.acquire(client_key(scope, trusted))
+        headers = decision.headers()
+        if not decision.allowed:
+            response = JSONResponse(
+                {"detail": "Rate limit exceeded; retry later"},
+                status_code=429,
+                headers=headers,
+            )
+            await response(scope, receive, send)
+            return
+
+        raw = [
+            (k.lower().encode("latin-1"), v.encode("latin-1"))
+            for k, v in headers.items()
+        ]
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": [*message.get("headers", []), *raw]}
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
+def _limiter_for(scope: Scope) -> RateLimiter | None:
+    if scope["type"] != "http" or scope.get("method") != "POST":
+        return None
+    app = scope.get("app")
+    limits = getattr(getattr(app, "state", None), "rate_limits", None)
+    if not limits:
+        return None
+    limiter: RateLimiter | None = limits.get(scope["path"])
+    return limiter
+
+
+__all__ = [
+    "CLIENT_ID_HEADER",
+    "Decision",
+    "RateLimitMiddleware",
+    "RateLimiter",
+    "client_key",
+    "from_settings",
+    "trusted_networks",
+]
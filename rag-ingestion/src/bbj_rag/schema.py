@@ -2,11 +2,21 @@
 
 Reads and executes the standalone DDL file (sql/schema.sql) to create
 or update the pgvector schema in PostgreSQL.
+
+Every apply records a hash of the DDL under the ``schema_version`` key
+of ``corpus_meta``.  ``async_apply_schema()`` (used by API startup)
+compares that hash first and skips the DDL entirely when it matches, so
+restarts and rolling deploys cost one query instead of re-running every
+CREATE ... IF NOT EXISTS.  Applies are serialised with a transaction
+advisory lock, so several workers starting at once apply it only once.
 """
 
 from __future__ import annotations
 
+import functools
+import hashlib
 from pathlib import Path
+from typing import Any
 
 import psycopg
 
@@ -14,6 +24,26 @@ import psycopg
 _SQL_DIR = Path(__file__).resolve().parent.parent.parent / "sql"
 _SCHEMA_FILE = _SQL_DIR / "schema.sql"
 
+SCHEMA_VERSION_KEY = "schema_version"
+
+# Arbitrary application-wide key for pg_advisory_xact_lock
+_SCHEMA_LOCK_ID = 0x0BB1_5C4E
+
+_RECORD_VERSION_SQL = (
+    "INSERT INTO corpus_meta (key, value) VALUES (%s, %s) "
+    "ON CONFLICT (key) DO UPDATE SET value = EXCLUDED.value, updated_at = now()"
+)
+
+
+@functools.lru_cache(maxsize=1)
+def _schema_sql() -> str:
+    return _SCHEMA_FILE.read_text(encoding="utf-8")
+
+
+def schema_hash() -> str:
+    """Return a short hash identifying the current sql/schema.sql."""
+    return hashlib.sha256(_schema_sql().encode("utf-8")).hexdigest()[:16]
+
 
 def apply_schema(conn: psycopg.Connection[object]) -> None:
     """Read sql/schema.sql and execute it against the given connection.
@@ -22,6 +52,46 @@ def apply_schema(conn: psycopg.Connection[object]) -> None:
     The DDL uses IF NOT EXISTS / IF NOT EXISTS throughout, making it
     safe to run repeatedly (idempotent).
     """
-    sql_content = _SCHEMA_FILE.read_text(encoding="utf-8")
-    conn.execute(sql_content)
+    conn.execute(_schema_sql())
+    conn.execute(_RECORD_VERSION_SQL, (SCHEMA_VERSION_KEY, schema_hash()))
     conn.commit()
+
+
+async def _stored_version(cur: psycopg.AsyncCursor[Any]) -> str | None:
+    """Return the recorded schema version (None on a fresh database)."""
+    # corpus_meta is itself created by schema.sql
+    await cur.execute("SELECT to_regclass('corpus_meta') IS NOT NULL")
+    row = await cur.fetchone()
+    if row is None or not row[0]:
+        return None
+    await cur.execute(
+        "SELECT value FROM corpus_meta WHERE key = %s", (SCHEMA_VERSION_KEY,)
+    )
+    row = await cur.fetchone()
+    return str(row[0]) if row else None
+
+
+async def async_apply_schema(conn: psycopg.AsyncConnection[Any]) -> bool:
+    """Apply sql/schema.sql unless the stored schema version matches.
+
+    Returns True when the DDL was executed, False when it was skipped.
+    """
+    version = schema_hash()
+    async with conn.cursor() as cur:
+        if await _stored_version(cur) == version:
+            await conn.rollback()
+            return False
+
+        # Re-check under the lock: another worker may have applied it
+        await cur.execute("SELECT pg_advisory_xact_lock(%s)", (_SCHEMA_LOCK_ID,))
+        if await _stored_version(cur) == version:
+            await conn.rollback()
+            return False
+
+        await cur.execute(_schema_sql())
+        await cur.execute(_RECORD_VERSION_SQL, (SCHEMA_VERSION_KEY, version))
+    await conn.commit()
+    return True
+
+
+__all__ = ["SCHEMA_VERSION_KEY", "apply_schema", "async_apply_schema", "schema_hash"]
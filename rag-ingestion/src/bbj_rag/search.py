@@ -1,7 +1,10 @@
 """Search query functions for the BBj RAG pipeline.
 
 Provides dense vector, BM25 keyword, hybrid RRF, and generation-filtered
-retrieval against the pgvector-enabled chunks table.
+retrieval against the pgvector-enabled chunks table, plus an exact-match
+fast path that resolves single API identifiers without an embedding.
+Keyword branches accept an optional synonym expansion that is OR-ed onto
+the ``plainto_tsquery`` side (see ``bbj_rag.intelligence.synonyms``).
 """
 
 from __future__ import annotations
@@ -12,6 +15,9 @@ from typing import Any
 
 import psycopg
 
+from bbj_rag.identifiers import IdentifierIndex, is_identifier_query
+from bbj_rag.metrics import stage_timer
+
 
 @dataclass(frozen=True, slots=True)
 class SearchResult:
@@ -55,6 +61,23 @@ def _rows_to_results(rows: list[Any]) -> list[SearchResult]:
     ]
 
 
+def _keyword_tsquery(expansion: str) -> str:
+    """Return the tsquery expression for the BM25 branch.
+
+    With an *expansion* (``websearch_to_tsquery`` syntax, see
+    ``SynonymMap.expansion_query``) the synonyms are OR-ed onto the
+    plain query; without one the SQL is unchanged.
+    """
+    if expansion:
+        return "(plainto_tsquery('english', %s) || websearch_to_tsquery('english', %s))"
+    return "plainto_tsquery('english', %s)"
+
+
+def _keyword_params(query_text: str, expansion: str) -> list[object]:
+    """Return the parameters matching ``_keyword_tsquery(expansion)``."""
+    return [query_text, expansion] if expansion else [query_text]
+
+
 def dense_search(
     conn: psycopg.Connection[object],
     query_embedding: list[float],
@@ -105,35 +128,42 @@ def bm25_search(
     query_text: str,
     limit: int = 5,
     generation_filter: str | None = None,
+    expansion: str = "",
 ) -> list[SearchResult]:
     """Search chunks by BM25-style full-text keyword matching.
 
     Uses PostgreSQL's plainto_tsquery and ts_rank_cd for relevance scoring
     against the GIN-indexed search_vector tsvector column.
+    A non-empty *expansion* (synonyms from ``SynonymMap.expansion_query``)
+    is OR-ed onto the query.
     """
     if generation_filter is not None:
         sql = (
             "SELECT id, source_url, title, content, doc_type, generations, "
             "context_header, deprecated, display_url, source_type, "
             "ts_rank_cd(search_vector, query) AS score "
-            "FROM chunks, plainto_tsquery('english', %s) query "
+            "FROM chunks, " + _keyword_tsquery(expansion) + " query "
             "WHERE search_vector @@ query "
             "AND generations @> ARRAY[%s::text] "
             "ORDER BY score DESC "
             "LIMIT %s"
         )
-        params: tuple[object, ...] = (query_text, generation_filter, limit)
+        params: tuple[object, ...] = (
+            *_keyword_params(query_text, expansion),
+            generation_filter,
+            limit,
+        )
     else:
         sql = (
             "SELECT id, source_url, title, content, doc_type, generations, "
             "context_header, deprecated, display_url, source_type, "
             "ts_rank_cd(search_vector, query) AS score "
-            "FROM chunks, plainto_tsquery('english', %s) query "
+            "FROM chunks, " + _keyword_tsquery(expansion) + " query "
             "WHERE search_vector @@ query "
             "ORDER BY score DESC "
             "LIMIT %s"
         )
-        params = (query_text, limit)
+        params = (*_keyword_params(query_text, expansion), limit)
 
     with conn.cursor() as cur:
         cur.execute(sql, params)
@@ -148,6 +178,7 @@ def hybrid_search(
     query_text: str,
     limit: int = 5,
     generation_filter: str | None = None,
+    expansion: str = "",
 ) -> list[SearchResult]:
     """Search chunks using Reciprocal Rank Fusion of dense + BM25 results.
 
@@ -178,7 +209,7 @@ def hybrid_search(
         "rrf_score(rank() OVER ("
         "ORDER BY ts_rank_cd(search_vector, query) DESC"
         ")) AS rrf_score "
-        "FROM chunks, plainto_tsquery('english', %s) query "
+        "FROM chunks, " + _keyword_tsquery(expansion) + " query "
         "WHERE search_vector @@ query "
         + gen_where_bm25
         + "ORDER BY ts_rank_cd(search_vector, query) DESC "
@@ -198,7 +229,7 @@ def hybrid_search(
         params.append(generation_filter)
     params.append(query_embedding)  # for ORDER BY
     # BM25 sub-query params
-    params.append(query_text)
+    params.extend(_keyword_params(query_text, expansion))
     if generation_filter:
         params.append(generation_filter)
     # Outer limit
@@ -217,6 +248,7 @@ async def async_hybrid_search(
     query_text: str,
     limit: int = 5,
     generation_filter: str | None = None,
+    expansion: str = "",
 ) -> list[SearchResult]:
     """Async version of hybrid_search for use with AsyncConnectionPool.
 
@@ -247,7 +279,7 @@ async def async_hybrid_search(
         "rrf_score(rank() OVER ("
         "ORDER BY ts_rank_cd(search_vector, query) DESC"
         ")) AS rrf_score "
-        "FROM chunks, plainto_tsquery('english', %s) query "
+        "FROM chunks, " + _keyword_tsquery(expansion) + " query "
         "WHERE search_vector @@ query "
         + gen_where_bm25
         + "ORDER BY ts_rank_cd(search_vector, query) DESC "
@@ -267,19 +299,124 @@ async def async_hybrid_search(
         params.append(generation_filter)
     params.append(query_embedding)  # for ORDER BY
     # BM25 sub-query params
-    params.append(query_text)
+    params.extend(_keyword_params(query_text, expansion))
     if generation_filter:
         params.append(generation_filter)
     # Outer limit
     params.append(limit)
 
-    async with conn.cursor() as cur:
-        await cur.execute(sql, tuple(params))
-        rows = await cur.fetchall()
+    with stage_timer("hybrid_search"):
+        async with conn.cursor() as cur:
+            await cur.execute(sql, tuple(params))
+            rows = await cur.fetchall()
+
+    return _rows_to_results(rows)
+
+
+async def async_bm25_search(
+    conn: psycopg.AsyncConnection[object],
+    query_text: str,
+    limit: int = 5,
+    generation_filter: str | None = None,
+    expansion: str = "",
+) -> list[SearchResult]:
+    """Async version of bm25_search for use with AsyncConnectionPool."""
+    gen_where = "AND generations @> ARRAY[%s::text] " if generation_filter else ""
+    sql = (
+        "SELECT id, source_url, title, content, doc_type, generations, "
+        "context_header, deprecated, display_url, source_type, "
+        "ts_rank_cd(search_vector, query) AS score "
+        "FROM chunks, " + _keyword_tsquery(expansion) + " query "
+        "WHERE search_vector @@ query " + gen_where + "ORDER BY score DESC "
+        "LIMIT %s"
+    )
+    params: list[object] = _keyword_params(query_text, expansion)
+    if generation_filter:
+        params.append(generation_filter)
+    params.append(limit)
+
+    with stage_timer("bm25_search"):
+        async with conn.cursor() as cur:
+            await cur.execute(sql, tuple(params))
+            rows = await cur.fetchall()
 
     return _rows_to_results(rows)
 
 
+# Score assigned to chunks pinned by the exact-match fast path.  Above any
+# RRF (<= ~0.04) score so pinned hits always sort first.
+EXACT_MATCH_SCORE = 1.0
+
+
+def exact_match_urls(index: IdentifierIndex, query_text: str) -> list[str]:
+    """Source URLs defining the identifier *query_text*, best first.
+
+    Empty when the query is not an identifier or has no exact hit.
+    """
+    if not is_identifier_query(query_text):
+        return []
+    return list(dict.fromkeys(i.source_url for i in index.lookup(query_text)))
+
+
+async def async_exact_match_search(
+    conn: psycopg.AsyncConnection[object],
+    index: IdentifierIndex,
+    query_text: str,
+    limit: int = 5,
+    generation_filter: str | None = None,
+    source_urls: list[str] | None = None,
+) -> list[SearchResult]:
+    """Resolve a single-identifier query without embedding it.
+
+    If *query_text* looks like an API identifier (``BBjWindow``,
+    ``addButton``, ``BBjWindow::addButton``) and the identifier index has
+    an exact hit, the defining chunks are pinned to the top with
+    ``EXACT_MATCH_SCORE`` and any remaining slots are filled from the BM25
+    branch.  Neither branch needs the query embedding or the HNSW scan.
+
+    Callers that already resolved the identifier (``exact_match_urls()``)
+    pass *source_urls* so the index is not consulted twice.
+
+    Returns an empty list when the query is not an identifier or has no
+    exact hit; callers then fall back to hybrid search.
+    """
+    if source_urls is None:
+        source_urls = exact_match_urls(index, query_text)
+    if not source_urls:
+        return []
+
+    gen_where = "AND generations @> ARRAY[%s::text] " if generation_filter else ""
+    sql = (
+        "SELECT id, source_url, title, content, doc_type, generations, "
+        "context_header, deprecated, display_url, source_type, "
+        "%s::float8 AS score "
+        "FROM chunks "
+        "WHERE source_url = ANY(%s) " + gen_where + "ORDER BY "
+        "array_position(%s::text[], source_url), id "
+        "LIMIT %s"
+    )
+    params: list[object] = [EXACT_MATCH_SCORE, source_urls]
+    if generation_filter:
+        params.append(generation_filter)
+    params.extend([source_urls, limit])
+
+    with stage_timer("exact_match"):
+        async with conn.cursor() as cur:
+            await cur.execute(sql, tuple(params))
+            rows = await cur.fetchall()
+    pinned = _rows_to_results(rows)
+    if not pinned or len(pinned) >= limit:
+        return pinned
+
+    # Fill remaining slots from the keyword branch, skipping pinned chunks.
+    seen = {r.id for r in pinned}
+    extra = await async_bm25_search(
+        conn, query_text, limit=limit + len(pinned), generation_filter=generation_filter
+    )
+    fill = [r for r in extra if r.id not in seen]
+    return pinned + fill[: limit - len(pinned)]
+
+
 # Diversity boost factors for underrepresented source types.
 SOURCE_BOOST: dict[str, float] = {
     "pdf": 1.3,
@@ -335,11 +472,15 @@ def rerank_for_diversity(
 
 
 __all__ = [
+    "EXACT_MATCH_SCORE",
     "SOURCE_BOOST",
     "SearchResult",
+    "async_bm25_search",
+    "async_exact_match_search",
     "async_hybrid_search",
     "bm25_search",
     "dense_search",
+    "exact_match_urls",
     "hybrid_search",
     "rerank_for_diversity",
 ]
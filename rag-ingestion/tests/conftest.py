@@ -0,0 +1,139 @@
+"""Shared fakes and fixtures for API tests (no database or Ollama required).
+
+The fakes stand in for the objects the lifespan puts on ``app.state``:
+``FakePool`` for the AsyncConnectionPool, ``FakeOllama`` for the Ollama
+AsyncClient and ``FakeEmbedder`` for the QueryEmbedder.  Tests get them
+through the factory fixtures below (``fake_pool(fail=True)``), and build
+a TestClient around routers with ``make_client``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import AsyncIterator, Callable, Iterable
+from contextlib import asynccontextmanager
+from typing import Any
+
+import pytest
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+from psycopg_pool import PoolTimeout
+
+
+class FakeConn:
+    """Accepts any query and returns nothing."""
+
+    async def execute(self, query: str) -> None:
+        return None
+
+
+class FakePool:
+    """Stands in for AsyncConnectionPool: checkouts succeed, fail or time out."""
+
+    def __init__(self, fail: bool = False, exhausted: bool = False) -> None:
+        self.fail = fail
+        self.exhausted = exhausted
+        self.checkouts = 0
+
+    @asynccontextmanager
+    async def connection(self, timeout: float | None = None) -> AsyncIterator[Any]:
+        self.checkouts += 1
+        if self.exhausted:
+            raise PoolTimeout("couldn't get a connection after 5.00 sec")
+        if self.fail:
+            raise RuntimeError("connection refused")
+        yield FakeConn()
+
+    def get_stats(self) -> dict[str, int]:
+        return {"pool_max": 10, "pool_size": 3, "requests_wait_ms": 1500}
+
+
+class FakeOllama:
+    """Ollama AsyncClient: list() for probes, embed() one vector per text.
+
+    Vectors are ``[len(text)]`` so tests can tell inputs apart.
+    """
+
+    def __init__(self, delay: float = 0.0, fail: bool = False) -> None:
+        self.delay = delay
+        self.fail = fail
+        self.list_calls = 0
+        self.calls: list[list[str]] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def list(self) -> dict[str, list[str]]:
+        self.list_calls += 1
+        await asyncio.sleep(self.delay)
+        return {"models": []}
+
+    async def embed(self, model: str, input: str | list[str]) -> dict[str, Any]:
+        texts = [input] if isinstance(input, str) else list(input)
+        self.calls.append(texts)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+            if self.fail:
+                raise RuntimeError("model not loaded")
+            return {"embeddings": [[float(len(text))] for text in texts]}
+        finally:
+            self.in_flight -= 1
+
+
+class FakeEmbedder:
+    """QueryEmbedder: counts embed() calls, optionally raising *fail*."""
+
+    def __init__(self, fail: Exception | None = None) -> None:
+        self.fail = fail
+        self.calls = 0
+
+    async def embed(self, text: str) -> list[float]:
+        self.calls += 1
+        if self.fail is not None:
+            raise self.fail
+        return [0.0]
+
+
+@pytest.fixture
+def fake_pool() -> type[FakePool]:
+    return FakePool
+
+
+@pytest.fixture
+def fake_ollama() -> type[FakeOllama]:
+    return FakeOllama
+
+
+@pytest.fixture
+def fake_embedder() -> type[FakeEmbedder]:
+    return FakeEmbedder
+
+
+@pytest.fixture
+def make_client() -> Callable[..., TestClient]:
+    """Build a TestClient for *routers* with optional middleware and state.
+
+    ``overrides`` maps a dependency to the value it should return;
+    remaining keyword arguments go to TestClient.
+    """
+
+    def make(
+        *routers: APIRouter,
+        middleware: Iterable[type] = (),
+        state: dict[str, Any] | None = None,
+        overrides: dict[Callable[..., Any], Any] | None = None,
+        **client_kwargs: Any,
+    ) -> TestClient:
+        app = FastAPI()
+        for cls in middleware:
+            app.add_middleware(cls)
+        for router in routers:
+            app.include_router(router)
+        for name, value in (state or {}).items():
+            setattr(app.state, name, value)
+        for dependency, value in (overrides or {}).items():
+            app.dependency_overrides[dependency] = lambda value=value: value
+        return TestClient(app, **client_kwargs)
+
+    return make
@@ -0,0 +1,102 @@
+"""Unit tests for the chat answer cache (no database required)."""
+
+from __future__ import annotations
+
+import json
+from collections.abc import AsyncIterator
+from typing import Any
+
+from bbj_rag.chat.answer_cache import AnswerCache, normalize_question, replay
+
+_EVENTS = [
+    {"event": "sources", "data": "[]"},
+    {"event": "delta", "data": json.dumps({"text": "Use addWindow."})},
+    {"event": "done", "data": json.dumps({"input_tokens": 1, "output_tokens": 2})},
+]
+
+
+async def _stream(events: list[dict[str, Any]]) -> AsyncIterator[dict[str, Any]]:
+    for event in events:
+        yield event
+
+
+async def _drain(events: AsyncIterator[dict[str, Any]]) -> list[dict[str, Any]]:
+    return [e async for e in events]
+
+
+class TestAnswerCacheKey:
+    """Keys ignore question formatting but not context, model or corpus."""
+
+    def test_normalized_question(self):
+        assert normalize_question("  How do I open a WINDOW?? ") == (
+            "how do i open a window"
+        )
+        assert AnswerCache.key("How?", [1], "m", "v") == AnswerCache.key(
+            "how", [1], "m", "v"
+        )
+
+    def test_context_model_and_version_matter(self):
+        base = AnswerCache.key("q", [1, 2], "m", "v1")
+        assert base != AnswerCache.key("q", [2, 1], "m", "v1")
+        assert base != AnswerCache.key("q", [1, 2], "other", "v1")
+        assert base != AnswerCache.key("q", [1, 2], "m", "v2")
+
+
+class TestAnswerCache:
+    """Completed answers are stored and replayed until invalidated."""
+
+    async def test_record_and_replay(self):
+        cache = AnswerCache(ttl=60)
+        assert await _drain(cache.record("k", _stream(_EVENTS))) == _EVENTS
+        replayed = await _drain(replay(cache.get("k") or []))
+        assert [e["event"] for e in replayed] == ["sources", "delta", "done"]
+        assert json.loads(replayed[-1]["data"])["cached"] is True
+
+    async def test_errors_not_stored(self):
+        cache = AnswerCache(ttl=60)
+        failed = [_EVENTS[0], {"event": "error", "data": "{}"}]
+        await _drain(cache.record("k", _stream(failed)))
+        assert cache.get("k") is None
+
+    async def test_validation_warnings_not_stored(self):
+        cache = AnswerCache(ttl=60)
+        warned = [
+            _EVENTS[0],
+            _EVENTS[1],
+            {"event": "validation_warning", "data": "{}"},
+            _EVENTS[2],
+        ]
+        assert await _drain(cache.record("k", _stream(warned))) == warned
+        assert cache.get("k") is None
+
+    async def test_unverified_answers_not_stored(self):
+        cache = AnswerCache(ttl=60)
+        done = {"event": "done", "data": json.dumps({"unverified_blocks": 1})}
+        await _drain(cache.record("k", _stream([*_EVENTS[:2], done])))
+        assert cache.get("k") is None
+
+    def test_ttl_expiry(self, monkeypatch):
+        cache = AnswerCache(ttl=10)
+        now = [100.0]
+        monkeypatch.setattr("bbj_rag.chat.answer_cache.time.monotonic", lambda: now[0])
+        cache.put("k", _EVENTS)
+        now[0] = 105.0
+        assert cache.get("k") is not None
+        now[0] = 111.0
+        assert cache.get("k") is None
+
+    def test_corpus_version_change_clears(self):
+        cache = AnswerCache(ttl=60)
+        cache.sync_corpus_version("v1")
+        cache.put("k", _EVENTS)
+        cache.sync_corpus_version("v1")
+        assert len(cache) == 1
+        cache.sync_corpus_version("v2")
+        assert len(cache) == 0
+
+    def test_lru_bound(self):
+        cache = AnswerCache(ttl=60, max_entries=2)
+        for key in ("a", "b", "c"):
+            cache.put(key, _EVENTS)
+        assert cache.get("a") is None
+        assert len(cache) == 2
@@ -0,0 +1,93 @@
+"""Unit tests for token-budgeted chat context packing."""
+
+from __future__ import annotations
+
+from bbj_rag.chat.context import estimate_tokens, pack_context
+from bbj_rag.search import SearchResult
+
+
+def _result(
+    id: int, url: str, content: str, score: float, header: str = ""
+) -> SearchResult:
+    return SearchResult(
+        id=id,
+        source_url=url,
+        title=url,
+        content=content,
+        doc_type="concept",
+        generations=[],
+        context_header=header,
+        deprecated=False,
+        display_url="",
+        source_type="Flare",
+        score=score,
+    )
+
+
+def _words(prefix: str, n: int) -> str:
+    return " ".join(f"{prefix}{i}" for i in range(n))
+
+
+class TestPackContext:
+    """pack_context dedupes, merges and fits sources to the budget."""
+
+    def test_merges_adjacent_chunks_removing_overlap(self):
+        first = "Intro paragraph.\n\nShared overlap sentence that the chunker repeats."
+        second = "Shared overlap sentence that the chunker repeats.\n\nMore detail."
+        packed = pack_context(
+            [
+                _result(11, "a", second, 0.4),
+                _result(10, "a", first, 0.9),
+                _result(30, "b", "other", 0.5),
+            ],
+            token_budget=1000,
+        )
+        assert [r.source_url for r in packed] == ["a", "b"]
+        assert packed[0].id == 10
+        assert packed[0].score == 0.9
+        assert packed[0].content.count("Shared overlap") == 1
+        assert packed[0].content.endswith("More detail.")
+
+    def test_non_adjacent_chunks_stay_separate(self):
+        packed = pack_context(
+            [_result(1, "a", "x", 0.9), _result(5, "a", "y", 0.8)], token_budget=1000
+        )
+        assert [r.id for r in packed] == [1, 5]
+
+    def test_contained_chunk_dropped(self):
+        packed = pack_context(
+            [
+                _result(1, "a", "full text with the snippet inside", 0.9),
+                _result(9, "a", "the snippet", 0.8),
+            ],
+            token_budget=1000,
+        )
+        assert [r.id for r in packed] == [1]
+
+    def test_budget_drops_lowest_scoring_extras(self):
+        results = [
+            _result(i * 10, f"u{i}", _words("w", 150), 1 - i / 10) for i in range(5)
+        ]
+        packed = pack_context(results, token_budget=700)
+        assert [r.source_url for r in packed] == ["u0", "u1", "u2"]
+        assert sum(estimate_tokens(r.content) + 20 for r in packed) <= 700
+
+    def test_oversized_top_source_is_trimmed(self):
+        long = "\n".join(_words(f"l{i}_", 30) for i in range(50))
+        packed = pack_context([_result(1, "a", "```bbj\n" + long, 0.9)], 300)
+        assert len(packed) == 1
+        assert packed[0].content.endswith("```\n[...]")
+        assert estimate_tokens(packed[0].content) <= 300
+
+    def test_top_source_kept_when_first_line_exceeds_budget(self):
+        # One long paragraph line, far larger than the whole budget
+        packed = pack_context([_result(1, "a", _words("p", 1000), 0.9)], 100)
+        assert len(packed) == 1
+        assert packed[0].content.startswith("p0 p1 ")
+        assert packed[0].content.endswith("[...]")
+        assert estimate_tokens(packed[0].content) <= 150
+
+    def test_short_snippets_fill_the_window(self):
+        results = [_result(i * 10, f"kb{i}", "short answer", 0.5) for i in range(10)]
+        assert len(pack_context(results, token_budget=3000)) == 10
+        assert len(pack_context(results, 3000, max_sources=4)) == 4
@@ -0,0 +1,139 @@
+"""Unit tests for retrieval-query condensation and history compaction."""
+
+from __future__ import annotations
+
+import asyncio
+from types import SimpleNamespace
+from typing import Any
+
+from bbj_rag.chat.history import (
+    build_retrieval_query,
+    compact_history,
+    condense_query,
+    is_follow_up,
+    summarize_turns,
+)
+from bbj_rag.config import Settings
+
+_CONVERSATION = [
+    {"role": "user", "content": "How do I create a window in BBj GUI?"},
+    {
+        "role": "assistant",
+        "content": "Use BBjSysGui.addWindow to create a BBjWindow. Example:\n"
+        '```bbj\nwin! = sysgui!.addWindow(10,10,200,200,"Hi")\n```',
+    },
+    {"role": "user", "content": "and how do I close it?"},
+]
+
+
+def _turns(n: int) -> list[dict[str, str]]:
+    return [
+        {
+            "role": "user" if i % 2 == 0 else "assistant",
+            "content": f"message {i}. More text.",
+        }
+        for i in range(n)
+    ]
+
+
+class TestBuildRetrievalQuery:
+    """Follow-ups borrow the previous question and answer identifiers."""
+
+    def test_follow_up_detection(self):
+        assert is_follow_up("and how do I close it?")
+        assert is_follow_up("what about DWC")
+        assert not is_follow_up("How do I read a keyed file record by primary key?")
+
+    def test_follow_up_carries_context(self):
+        query = build_retrieval_query(_CONVERSATION)
+        assert query.startswith("How do I create a window in BBj GUI?")
+        assert "BBjSysGui" in query
+        assert "BBjWindow" in query
+        assert query.endswith("and how do I close it?")
+
+    def test_standalone_query_unchanged(self):
+        messages = [
+            *_CONVERSATION[:2],
+            {"role": "user", "content": "How do I read a keyed file record by key?"},
+        ]
+        assert build_retrieval_query(messages) == messages[-1]["content"]
+
+    def test_topic_switch_not_follow_up(self):
+        messages = [
+            {"role": "user", "content": "How do I open a file in BBj?"},
+            {"role": "assistant", "content": "Use BBjFileSystem or OPEN."},
+            {
+                "role": "user",
+                "content": "How can I make sure that a BBjGrid column is "
+                "sortable by the user?",
+            },
+        ]
+        assert not is_follow_up(messages[-1]["content"])
+        assert build_retrieval_query(messages) == messages[-1]["content"]
+
+    def test_pronoun_with_own_topic_is_standalone(self):
+        assert not is_follow_up("Is there a way to print a report to a PDF file?")
+        assert not is_follow_up("How to open a file?")
+        assert is_follow_up("How do I sort it by date?")
+
+    def test_first_message_unchanged(self):
+        assert build_retrieval_query(_CONVERSATION[:1]) == _CONVERSATION[0]["content"]
+
+
+class TestCondenseQuery:
+    """The optional model rewrite is bounded by a latency budget."""
+
+    def _client(self, text: str, delay: float = 0.0) -> Any:
+        async def create(**kwargs: object) -> SimpleNamespace:
+            await asyncio.sleep(delay)
+            return SimpleNamespace(content=[SimpleNamespace(text=text)])
+
+        return SimpleNamespace(messages=SimpleNamespace(create=create))
+
+    async def test_heuristic_without_model(self):
+        settings = Settings(chat_condense_model="")
+        assert await condense_query(_CONVERSATION, settings) == build_retrieval_query(
+            _CONVERSATION
+        )
+
+    async def test_model_rewrite(self):
+        settings = Settings(chat_condense_model="small")
+        client = self._client('"close a BBjWindow"')
+        result = await condense_query(_CONVERSATION, settings, client)
+        assert result == "close a BBjWindow"
+
+    async def test_timeout_falls_back(self):
+        settings = Settings(chat_condense_model="small", chat_condense_timeout=0.01)
+        client = self._client("slow", delay=0.5)
+        result = await condense_query(_CONVERSATION, settings, client)
+        assert result == build_retrieval_query(_CONVERSATION)
+
+
+class TestCompactHistory:
+    """Older turns fold into a summary prepended to the first kept turn."""
+
+    def test_short_history_unchanged(self):
+        assert compact_history(_turns(5), keep_messages=6) == _turns(5)
+
+    def test_older_turns_summarized(self):
+        compacted = compact_history(_turns(11), keep_messages=6)
+        assert len(compacted) < 11
+        assert compacted[0]["role"] == "user"
+        assert compacted[0]["content"].startswith("<conversation_summary>")
+        assert "- Asked: message 0. More text. -> message 1." in compacted[0]["content"]
+        assert compacted[-1] == _turns(11)[-1]
+
+    def test_long_history_summarizes_oldest_turns(self):
+        compacted = compact_history(_turns(40), keep_messages=6)
+        assert "message 0" in compacted[0]["content"]
+        assert len(compacted) <= 6 + 4
+
+    def test_prefix_stable_between_blocks(self):
+        first = compact_history(_turns(11), keep_messages=6)
+        second = compact_history(_turns(13), keep_messages=6)
+        assert second[: len(first)] == first
+
+    def test_summary_strips_code(self):
+        summary = summarize_turns(_CONVERSATION[:2])
+        assert "```" not in summary
+        assert "[BBjSysGui, addWindow, BBjWindow]" in summary
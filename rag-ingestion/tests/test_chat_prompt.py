@@ -0,0 +1,82 @@
+"""Unit tests for the prompt-cache-aware chat prompt layout."""
+
+from __future__ import annotations
+
+from bbj_rag.chat.prompt import (
+    STATIC_SYSTEM_PROMPT,
+    build_cached_prompt,
+    build_rag_system_prompt,
+)
+from bbj_rag.search import SearchResult
+
+
+def _result(title: str, content: str) -> SearchResult:
+    return SearchResult(
+        id=1,
+        source_url=f"flare://{title}",
+        title=title,
+        content=content,
+        doc_type="api-reference",
+        generations=["bbj_gui"],
+        context_header="",
+        deprecated=False,
+        display_url="",
+        source_type="Flare",
+        score=0.5,
+    )
+
+
+_HISTORY = [
+    {"role": "user", "content": "How do I open a window?"},
+    {"role": "assistant", "content": "Use addWindow."},
+    {"role": "user", "content": "And close it?"},
+]
+
+
+class TestBuildCachedPrompt:
+    """The static prefix is stable; per-query context rides on the last turn."""
+
+    def test_system_block_is_static_and_cached(self):
+        a = build_cached_prompt(_HISTORY, [_result("A", "alpha")])
+        b = build_cached_prompt(_HISTORY, [], low_confidence=True)
+        assert a.system == b.system
+        assert a.system[0]["text"] == STATIC_SYSTEM_PROMPT
+        assert a.system[0]["cache_control"] == {"type": "ephemeral"}
+
+    def test_reference_material_only_in_latest_message(self):
+        prompt = build_cached_prompt(_HISTORY, [_result("A", "alpha")], True)
+        context, question = prompt.messages[-1]["content"]
+        assert context["text"].startswith("<reference_material>")
+        assert "alpha" in context["text"]
+        assert "Limited reference material" in context["text"]
+        assert question["text"] == "And close it?"
+        assert prompt.messages[0] == _HISTORY[0]
+
+    def test_history_breakpoint_on_previous_turn(self):
+        prompt = build_cached_prompt(_HISTORY, [])
+        previous = prompt.messages[-2]["content"][0]
+        assert previous["text"] == "Use addWindow."
+        assert previous["cache_control"] == {"type": "ephemeral"}
+        breakpoints = sum(
+            "cache_control" in block
+            for m in prompt.messages
+            if isinstance(m["content"], list)
+            for block in m["content"]
+        )
+        assert breakpoints == 1
+
+    def test_single_turn_has_no_history_breakpoint(self):
+        prompt = build_cached_prompt(_HISTORY[:1], [])
+        assert len(prompt.messages) == 1
+        assert "No reference material" in prompt.messages[0]["content"][0]["text"]
+
+
+class TestBuildRagSystemPrompt:
+    """The single-string layout keeps its original shape."""
+
+    def test_reference_material_inline(self):
+        prompt = build_rag_system_prompt([_result("A", "alpha")])
+        assert "provided below" in prompt
+        assert prompt.endswith(
+            "Reference Material:\n[Source 1: A]\nURL: flare://A\nType: Flare\n\nalpha"
+        )
@@ -0,0 +1,427 @@
+"""Unit tests for incremental code-fence splitting and per-block validation."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+
+from bbj_rag.chat import stream as chat_stream
+from bbj_rag.chat.validation import CodeFenceSplitter, FenceSegment
+from bbj_rag.compiler import ValidationResult
+from bbj_rag.config import Settings
+
+_RESPONSE = (
+    "Use a window:\n\n"
+    '```bbj\nwin! = sysgui!.addWindow(10,10,200,200,"Hi")\n```\n'
+    "Python for comparison:\n"
+    "```python\nprint('hi')\n```\n"
+    "Done."
+)
+
+
+def _split(chunks: list[str]) -> list[FenceSegment]:
+    splitter = CodeFenceSplitter()
+    segments: list[FenceSegment] = []
+    for chunk in chunks:
+        segments.extend(splitter.feed(chunk))
+    segments.extend(splitter.flush())
+    return segments
+
+
+class TestCodeFenceSplitter:
+    """CodeFenceSplitter releases prose early and buffers BBj fences."""
+
+    @pytest.mark.parametrize("size", [1, 3, 7, len(_RESPONSE)])
+    def test_reassembles_exactly_for_any_chunking(self, size):
+        chunks = [_RESPONSE[i : i + size] for i in range(0, len(_RESPONSE), size)]
+        segments = _split(chunks)
+        assert "".join(s.text for s in segments) == _RESPONSE
+        blocks = [s for s in segments if s.block is not None]
+        assert len(blocks) == 1
+        assert blocks[0].text.startswith("```bbj\n")
+        assert blocks[0].text.endswith("```")
+        assert blocks[0].block.code == 'win! = sysgui!.addWindow(10,10,200,200,"Hi")\n'
+        assert blocks[0].code_index == 1
+
+    def test_prose_released_before_fence_closes(self):
+        splitter = CodeFenceSplitter()
+        assert [s.text for s in splitter.feed("Hello ")] == ["Hello "]
+        assert [s.text for s in splitter.feed("there\n```bbj\nPRINT 1\n")] == [
+            "there\n"
+        ]
+        segments = splitter.feed("```\nafter")
+        assert segments[0].block is not None
+        assert segments[1].text == "\nafter"
+
+    def test_trailing_backticks_held_back(self):
+        splitter = CodeFenceSplitter()
+        assert [s.text for s in splitter.feed("text ``")] == ["text "]
+        assert splitter.feed("`bbj\n") == []
+
+    def test_other_languages_stream_through(self):
+        splitter = CodeFenceSplitter()
+        texts = [s.text for s in splitter.feed("```python\nprint(1)\n")]
+        assert texts == ["```python\n", "print(1)\n"]
+        segments = splitter.feed("```\n")
+        assert segments[0].text == "```"
+        assert all(s.block is None for s in segments)
+        assert splitter.code_blocks == 1
+
+    def test_untagged_non_bbj_block_emitted_without_validation(self):
+        segments = _split(["```\nSELECT * FROM t;\n```\n"])
+        assert all(s.block is None for s in segments)
+
+    def test_code_index_counts_all_fences(self):
+        text = "```python\nx\n```\n```bbj\nPRINT 1\n```"
+        blocks = [s for s in _split([text]) if s.block is not None]
+        assert blocks[0].code_index == 2
+
+    def test_unclosed_fence_flushed_raw(self):
+        segments = _split(["```bbj\nPRINT 1\n"])
+        assert "".join(s.text for s in segments) == "```bbj\nPRINT 1\n"
+        assert all(s.block is None for s in segments)
+
+
+def _bbj_segment(code: str = "PRINT 1\n") -> FenceSegment:
+    return _split([f"```bbj\n{code}```"])[0]
+
+
+class TestValidateBlock:
+    """_validate_block fixes invalid code and reports what it cannot fix."""
+
+    @pytest.fixture
+    def results(self, monkeypatch) -> list[ValidationResult]:
+        queue: list[ValidationResult] = []
+
+        async def fake_validate(code: str, timeout: float = 10.0) -> ValidationResult:
+            return queue.pop(0)
+
+        async def fake_fix(client: Any, settings: Any, code: str, errors: str) -> str:
+            return "PRINT 2"
+
+        monkeypatch.setattr(chat_stream, "validate_bbj_syntax", fake_validate)
+        monkeypatch.setattr(chat_stream, "_get_fix_from_claude", fake_fix)
+        return queue
+
+    async def test_valid_block_unchanged(self, results):
+        results.append(ValidationResult(valid=True, errors=""))
+        segment = _bbj_segment()
+        assert await chat_stream._validate_block(None, None, segment) == (
+            segment.text,
+            None,
+            True,
+        )
+
+    async def test_fixed_block_replaced(self, results):
+        results.extend(
+            [
+                ValidationResult(valid=False, errors="syntax error"),
+                ValidationResult(valid=True, errors=""),
+            ]
+        )
+        text, warning, verified = await chat_stream._validate_block(
+            None, None, _bbj_segment()
+        )
+        assert text == "```bbj\nPRINT 2\n```"
+        assert warning is None and verified
+
+    async def test_unfixable_block_warns(self, results):
+        results.extend([ValidationResult(valid=False, errors="bad")] * 3)
+        segment = _bbj_segment()
+        text, warning, verified = await chat_stream._validate_block(None, None, segment)
+        assert text == segment.text
+        assert warning == {"code_index": 1, "errors": "bad", "code_preview": "PRINT 2"}
+        assert verified
+
+    async def test_unavailable_compiler_is_unverified(self, results):
+        results.append(ValidationResult(valid=False, errors="", unavailable=True))
+        segment = _bbj_segment()
+        assert await chat_stream._validate_block(None, None, segment) == (
+            segment.text,
+            None,
+            False,
+        )
+
+    async def test_unchecked_fix_keeps_original_with_warning(self, results):
+        results.extend(
+            [
+                ValidationResult(valid=False, errors="bad"),
+                ValidationResult(valid=False, errors="", timed_out=True),
+            ]
+        )
+        segment = _bbj_segment()
+        text, warning, verified = await chat_stream._validate_block(None, None, segment)
+        assert text == segment.text
+        assert warning is not None and warning["errors"] == "bad"
+        assert not verified
+
+    async def test_prose_segment_passes_through(self, results):
+        segment = FenceSegment("Just prose.")
+        assert await chat_stream._validate_block(None, None, segment) == (
+            "Just prose.",
+            None,
+            True,
+        )
+        assert results == []
+
+
+class TestConcurrentValidation:
+    """Independent blocks are compiled concurrently; order is preserved."""
+
+    async def test_validate_code_blocks_runs_concurrently(self, monkeypatch):
+        from bbj_rag.chat import validation
+
+        active = peak = 0
+
+        async def fake_validate(code: str, timeout: float = 10.0) -> ValidationResult:
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+            return ValidationResult(valid=code.startswith("PRINT"), errors="")
+
+        monkeypatch.setattr(validation, "validate_bbj_syntax", fake_validate)
+        blocks = validation.extract_code_blocks(
+            "".join(f"```bbj\n{c}\n```\n" for c in ["PRINT 1", "x", "PRINT 3"])
+        )
+        await validation.validate_code_blocks(blocks, concurrency=2)
+        assert peak == 2
+        assert [b.validation_result.valid for b in blocks] == [True, False, True]
+        assert all(b.attempts == 1 for b in blocks)
+
+    async def test_stream_preserves_order_when_later_block_finishes_first(
+        self, monkeypatch
+    ):
+        delays = {"PRINT 1\n": 0.05, "PRINT 2\n": 0.0}
+
+        async def fake_validate(code: str, timeout: float = 10.0) -> ValidationResult:
+            await asyncio.sleep(delays[code])
+            return ValidationResult(valid=True, errors="")
+
+        text = "a\n```bbj\nPRINT 1\n```\nb\n```bbj\nPRINT 2\n```\nc"
+
+        class FakeStream:
+            async def __aenter__(self) -> FakeStream:
+                return self
+
+            async def __aexit__(self, *exc: object) -> None:
+                return None
+
+            @property
+            async def text_stream(self) -> Any:
+                for i in range(0, len(text), 4):
+                    yield text[i : i + 4]
+
+            async def get_final_message(self) -> Any:
+                usage = SimpleNamespace(
+                    input_tokens=3,
+                    output_tokens=5,
+                    cache_creation_input_tokens=None,
+                    cache_read_input_tokens=7,
+                )
+                return SimpleNamespace(usage=usage)
+
+        client = SimpleNamespace(
+            messages=SimpleNamespace(stream=lambda **kwargs: FakeStream())
+        )
+        monkeypatch.setattr(chat_stream, "validate_bbj_syntax", fake_validate)
+        monkeypatch.setattr(chat_stream, "AsyncAnthropic", lambda: client)
+
+        events = [
+            e
+            async for e in chat_stream.stream_chat_response(
+                [{"role": "user", "content": "q"}], [], Settings(), False
+            )
+        ]
+        kinds = [e["event"] for e in events]
+        assert kinds[0] == "sources"
+        assert kinds[-1] == "done"
+        body = "".join(
+            json.loads(e["data"])["text"] for e in events if e["event"] == "delta"
+        )
+        assert body == text
+        assert json.loads(events[-1]["data"]) == {
+            "input_tokens": 3,
+            "output_tokens": 5,
+            "cache_creation_input_tokens": 0,
+            "cache_read_input_tokens": 7,
+            "unverified_blocks": 0,
+        }
+
+
+class TestUnverifiedAnswers:
+    """Answers with code bbjcpl could not check are not cached."""
+
+    async def test_unavailable_compiler_answer_not_cached(self, monkeypatch):
+        from bbj_rag.chat.answer_cache import AnswerCache
+
+        text = "Try:\n```bbj\nPRINT 1\n```\n"
+
+        class FakeStream:
+            async def __aenter__(self) -> FakeStream:
+                return self
+
+            async def __aexit__(self, *exc: object) -> None:
+                return None
+
+            @property
+            async def text_stream(self) -> Any:
+                yield text
+
+            async def get_final_message(self) -> Any:
+                usage = SimpleNamespace(
+                    input_tokens=1,
+                    output_tokens=1,
+                    cache_creation_input_tokens=None,
+                    cache_read_input_tokens=None,
+                )
+                return SimpleNamespace(usage=usage)
+
+        async def unavailable(code: str, timeout: float = 10.0) -> ValidationResult:
+            return ValidationResult(valid=False, errors="", unavailable=True)
+
+        client = SimpleNamespace(
+            messages=SimpleNamespace(stream=lambda **kwargs: FakeStream())
+        )
+        monkeypatch.setattr(chat_stream, "validate_bbj_syntax", unavailable)
+        cache = AnswerCache(ttl=60)
+        events = [
+            e
+            async for e in cache.record(
+                "k",
+                chat_stream.stream_chat_response(
+                    [{"role": "user", "content": "q"}], [], Settings(), False, client
+                ),
+            )
+        ]
+        assert events[-1]["event"] == "done"
+        assert json.loads(events[-1]["data"])["unverified_blocks"] == 1
+        assert cache.get("k") is None
+
+
+class TestHistoryWindow:
+    """Turns beyond chat_max_history are summarized, not dropped."""
+
+    async def test_oldest_turn_reaches_summary(self, monkeypatch):
+        sent: dict[str, Any] = {}
+
+        class FakeStream:
+            async def __aenter__(self) -> FakeStream:
+                return self
+
+            async def __aexit__(self, *exc: object) -> None:
+                return None
+
+            @property
+            async def text_stream(self) -> Any:
+                yield "ok"
+
+            async def get_final_message(self) -> Any:
+                usage = SimpleNamespace(
+                    input_tokens=1,
+                    output_tokens=1,
+                    cache_creation_input_tokens=None,
+                    cache_read_input_tokens=None,
+                )
+                return SimpleNamespace(usage=usage)
+
+        def stream(**kwargs: Any) -> FakeStream:
+            sent.update(kwargs)
+            return FakeStream()
+
+        client = SimpleNamespace(messages=SimpleNamespace(stream=stream))
+        messages = [
+            {"role": "user" if i % 2 == 0 else "assistant", "content": f"turn {i}."}
+            for i in range(41)
+        ]
+        settings = Settings(chat_max_history=20, chat_history_keep_messages=6)
+        async for _ in chat_stream.stream_chat_response(
+            messages, [], settings, False, client=client
+        ):
+            pass
+        assert "turn 0" in json.dumps(sent["messages"])
+        assert len(sent["messages"]) <= 20
+
+
+def _sse(events: list[dict[str, Any]]) -> bytes:
+    return "".join(
+        f"event: {e['type']}\ndata: {json.dumps(e)}\n\n" for e in events
+    ).encode()
+
+
+class TestStubServer:
+    """A stub Anthropic endpoint can stand in for the real API."""
+
+    async def test_stream_against_stub_transport(self, monkeypatch):
+        import httpx
+        from anthropic import AsyncAnthropic
+
+        requests: list[dict[str, Any]] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(json.loads(request.content))
+            usage = {
+                "input_tokens": 10,
+                "output_tokens": 1,
+                "cache_creation_input_tokens": 0,
+                "cache_read_input_tokens": 4,
+            }
+            body = _sse(
+                [
+                    {
+                        "type": "message_start",
+                        "message": {
+                            "id": "msg_stub",
+                            "type": "message",
+                            "role": "assistant",
+                            "model": "stub",
+                            "content": [],
+                            "stop_reason": None,
+                            "stop_sequence": None,
+                            "usage": usage,
+                        },
+                    },
+                    {
+                        "type": "content_block_start",
+                        "index": 0,
+                        "content_block": {"type": "text", "text": ""},
+                    },
+                    {
+                        "type": "content_block_delta",
+                        "index": 0,
+                        "delta": {"type": "text_delta", "text": "Hello"},
+                    },
+                    {"type": "content_block_stop", "index": 0},
+                    {
+                        "type": "message_delta",
+                        "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                        "usage": {"output_tokens": 5},
+                    },
+                    {"type": "message_stop"},
+                ]
+            )
+            return httpx.Response(
+                200, content=body, headers={"content-type": "text/event-stream"}
+            )
+
+        client = AsyncAnthropic(
+            api_key="test",
+            base_url="http://stub.invalid",
+            http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+        )
+        events = [
+            e
+            async for e in chat_stream.stream_chat_response(
+                [{"role": "user", "content": "hi"}], [], Settings(), False, client
+            )
+        ]
+
+        assert [e["event"] for e in events] == ["sources", "delta", "done"]
+        assert json.loads(events[1]["data"]) == {"text": "Hello"}
+        assert json.loads(events[-1]["data"])["cache_read_input_tokens"] == 4
+        assert requests[0]["system"][0]["cache_control"] == {"type": "ephemeral"}
@@ -0,0 +1,278 @@
+"""Tests for the batched bbjcpl compiler pool, using a fake compiler script."""
+
+from __future__ import annotations
+
+import asyncio
+import stat
+import sys
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from bbj_rag import compiler
+from bbj_rag.compiler import (
+    CompilerPool,
+    ValidationCache,
+    ValidationResult,
+    _attribute_errors,
+    cache_key,
+    normalize_code,
+    validate_bbj_syntax,
+)
+
+# Mimics bbjcpl -N: always exits 0 and reports "file: error at line" on
+# stderr.  "CRASH" exits non-zero, "SLEEP" hangs.  Each invocation appends
+# its file count to the log next to the script.
+_FAKE_BBJCPL = """\
+import sys, time
+from pathlib import Path
+files = sys.argv[2:]
+with open(Path(sys.argv[0]).with_suffix(".log"), "a") as log:
+    log.write(f"{len(files)}\\n")
+for name in files:
+    code = Path(name).read_text()
+    if "CRASH" in code:
+        sys.exit(3)
+    if "SLEEP" in code:
+        time.sleep(5)
+    if "BAD" in code:
+        print(f"{name}: error at line 1 (1): {code.strip()}", file=sys.stderr)
+        print("  continuation detail", file=sys.stderr)
+"""
+
+
+@pytest.fixture
+def fake_bbjcpl(tmp_path: Path) -> Path:
+    script = tmp_path / "bbjcpl"
+    script.write_text(f"#!{sys.executable}\n{_FAKE_BBJCPL}")
+    script.chmod(script.stat().st_mode | stat.S_IEXEC)
+    return script
+
+
+def _invocations(script: Path) -> list[int]:
+    log = script.with_suffix(".log")
+    if not log.exists():
+        return []
+    return [int(n) for n in log.read_text().split()]
+
+
+async def _pool(script: Path, tmp_path: Path, **kwargs: Any) -> CompilerPool:
+    pool = CompilerPool(str(script), work_dir=tmp_path / "work", **kwargs)
+    await pool.start()
+    return pool
+
+
+class TestCompilerPool:
+    """Queued snippets are compiled together and results attributed."""
+
+    async def test_batches_queued_snippets(self, fake_bbjcpl, tmp_path):
+        pool = await _pool(fake_bbjcpl, tmp_path, workers=1, batch_size=8)
+        try:
+            results = await asyncio.gather(
+                *(pool.submit(code) for code in ["PRINT 1", "BAD x", "PRINT 3"])
+            )
+        finally:
+            await pool.close()
+
+        assert [r.valid for r in results] == [True, False, True]
+        assert "error at line 1" in results[1].errors
+        assert "continuation detail" in results[1].errors
+        assert sum(_invocations(fake_bbjcpl)) == 3
+        assert len(_invocations(fake_bbjcpl)) < 3
+
+    async def test_crash_falls_back_to_single_compiles(self, fake_bbjcpl, tmp_path):
+        pool = await _pool(fake_bbjcpl, tmp_path, workers=1)
+        try:
+            results = await asyncio.gather(
+                *(pool.submit(code) for code in ["PRINT 1", "CRASH", "BAD y"])
+            )
+        finally:
+            await pool.close()
+
+        assert results[0].valid
+        assert not results[1].valid and not results[1].unavailable
+        assert "exited with status 3" in results[1].errors
+        assert not results[2].valid and "BAD y" in results[2].errors
+
+    async def test_timeout_only_affects_slow_snippet(self, fake_bbjcpl, tmp_path):
+        pool = await _pool(fake_bbjcpl, tmp_path, workers=1, timeout=1.0)
+        try:
+            slow, fast = await asyncio.gather(
+                pool.submit("SLEEP"), pool.submit("PRINT 1")
+            )
+        finally:
+            await pool.close()
+
+        assert slow.timed_out
+        assert fast.valid and not fast.timed_out
+
+    async def test_fallback_compiles_one_at_a_time(
+        self, fake_bbjcpl, tmp_path, monkeypatch
+    ):
+        running = peak = 0
+        real = compiler._run_compiler
+
+        async def tracking(*args: Any) -> tuple[int, str] | None:
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            try:
+                return await real(*args)
+            finally:
+                running -= 1
+
+        monkeypatch.setattr(compiler, "_run_compiler", tracking)
+        pool = await _pool(fake_bbjcpl, tmp_path, workers=1, batch_size=8)
+        try:
+            await asyncio.gather(
+                *(pool.submit(code) for code in ["CRASH", "PRINT 1", "PRINT 2"])
+            )
+        finally:
+            await pool.close()
+        assert peak == 1
+
+    async def test_batch_timeout_is_capped(self, fake_bbjcpl, tmp_path, monkeypatch):
+        runs: list[tuple[int, float]] = []
+
+        async def fake_run(path: str, paths: list[Path], timeout: float) -> Any:
+            runs.append((len(paths), timeout))
+            return 0, ""
+
+        monkeypatch.setattr(compiler, "_run_compiler", fake_run)
+        pool = await _pool(fake_bbjcpl, tmp_path, workers=1, timeout=2.0)
+        try:
+            await asyncio.gather(*(pool.submit(f"PRINT {i}") for i in range(4)))
+        finally:
+            await pool.close()
+        assert any(size > 1 for size, _ in runs)
+        for size, timeout in runs:
+            overhead = compiler._BATCH_OVERHEAD if size > 1 else 0.0
+            assert timeout == pytest.approx(2.0 + overhead)
+
+    async def test_crash_retries_only_unattributed(self, fake_bbjcpl, tmp_path):
+        pool = await _pool(fake_bbjcpl, tmp_path, workers=1, batch_size=8)
+        try:
+            bad, crash, good = await asyncio.gather(
+                *(pool.submit(code) for code in ["BAD a", "CRASH", "PRINT 1"])
+            )
+        finally:
+            await pool.close()
+
+        assert "BAD a" in bad.errors
+        assert not crash.valid and good.valid
+        # One batch, then single compiles for the two unattributed snippets
+        assert _invocations(fake_bbjcpl) == [3, 1, 1]
+
+    async def test_missing_compiler_is_unavailable(self, tmp_path):
+        pool = await _pool(tmp_path / "no-such-bbjcpl", tmp_path)
+        try:
+            result = await pool.submit("PRINT 1")
+        finally:
+            await pool.close()
+        assert result.unavailable
+
+    async def test_default_pool_routes_validate_bbj_syntax(self, fake_bbjcpl, tmp_path):
+        pool = await _pool(fake_bbjcpl, tmp_path)
+        compiler.set_default_pool(pool)
+        try:
+            result = await validate_bbj_syntax("BAD z")
+        finally:
+            compiler.set_default_pool(None)
+            await pool.close()
+        assert not result.valid
+        assert _invocations(fake_bbjcpl) == [1]
+
+    async def test_close_removes_work_dir(self, fake_bbjcpl, tmp_path):
+        pool = await _pool(fake_bbjcpl, tmp_path)
+        await pool.close()
+        assert list((tmp_path / "work").iterdir()) == []
+        with pytest.raises(RuntimeError):
+            await pool.submit("PRINT 1")
+
+
+class TestAttributeErrors:
+    """Batched stderr is split by filename prefix."""
+
+    def test_full_path_and_name_prefixes(self):
+        paths = [Path("/w/s1.bbj"), Path("/w/s11.bbj")]
+        stderr = "s11.bbj: error at line 2 (2): x\n/w/s1.bbj: error at line 1 (1): y"
+        assert _attribute_errors(stderr, paths) == [
+            "/w/s1.bbj: error at line 1 (1): y",
+            "s11.bbj: error at line 2 (2): x",
+        ]
+
+    def test_unprefixed_leading_output(self):
+        assert _attribute_errors("license warning", [Path("/w/a.bbj")]) is None
+
+
+class TestValidationCache:
+    """validate_bbj_syntax() reuses definitive results only."""
+
+    @pytest.fixture(autouse=True)
+    def fresh_cache(self, monkeypatch, fake_bbjcpl) -> ValidationCache:
+        cache = ValidationCache(max_entries=4)
+        compiler.set_validation_cache(cache)
+        monkeypatch.setenv("BBJ_RAG_COMPILER_PATH", str(fake_bbjcpl))
+        yield cache
+        compiler.set_validation_cache(None)
+
+    async def test_hit_skips_compiler(self, fake_bbjcpl, fresh_cache):
+        first = await validate_bbj_syntax("PRINT 1\n")
+        second = await validate_bbj_syntax("PRINT 1   \r\n\n")
+        assert first.valid and second.valid
+        assert _invocations(fake_bbjcpl) == [1]
+        assert fresh_cache.hits == 1
+
+    async def test_invalid_results_are_cached(self, fake_bbjcpl):
+        first = await validate_bbj_syntax("BAD x")
+        second = await validate_bbj_syntax("BAD x")
+        assert not second.valid
+        assert second.errors == first.errors
+        assert _invocations(fake_bbjcpl) == [1]
+
+    async def test_timeouts_are_not_cached(self, fake_bbjcpl, fresh_cache):
+        result = await validate_bbj_syntax("SLEEP", timeout=0.5)
+        assert result.timed_out
+        assert len(fresh_cache) == 0
+
+    async def test_unavailable_not_cached(self, monkeypatch, tmp_path, fresh_cache):
+        monkeypatch.setenv("BBJ_RAG_COMPILER_PATH", str(tmp_path / "missing"))
+        assert (await validate_bbj_syntax("PRINT 1")).unavailable
+        assert len(fresh_cache) == 0
+
+    def test_key_tracks_compiler_binary(self, fake_bbjcpl):
+        before = cache_key("PRINT 1", str(fake_bbjcpl))
+        assert cache_key("PRINT 1\n\n", str(fake_bbjcpl)) == before
+        fake_bbjcpl.write_text(fake_bbjcpl.read_text() + "\n# upgraded\n")
+        assert cache_key("PRINT 1", str(fake_bbjcpl)) != before
+
+    def test_lru_eviction_and_disk_persistence(self, tmp_path):
+        cache = ValidationCache(max_entries=2, cache_dir=tmp_path / "cache")
+        for key in ("a", "b", "c"):
+            cache.put(key, ValidationResult(valid=True, errors=""))
+        assert len(cache) == 2
+        assert ValidationCache(cache_dir=tmp_path / "cache").get("a") is not None
+
+    def test_normalize_code(self):
+        assert normalize_code("  PRINT 1  \r\nEND\t\n\n") == "  PRINT 1\nEND"
+
+    def test_leading_blank_lines_change_the_key(self, fake_bbjcpl):
+        # They shift the line numbers in bbjcpl's error messages
+        assert normalize_code("\nPRINT 1") == "\nPRINT 1"
+        path = str(fake_bbjcpl)
+        assert cache_key("\nBAD x", path) != cache_key("BAD x", path)
+
+    def test_disk_entries_are_bounded(self, tmp_path):
+        cache = ValidationCache(cache_dir=tmp_path / "cache", max_disk_entries=10)
+        for i in range(25):
+            cache.put(f"k{i}", ValidationResult(valid=True, errors=""))
+        files = list((tmp_path / "cache").glob("*.json"))
+        assert len(files) <= 10
+
+    async def test_async_put_writes_to_disk(self, tmp_path):
+        cache = ValidationCache(cache_dir=tmp_path / "cache")
+        await cache.async_put("a", ValidationResult(valid=False, errors="e"))
+        fresh = ValidationCache(cache_dir=tmp_path / "cache")
+        result = await fresh.async_get("a")
+        assert result is not None and result.errors == "e"
@@ -0,0 +1,76 @@
+"""Tests for the precomputed corpus statistics and their /stats cache."""
+
+from __future__ import annotations
+
+from unittest.mock import MagicMock
+
+from bbj_rag.intelligence.corpus_stats import (
+    CorpusStats,
+    StatsCache,
+    load_corpus_stats,
+    stats_from_rows,
+)
+
+_ROWS = [
+    ("total", "", 100),
+    ("doc_type", "concept", 30),
+    ("doc_type", "api-reference", 70),
+    ("generation", "all", 60),
+    ("source", "flare", 100),
+]
+
+
+def _mock_conn(*fetches: list[tuple[str, str, int]]) -> tuple[MagicMock, MagicMock]:
+    conn = MagicMock()
+    cursor = MagicMock()
+    conn.cursor.return_value.__enter__ = MagicMock(return_value=cursor)
+    conn.cursor.return_value.__exit__ = MagicMock(return_value=False)
+    cursor.fetchall.side_effect = list(fetches)
+    return conn, cursor
+
+
+class TestStatsFromRows:
+    """Rows group into breakdowns ordered by descending count."""
+
+    def test_breakdowns(self):
+        stats = stats_from_rows(_ROWS)
+        assert stats.total == 100
+        assert list(stats.by_doc_type) == ["api-reference", "concept"]
+        assert stats.by_generation == {"all": 60}
+        assert stats.by_source == {"flare": 100}
+
+    def test_empty(self):
+        assert stats_from_rows([]) == CorpusStats()
+
+
+class TestLoadCorpusStats:
+    """The stored table is read; an empty table falls back to live counts."""
+
+    def test_reads_stored_rows(self):
+        conn, cursor = _mock_conn(_ROWS)
+        assert load_corpus_stats(conn).total == 100
+        assert cursor.execute.call_count == 1
+
+    def test_empty_table_aggregates_live(self):
+        conn, cursor = _mock_conn([], _ROWS)
+        assert load_corpus_stats(conn).total == 100
+        assert cursor.execute.call_count == 2
+        assert "unnest(generations)" in cursor.execute.call_args[0][0]
+
+
+class TestStatsCache:
+    """The cache serves one CorpusStats until its TTL expires."""
+
+    def test_ttl(self, monkeypatch):
+        now = [100.0]
+        monkeypatch.setattr(
+            "bbj_rag.intelligence.corpus_stats.time.monotonic", lambda: now[0]
+        )
+        cache = StatsCache(ttl=60)
+        assert cache.get() is None
+        stats = stats_from_rows(_ROWS)
+        cache.put(stats)
+        now[0] = 159.0
+        assert cache.get() is stats
+        now[0] = 161.0
+        assert cache.get() is None
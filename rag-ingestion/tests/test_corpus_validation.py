@@ -0,0 +1,142 @@
+"""Tests for bulk compilation of corpus BBj code blocks (no database required)."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import stat
+import sys
+from pathlib import Path
+
+import pytest
+from click.testing import CliRunner
+
+from bbj_rag import compiler, corpus_validation
+from bbj_rag.cli import cli
+from bbj_rag.compiler import ValidationResult
+from bbj_rag.corpus_validation import (
+    CodeSample,
+    dedupe_blocks,
+    iter_markdown_blocks,
+    validate_samples,
+)
+
+_EXAMPLE = """---
+title: "Example"
+---
+
+## Code
+
+```bbj
+PRINT "hello"
+```
+
+```python
+print("not bbj")
+```
+
+```bbj
+BAD syntax
+```
+"""
+
+# Fake bbjcpl -N: reports an error for every file containing "BAD".
+_FAKE_BBJCPL = """\
+import sys
+from pathlib import Path
+for name in sys.argv[2:]:
+    if "BAD" in Path(name).read_text():
+        print(f"{name}: error at line 1 (1): BAD syntax", file=sys.stderr)
+"""
+
+
+@pytest.fixture
+def training_data(tmp_path: Path) -> Path:
+    root = tmp_path / "training-data"
+    (root / "gui").mkdir(parents=True)
+    (root / "gui" / "a.md").write_text(_EXAMPLE)
+    (root / "gui" / "b.md").write_text(_EXAMPLE.replace('"hello"', '"hello"   '))
+    (root / "README.md").write_text("```bbj\nBAD readme\n```\n")
+    return root
+
+
+class TestCollection:
+    """Blocks are found per file and deduped by normalised code."""
+
+    def test_markdown_blocks_skip_docs_and_other_languages(self, training_data):
+        blocks = list(iter_markdown_blocks(training_data))
+        assert len(blocks) == 4
+        assert blocks[0][0].endswith("a.md:7")
+        assert all("not bbj" not in code for _, code in blocks)
+
+    def test_dedupe_merges_locations(self, training_data):
+        samples = dedupe_blocks(iter_markdown_blocks(training_data))
+        assert len(samples) == 2
+        assert [len(s.locations) for s in samples] == [2, 2]
+
+    def test_dedupe_drops_blank_blocks(self):
+        assert dedupe_blocks([("x:1", "\n  \n")]) == []
+
+
+class TestValidateSamples:
+    """Samples are compiled by a bounded set of tasks."""
+
+    async def test_concurrency_is_bounded(self, monkeypatch):
+        in_flight = peak = 0
+
+        async def fake_validate(code: str) -> ValidationResult:
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0)
+            in_flight -= 1
+            return ValidationResult(valid=True, errors="")
+
+        class FakePool:
+            workers = 1
+            batch_size = 2
+
+            async def start(self) -> None:
+                return None
+
+            async def close(self) -> None:
+                return None
+
+        monkeypatch.setattr(corpus_validation, "validate_bbj_syntax", fake_validate)
+        samples = [CodeSample(key=str(i), code=f"PRINT {i}") for i in range(50)]
+        await validate_samples(samples, FakePool())  # type: ignore[arg-type]
+        assert peak == 4
+        assert all(s.result is not None and s.result.valid for s in samples)
+
+
+class TestValidateCodeCommand:
+    """bbj-rag validate-code compiles and writes the status table."""
+
+    def test_writes_report(self, tmp_path, training_data, monkeypatch):
+        script = tmp_path / "bbjcpl"
+        script.write_text(f"#!{sys.executable}\n{_FAKE_BBJCPL}")
+        script.chmod(script.stat().st_mode | stat.S_IEXEC)
+        monkeypatch.setenv("BBJ_RAG_COMPILER_PATH", str(script))
+        monkeypatch.setattr(compiler, "_validation_cache", None)
+        monkeypatch.setattr(compiler, "_validation_cache_loaded", True)
+        output = tmp_path / "report.jsonl"
+
+        result = CliRunner().invoke(
+            cli,
+            [
+                "validate-code",
+                "--training-data",
+                str(training_data),
+                "--no-chunks",
+                "--output",
+                str(output),
+                "--fail-on-invalid",
+            ],
+        )
+
+        assert result.exit_code == 1, result.output
+        assert "Unique BBj code blocks: 2" in result.output
+        records = [json.loads(line) for line in output.read_text().splitlines()]
+        assert [r["status"] for r in records] == ["valid", "invalid"]
+        assert "error at line 1" in records[1]["errors"]
+        assert len(records[1]["locations"]) == 2
@@ -128,3 +128,131 @@ def test_get_connection_calls_register_vector():
 
     source = inspect.getsource(db_module.get_connection)
     assert "register_vector" in source
+
+
+class _FakeConnInfo:
+    host = "localhost"
+    port = 5432
+    dbname = "bbj_rag"
+
+
+class _FakeTypedConn:
+    info = _FakeConnInfo()
+
+
+def _patch_type_registration(monkeypatch):
+    """Record TypeInfo lookups and registrations instead of hitting a DB."""
+    import bbj_rag.db as db_module
+
+    fetched: list[str] = []
+    registered: list[str] = []
+
+    def fetch(conn, name):
+        fetched.append(name)
+        return None if name == "sparsevec" else name
+
+    async def async_fetch(conn, name):
+        return fetch(conn, name)
+
+    monkeypatch.setattr(db_module.TypeInfo, "fetch", fetch)
+    monkeypatch.setattr(
+        db_module,
+        "_REGISTER_INFO",
+        {
+            name: (lambda conn, info, n=name: registered.append(n))
+            for name in db_module._VECTOR_TYPES
+        },
+    )
+    monkeypatch.setattr(db_module, "_type_info_cache", {})
+    return fetched, registered, async_fetch
+
+
+def test_register_vector_types_fetches_once(monkeypatch):
+    from bbj_rag.db import register_vector_types
+
+    fetched, registered, _ = _patch_type_registration(monkeypatch)
+    for _ in range(3):
+        register_vector_types(_FakeTypedConn())  # type: ignore[arg-type]
+    assert fetched == ["vector", "bit", "halfvec", "sparsevec"]
+    # Missing optional types (sparsevec here) are skipped
+    assert registered == ["vector", "bit", "halfvec"] * 3
+
+
+async def test_async_register_vector_types_uses_cache(monkeypatch):
+    import bbj_rag.db as db_module
+    from bbj_rag.db import async_register_vector_types, register_vector_types
+
+    fetched, registered, async_fetch = _patch_type_registration(monkeypatch)
+    register_vector_types(_FakeTypedConn())  # type: ignore[arg-type]
+    monkeypatch.setattr(db_module.TypeInfo, "fetch", async_fetch)
+    await async_register_vector_types(_FakeTypedConn())  # type: ignore[arg-type]
+    assert len(fetched) == 4  # warm cache: no further lookups
+    assert len(registered) == 6
+
+
+# ---------------------------------------------------------------------------
+# 5. Versioned async schema apply
+# ---------------------------------------------------------------------------
+
+
+class _FakeAsyncCursor:
+    """Answers the schema-version queries of async_apply_schema."""
+
+    def __init__(self, stored: str | None) -> None:
+        self.stored = stored
+        self.executed: list[str] = []
+        self._row: tuple[object, ...] | None = None
+
+    async def __aenter__(self) -> _FakeAsyncCursor:
+        return self
+
+    async def __aexit__(self, *exc: object) -> None:
+        return None
+
+    async def execute(self, query: str, params: object = None) -> None:
+        self.executed.append(query)
+        if "to_regclass" in query:
+            self._row = (self.stored is not None,)
+        elif query.startswith("SELECT value FROM corpus_meta"):
+            self._row = (self.stored,) if self.stored is not None else None
+        else:
+            self._row = None
+
+    async def fetchone(self) -> tuple[object, ...] | None:
+        return self._row
+
+
+class _FakeAsyncConn:
+    def __init__(self, stored: str | None) -> None:
+        self.cur = _FakeAsyncCursor(stored)
+        self.committed = False
+
+    def cursor(self) -> _FakeAsyncCursor:
+        return self.cur
+
+    async def commit(self) -> None:
+        self.committed = True
+
+    async def rollback(self) -> None:
+        return None
+
+
+async def test_async_apply_schema_skips_current_version():
+    from bbj_rag.schema import async_apply_schema, schema_hash
+
+    conn = _FakeAsyncConn(stored=schema_hash())
+    assert await async_apply_schema(conn) is False  # type: ignore[arg-type]
+    assert not any("CREATE TABLE" in q for q in conn.cur.executed)
+    assert not conn.committed
+
+
+async def test_async_apply_schema_applies_and_records_version():
+    from bbj_rag.schema import async_apply_schema
+
+    for stored in (None, "outdated"):
+        conn = _FakeAsyncConn(stored=stored)
+        assert await async_apply_schema(conn) is True  # type: ignore[arg-type]
+        assert any("pg_advisory_xact_lock" in q for q in conn.cur.executed)
+        assert any("CREATE TABLE IF NOT EXISTS chunks" in q for q in conn.cur.executed)
+        assert "INSERT INTO corpus_meta" in conn.cur.executed[-1]
+        assert conn.committed
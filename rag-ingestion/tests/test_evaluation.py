@@ -0,0 +1,153 @@
+"""Unit tests for the offline search evaluation metrics (no database required)."""
+
+from __future__ import annotations
+
+import math
+from pathlib import Path
+
+import pytest
+
+from bbj_rag.evaluation import (
+    DEFAULT_GOLDEN_PATH,
+    GoldenQuery,
+    GoldenSet,
+    Judgment,
+    QueryRun,
+    build_report,
+    diff_reports,
+    graded_ranking,
+    load_golden_set,
+    ndcg_at_k,
+    percentile,
+    recall_at_k,
+    reciprocal_rank,
+    score_mode,
+)
+
+_JUDGMENTS = (
+    Judgment("bbjwindow_addbutton", 3),
+    Judgment("bbj_api://BBjWindow", 2),
+)
+
+
+class TestGradedRanking:
+    """graded_ranking credits each judgment once, case-insensitively."""
+
+    def test_grades_in_rank_order(self):
+        urls = [
+            "pdf://x",
+            "flare://Content/BBjWindow_addButton.htm",
+            "bbj_api://BBjWindow",
+        ]
+        assert graded_ranking(urls, _JUDGMENTS) == [0, 3, 2]
+
+    def test_duplicate_documents_not_double_counted(self):
+        urls = ["bbj_api://BBjWindow", "bbj_api://BBjWindow"]
+        assert graded_ranking(urls, _JUDGMENTS) == [2, 0]
+
+    def test_highest_unclaimed_grade_wins(self):
+        judgments = (Judgment("window", 1), Judgment("addbutton", 3))
+        assert graded_ranking(["a/window_addbutton", "b/window"], judgments) == [3, 1]
+
+
+class TestMetrics:
+    """recall@k, reciprocal rank, nDCG@k and percentiles."""
+
+    def test_recall_at_k(self):
+        assert recall_at_k([0, 3, 2], 2, k=2) == 0.5
+        assert recall_at_k([0, 3, 2], 2, k=3) == 1.0
+        assert recall_at_k([1], 0, k=3) == 0.0
+
+    def test_reciprocal_rank(self):
+        assert reciprocal_rank([0, 0, 1], k=5) == pytest.approx(1 / 3)
+        assert reciprocal_rank([0, 0, 1], k=2) == 0.0
+
+    def test_ndcg_perfect_and_partial(self):
+        assert ndcg_at_k([3, 2], _JUDGMENTS, k=5) == pytest.approx(1.0)
+        ideal = 7 + 3 / math.log2(3)
+        assert ndcg_at_k([0, 3], _JUDGMENTS, k=5) == pytest.approx(
+            (7 / math.log2(3)) / ideal
+        )
+        assert ndcg_at_k([0, 0], _JUDGMENTS, k=5) == 0.0
+
+    def test_percentile_interpolates(self):
+        assert percentile([10, 20, 30, 40], 50) == 25
+        assert percentile([5], 95) == 5
+        assert percentile([], 95) == 0.0
+
+
+def _golden() -> GoldenSet:
+    return GoldenSet(
+        version=1,
+        queries=(
+            GoldenQuery("q1", "BBjWindow addButton", _JUDGMENTS),
+            GoldenQuery("q2", "grid", (Judgment("bbjgrid", 2),)),
+        ),
+    )
+
+
+class TestScoreMode:
+    """score_mode averages per-query metrics and keeps rankings."""
+
+    def test_aggregate(self):
+        runs = [
+            QueryRun(
+                "q1", ["flare://bbjwindow_addbutton", "bbj_api://BBjWindow"], 0.01
+            ),
+            QueryRun("q2", ["pdf://x"], 0.03),
+        ]
+        report = score_mode("hybrid", _golden(), runs, k=5)
+        assert report.recall == pytest.approx(0.5)
+        assert report.mrr == pytest.approx(0.5)
+        assert report.ndcg == pytest.approx(0.5)
+        assert report.p50_ms == pytest.approx(20.0)
+        assert report.rankings["q2"] == ["pdf://x"]
+
+
+class TestDiffReports:
+    """diff_reports flags quality drops, latency growth and ranking changes."""
+
+    def _report(self, urls: list[str], seconds: float) -> dict:
+        golden = _golden()
+        runs = [QueryRun("q1", urls, seconds), QueryRun("q2", [], seconds)]
+        return build_report(golden, 5, [score_mode("hybrid", golden, runs, 5)])
+
+    def test_identical_reports(self):
+        report = self._report(["bbj_api://BBjWindow"], 0.01)
+        assert diff_reports(report, report) == ([], [])
+
+    def test_quality_regression(self):
+        base = self._report(["flare://bbjwindow_addbutton"], 0.01)
+        cur = self._report(["pdf://x"], 0.01)
+        regressions, changes = diff_reports(base, cur)
+        assert any(r.startswith("hybrid.recall") for r in regressions)
+        assert "hybrid[q1]: top-k ranking changed" in changes
+
+    def test_latency_regression(self):
+        base = self._report(["pdf://x"], 0.01)
+        cur = self._report(["pdf://x"], 0.02)
+        regressions, _ = diff_reports(base, cur)
+        assert regressions == ["hybrid.p95_ms: 10.0 -> 20.0"]
+
+
+class TestLoadGoldenSet:
+    """The shipped golden set parses and malformed sets are rejected."""
+
+    def test_shipped_golden_set(self):
+        golden = load_golden_set(DEFAULT_GOLDEN_PATH)
+        assert golden.version >= 1
+        assert len(golden.queries) >= 10
+        assert all(q.judgments for q in golden.queries)
+
+    def test_missing_judgments_rejected(self, tmp_path: Path):
+        path = tmp_path / "golden.yaml"
+        path.write_text("version: 1\nqueries:\n  - id: a\n    query: x\n")
+        with pytest.raises(ValueError, match="no relevance judgments"):
+            load_golden_set(path)
+
+    def test_duplicate_ids_rejected(self, tmp_path: Path):
+        entry = "  - id: a\n    query: x\n    relevant:\n      - url_contains: y\n"
+        path = tmp_path / "golden.yaml"
+        path.write_text("version: 1\nqueries:\n" + entry + entry)
+        with pytest.raises(ValueError, match="duplicate"):
+            load_golden_set(path)
@@ -0,0 +1,51 @@
+"""Tests for the fast JSON encoder and the /search payload builder."""
+
+from __future__ import annotations
+
+import json
+
+from bbj_rag.api.routes import _search_payload
+from bbj_rag.api.schemas import SearchResponse, SearchResultItem
+from bbj_rag.fastjson import FastJSONResponse, dumps, dumps_bytes
+from bbj_rag.search import SearchResult
+
+
+def _result(source_type: str) -> SearchResult:
+    return SearchResult(
+        id=7,
+        source_url="flare://a",
+        title="BBjWindow: Übersicht",
+        content='win! = sysgui!.addWindow(10,10,200,200,"Hi")',
+        doc_type="api-reference",
+        generations=["bbj_gui", "dwc"],
+        context_header="BBjWindow",
+        deprecated=False,
+        display_url="https://documentation.basis.cloud/a",
+        source_type=source_type,
+        score=0.5,
+    )
+
+
+class TestDumps:
+    """Output is compact, UTF-8 and round-trips through json.loads."""
+
+    def test_compact_unicode(self):
+        data = {"text": "Größe ✓", "n": [1, 2]}
+        assert dumps(data) == '{"text":"Größe ✓","n":[1,2]}'
+        assert dumps_bytes(data) == dumps(data).encode("utf-8")
+
+    def test_response_render(self):
+        resp = FastJSONResponse({"a": None})
+        assert resp.body == b'{"a":null}'
+        assert resp.media_type == "application/json"
+
+
+class TestSearchPayload:
+    """The hand-built payload matches the documented SearchResponse."""
+
+    def test_matches_response_model(self):
+        payload = _search_payload("q", [_result("flare"), _result("kb")])
+        parsed = SearchResponse.model_validate(json.loads(dumps_bytes(payload)))
+        assert parsed.count == 2
+        assert parsed.source_type_counts == {"flare": 1, "kb": 1}
+        assert set(payload["results"][0]) == set(SearchResultItem.model_fields)
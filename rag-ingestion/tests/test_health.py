@@ -0,0 +1,142 @@
+"""Tests for the background health monitor and /health endpoints."""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable
+from typing import TYPE_CHECKING, Any
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from bbj_rag.health import HealthMonitor
+from bbj_rag.health import router as health_router
+
+if TYPE_CHECKING:
+    from tests.conftest import FakeOllama, FakePool
+
+
+@pytest.fixture
+def make_monitor(
+    fake_pool: type[FakePool], fake_ollama: type[FakeOllama]
+) -> Callable[..., HealthMonitor]:
+    """Factory for a HealthMonitor over fake dependencies."""
+
+    def make(**kwargs: Any) -> HealthMonitor:
+        return HealthMonitor(
+            kwargs.pop("pool", None) or fake_pool(),
+            kwargs.pop("ollama", None) or fake_ollama(),
+            compiler_path="definitely-not-bbjcpl",
+            **kwargs,
+        )
+
+    return make
+
+
+@pytest.fixture
+def health_client(
+    make_client: Callable[..., TestClient],
+) -> Callable[[HealthMonitor | None], TestClient]:
+    def make(health_monitor: HealthMonitor | None) -> TestClient:
+        state = {"health_monitor": health_monitor} if health_monitor else {}
+        return make_client(health_router, state=state)
+
+    return make
+
+
+class TestHealthMonitor:
+    """Probes run concurrently, time out, and results are cached."""
+
+    async def test_probe_results(self, make_monitor):
+        monitor = make_monitor()
+        results = await monitor.probe()
+        assert results["database"].ok
+        assert results["ollama"].ok
+        assert results["compiler"].status == "unavailable"
+        assert monitor.ready()
+
+    async def test_slow_probe_times_out(self, make_monitor, fake_ollama):
+        monitor = make_monitor(ollama=fake_ollama(delay=1.0), timeout=0.05)
+        results = await monitor.probe()
+        assert results["ollama"].status.startswith("error: timed out")
+        assert not monitor.ready()
+
+    async def test_startup_phases_gate_readiness(self, make_monitor):
+        monitor = make_monitor()
+        monitor.begin_phases("embedding_warmup")
+        await monitor.probe()
+        assert monitor.starting()
+        assert not monitor.ready()
+        monitor.finish_phase("embedding_warmup", "error: model not found")
+        assert monitor.ready()
+        assert monitor.phases() == {"embedding_warmup": "error: model not found"}
+
+    async def test_hung_warm_up_finishes_with_error(
+        self, make_monitor, fake_pool, fake_ollama
+    ):
+        from bbj_rag.app import _WARM_UP_PHASES, _warm_up
+        from bbj_rag.config import Settings
+
+        monitor = make_monitor()
+        monitor.begin_phases(*_WARM_UP_PHASES)
+        await _warm_up(
+            FastAPI(),
+            fake_pool(fail=True),  # type: ignore[arg-type]
+            fake_ollama(delay=5.0),  # type: ignore[arg-type]
+            Settings(warmup_timeout=0.05),
+            monitor,
+        )
+        assert not monitor.starting()
+        assert monitor.phases()["embedding_warmup"].startswith("error: timed out")
+
+    async def test_background_loop_reprobes(self, make_monitor, fake_pool):
+        pool = fake_pool()
+        monitor = make_monitor(pool=pool, interval=0.01)
+        await monitor.start()
+        await asyncio.sleep(0.05)
+        await monitor.close()
+        assert pool.checkouts > 1
+
+
+class TestHealthEndpoints:
+    """Endpoints serve the cached snapshot without probing."""
+
+    def test_healthy(self, make_monitor, health_client):
+        monitor = make_monitor()
+        asyncio.run(monitor.probe())
+        client = health_client(monitor)
+        resp = client.get("/health")
+        assert resp.status_code == 200
+        body = resp.json()
+        assert body["status"] == "healthy"
+        assert body["checks"]["compiler"] == "unavailable"
+        assert client.get("/health/ready").status_code == 200
+
+    def test_degraded_not_ready(self, make_monitor, fake_pool, health_client):
+        pool = fake_pool(fail=True)
+        monitor = make_monitor(pool=pool)
+        asyncio.run(monitor.probe())
+        client = health_client(monitor)
+        resp = client.get("/health")
+        assert resp.status_code == 503
+        assert resp.json()["status"] == "degraded"
+        assert client.get("/health/ready").status_code == 503
+        # Endpoints read the snapshot; no extra probes
+        assert pool.checkouts == 1
+
+    def test_pending_phase_reports_starting(self, make_monitor, health_client):
+        monitor = make_monitor()
+        monitor.begin_phases("synonym_map")
+        asyncio.run(monitor.probe())
+        client = health_client(monitor)
+        body = client.get("/health").json()
+        assert body["status"] == "starting"
+        assert body["startup"] == {"synonym_map": "pending"}
+        assert client.get("/health/ready").status_code == 503
+
+    def test_starting(self, health_client):
+        client = health_client(None)
+        assert client.get("/health").json()["status"] == "starting"
+        assert client.get("/health/ready").status_code == 503
+        assert client.get("/health/live").status_code == 200
@@ -0,0 +1,166 @@
+"""Unit tests for the in-memory identifier index (no database required)."""
+
+from __future__ import annotations
+
+import pytest
+
+from bbj_rag.identifiers import (
+    Identifier,
+    IdentifierIndex,
+    identifiers_from_rows,
+    is_identifier_query,
+)
+
+_WINDOW_CARD = """BBj API Reference > BBjWindow
+
+# BBjWindow
+
+**Package:** com.basis.bbj.proxies.sysgui
+
+## Methods
+
+- `addButton(p_id, p_x, p_y)` - Adds a button
+- `addButtonGroup()` - Adds a button group
+- `setTitle(p_title)` - Sets the title
+"""
+
+
+def _rows() -> list[tuple[str, str, str, str]]:
+    return [
+        ("bbj_api://BBjWindow", "BBjWindow", "https://docs/bbjwindow", _WINDOW_CARD),
+        ("bbj_api://BBjWindowEvent", "BBjWindowEvent", "", ""),
+        (
+            "flare://Content/bbjobjects/Window/bbjwindow_addbutton.htm",
+            "BBjWindow::addButton",
+            "https://docs/addbutton",
+            "",
+        ),
+        ("https://basis.cloud/knowledge-base/x", "BBjWindow tips", "", ""),
+    ]
+
+
+class TestIdentifiersFromRows:
+    """identifiers_from_rows extracts classes, methods and topics."""
+
+    def test_api_card_yields_class_and_methods(self):
+        idents = identifiers_from_rows(_rows()[:1])
+        names = {(i.name, i.kind, i.owner) for i in idents}
+        assert ("BBjWindow", "class", "") in names
+        assert ("addButton", "method", "BBjWindow") in names
+        assert ("setTitle", "method", "BBjWindow") in names
+
+    def test_url_falls_back_to_source_url(self):
+        idents = identifiers_from_rows(_rows()[1:2])
+        assert idents[0].url == "bbj_api://BBjWindowEvent"
+
+    def test_flare_title_is_topic(self):
+        idents = identifiers_from_rows(_rows()[2:3])
+        assert idents == [
+            Identifier(
+                "BBjWindow::addButton",
+                "topic",
+                "",
+                "flare://Content/bbjobjects/Window/bbjwindow_addbutton.htm",
+                "https://docs/addbutton",
+            )
+        ]
+
+    def test_other_sources_ignored(self):
+        assert identifiers_from_rows(_rows()[3:]) == []
+
+
+class TestIdentifierIndex:
+    """IdentifierIndex.complete ranks case-insensitive prefix matches."""
+
+    def _index(self) -> IdentifierIndex:
+        return IdentifierIndex(identifiers_from_rows(_rows()))
+
+    def test_prefix_is_case_insensitive(self):
+        names = [i.name for i in self._index().complete("bbjwin")]
+        assert names[:2] == ["BBjWindow", "BBjWindowEvent"]
+
+    def test_method_prefix_matches_card_and_flare_topic(self):
+        results = self._index().complete("addBut")
+        kinds = [(i.name, i.kind) for i in results]
+        assert kinds[0] == ("addButton", "method")
+        assert ("BBjWindow::addButton", "topic") in kinds
+
+    def test_exact_match_ranks_first(self):
+        results = self._index().complete("addbuttongroup")
+        assert results[0].name == "addButtonGroup"
+
+    def test_limit_is_respected(self):
+        assert len(self._index().complete("b", limit=1)) == 1
+
+    def test_ranking_covers_the_whole_prefix_range(self):
+        # Hundreds of alphabetically earlier methods must not hide the class
+        methods = [
+            Identifier(f"ba{i:04d}", "method", "BBjX", "bbj_api://x", "u")
+            for i in range(1000)
+        ]
+        cls = Identifier("BBjZebra", "class", "", "bbj_api://z", "u")
+        index = IdentifierIndex([*methods, cls])
+        assert index.complete("b", limit=1) == [cls]
+        assert index.complete("b", limit=3)[1].name == "ba0000"
+
+    def test_no_match_and_blank_prefix(self):
+        index = self._index()
+        assert index.complete("zzz") == []
+        assert index.complete("   ") == []
+
+    def test_duplicate_rows_are_deduplicated(self):
+        rows = _rows()[:1] * 3
+        index = IdentifierIndex(identifiers_from_rows(rows))
+        assert len(index) == 4  # class + 3 methods
+        assert len(index.complete("addButton")) == 2
+
+    def test_empty_index(self):
+        index = IdentifierIndex()
+        assert len(index) == 0
+        assert index.complete("BBj") == []
+
+
+class TestIsIdentifierQuery:
+    """is_identifier_query separates single identifiers from prose."""
+
+    @pytest.mark.parametrize(
+        "query",
+        ["BBjWindow", "addButton", " addButton() ", "BBjWindow::addButton", "A.b_c"],
+    )
+    def test_identifiers(self, query):
+        assert is_identifier_query(query)
+
+    @pytest.mark.parametrize(
+        "query",
+        ["how do I add a button", "on", "BBjWindow addButton", "x::", "1abc", ""],
+    )
+    def test_not_identifiers(self, query):
+        assert not is_identifier_query(query)
+
+
+class TestIdentifierLookup:
+    """IdentifierIndex.lookup resolves exact names only."""
+
+    def _index(self) -> IdentifierIndex:
+        return IdentifierIndex(identifiers_from_rows(_rows()))
+
+    def test_class_lookup(self):
+        results = self._index().lookup("bbjwindow")
+        assert [(i.name, i.kind) for i in results] == [("BBjWindow", "class")]
+
+    def test_prefix_is_not_an_exact_hit(self):
+        assert self._index().lookup("BBjWin") == []
+
+    def test_method_lookup_includes_flare_topic(self):
+        results = self._index().lookup("addButton()")
+        assert [i.kind for i in results] == ["method", "topic"]
+
+    def test_qualified_lookup_filters_by_owner(self):
+        index = self._index()
+        for query in ("BBjWindow::addButton", "BBjWindow.addButton"):
+            results = index.lookup(query)
+            assert {(i.name, i.owner) for i in results} == {
+                ("addButton", "BBjWindow"),
+                ("BBjWindow::addButton", ""),
+            }
+        assert index.lookup("BBjGrid.addButton") == []
@@ -0,0 +1,149 @@
+"""Unit tests for the in-process latency metrics and middleware."""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+from fastapi import APIRouter, Request
+from fastapi.testclient import TestClient
+
+from bbj_rag.api.deps import checkout
+from bbj_rag.metrics import (
+    REGISTRY,
+    Histogram,
+    MetricsMiddleware,
+    render_pool_stats,
+    set_request_label,
+    stage_timer,
+)
+from bbj_rag.metrics import router as metrics_router
+
+
+class TestHistogram:
+    """Histogram buckets are cumulative and rendered per label set."""
+
+    def test_render_cumulative_buckets(self):
+        hist = Histogram("t_seconds", "Test.", ("stage",), buckets=(0.1, 1.0))
+        hist.observe(0.05, stage="a")
+        hist.observe(0.1, stage="a")
+        hist.observe(5.0, stage="a")
+        lines = hist.render()
+        assert lines[:2] == ["# HELP t_seconds Test.", "# TYPE t_seconds histogram"]
+        assert 't_seconds_bucket{stage="a",le="0.1"} 2' in lines
+        assert 't_seconds_bucket{stage="a",le="1.0"} 2' in lines
+        assert 't_seconds_bucket{stage="a",le="+Inf"} 3' in lines
+        assert 't_seconds_count{stage="a"} 3' in lines
+        assert 't_seconds_sum{stage="a"} 5.15' in lines
+
+    def test_label_values_are_escaped(self):
+        hist = Histogram("t", "Test.", ("path",), buckets=(1.0,))
+        hist.observe(0.5, path='a"b')
+        assert 't_count{path="a\\"b"} 1' in hist.render()
+
+    def test_missing_labels_default_to_empty(self):
+        hist = Histogram("t", "Test.", ("a", "b"), buckets=(1.0,))
+        hist.observe(0.5, a="x")
+        assert 't_count{a="x",b=""} 1' in hist.render()
+
+
+class TestStageTimerOutsideRequest:
+    """Stage helpers are no-ops when no request is being served."""
+
+    def test_no_request_context(self):
+        with stage_timer("idle"):
+            pass
+        set_request_label("cache", "hit")
+
+
+probe_router = APIRouter()
+
+
+@probe_router.get("/probe/{item}")
+async def probe(item: str) -> dict[str, str]:
+    set_request_label("generation_filter", "true")
+    with stage_timer("embed"):
+        pass
+    return {"item": item}
+
+
+@probe_router.get("/query")
+async def query(request: Request) -> dict[str, bool]:
+    async with checkout(request.app.state.pool):
+        pass
+    return {"ok": True}
+
+
+@pytest.fixture
+def metrics_client(
+    make_client: Callable[..., TestClient],
+) -> Callable[..., TestClient]:
+    """TestClient with the metrics middleware and the probe routes."""
+
+    def make(server_timing: bool, pool: Any = None) -> TestClient:
+        settings = SimpleNamespace(metrics_server_timing=server_timing)
+        return make_client(
+            metrics_router,
+            probe_router,
+            middleware=[MetricsMiddleware],
+            state={"settings": settings, "pool": pool},
+        )
+
+    return make
+
+
+class TestMetricsMiddleware:
+    """Middleware flushes stage timings and optionally sets Server-Timing."""
+
+    def test_stages_recorded_under_route_template(self, metrics_client):
+        client = metrics_client(server_timing=False)
+        resp = client.get("/probe/abc")
+        assert resp.status_code == 200
+        assert "server-timing" not in resp.headers
+
+        text = client.get("/metrics").text
+        assert (
+            'bbj_rag_stage_duration_seconds_count{endpoint="/probe/{item}",'
+            'stage="embed",generation_filter="true",cache="none"}' in text
+        )
+        assert 'endpoint="/probe/{item}",status="2xx"' in text
+
+    def test_server_timing_header(self, metrics_client):
+        client = metrics_client(server_timing=True)
+        header = client.get("/probe/x").headers["server-timing"]
+        assert header.startswith("embed;dur=")
+        assert "total;dur=" in header
+
+    def test_registry_render_ends_with_newline(self):
+        assert REGISTRY.render().endswith("\n")
+
+
+class TestPoolMetrics:
+    """Pool checkouts are timed, time out fast, and pool stats are exported."""
+
+    def test_render_pool_stats(self):
+        lines = render_pool_stats({"pool_size": 4, "usage_ms": 2500})
+        assert "# TYPE bbj_rag_db_pool_connections gauge" in lines
+        assert "bbj_rag_db_pool_connections 4" in lines
+        assert "bbj_rag_db_pool_usage_seconds_total 2.5" in lines
+        # Counters psycopg_pool has not incremented yet still render
+        assert "bbj_rag_db_pool_request_errors_total 0" in lines
+
+    def test_checkout_records_wait_and_hold(self, metrics_client, fake_pool):
+        client = metrics_client(server_timing=True, pool=fake_pool())
+        header = client.get("/query").headers["server-timing"]
+        assert header.startswith("pool_wait;dur=")
+        assert "pool_hold;dur=" in header
+
+        text = client.get("/metrics").text
+        assert "bbj_rag_db_pool_max 10" in text
+        assert "bbj_rag_db_pool_wait_seconds_total 1.5" in text
+
+    def test_checkout_timeout_returns_503(self, metrics_client, fake_pool):
+        client = metrics_client(server_timing=True, pool=fake_pool(exhausted=True))
+        resp = client.get("/query")
+        assert resp.status_code == 503
+        assert resp.headers["retry-after"] == "1"
+        assert "pool_wait;dur=" in resp.headers["server-timing"]
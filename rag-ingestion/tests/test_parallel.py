@@ -11,7 +11,7 @@ from unittest.mock import AsyncMock, MagicMock
 import pytest
 
 from bbj_rag.models import Chunk
-from bbj_rag.parallel import IngestResult, ParallelIngestor
+from bbj_rag.parallel import IngestResult, ParallelIngestor, _ConnectionLease
 
 if TYPE_CHECKING:
     pass
@@ -269,7 +269,7 @@ class TestRetryLogic:
             batch_idx=0,
             batch=batch,
             embedder=mock_embedder,
-            pool=mock_pool,
+            lease=_ConnectionLease(mock_pool),
             result=result,
             result_lock=result_lock,
             total_batches=1,
@@ -279,6 +279,86 @@ class TestRetryLogic:
         assert call_count == 3  # Tried 3 times
 
 
+class _FakeConn:
+    closed = False
+    broken = False
+
+
+class _FakePool:
+    """Counts connection checkouts and returns."""
+
+    def __init__(self) -> None:
+        self.checkouts = 0
+        self.returned = 0
+
+    async def getconn(self) -> _FakeConn:
+        self.checkouts += 1
+        return _FakeConn()
+
+    async def putconn(self, conn: _FakeConn) -> None:
+        self.returned += 1
+
+
+class TestConnectionReuse:
+    """Each worker keeps one connection across batches."""
+
+    def _ingestor(self, fail_inserts: int = 0) -> ParallelIngestor:
+        settings = MagicMock()
+        settings.ingest_batch_retries = 3
+        ingestor = ParallelIngestor(settings, num_workers=1, batch_size=1)
+        remaining_failures = fail_inserts
+
+        async def bulk_insert(conn: object, chunks: list[Chunk]) -> int:
+            nonlocal remaining_failures
+            if remaining_failures:
+                remaining_failures -= 1
+                raise RuntimeError("connection reset")
+            return len(chunks)
+
+        ingestor._bulk_insert_async = bulk_insert  # type: ignore[method-assign]
+        return ingestor
+
+    async def _run(self, ingestor: ParallelIngestor, lease: _ConnectionLease) -> bool:
+        embedder = AsyncMock()
+        embedder.embed_batch = AsyncMock(return_value=[[0.0]])
+        return await ingestor._process_batch_with_retry(
+            worker_id=1,
+            batch_idx=0,
+            batch=[_make_chunk("chunk")],
+            embedder=embedder,
+            lease=lease,
+            result=IngestResult(),
+            result_lock=asyncio.Lock(),
+            total_batches=1,
+        )
+
+    async def test_connection_reused_across_batches(self):
+        pool = _FakePool()
+        lease = _ConnectionLease(pool)  # type: ignore[arg-type]
+        ingestor = self._ingestor()
+        for _ in range(3):
+            assert await self._run(ingestor, lease)
+        assert pool.checkouts == 1
+        await lease.release()
+        assert pool.returned == 1
+
+    async def test_failed_attempt_returns_connection(self, monkeypatch):
+        monkeypatch.setattr(asyncio, "sleep", AsyncMock())
+        pool = _FakePool()
+        lease = _ConnectionLease(pool)  # type: ignore[arg-type]
+        assert await self._run(self._ingestor(fail_inserts=1), lease)
+        assert pool.checkouts == 2
+        assert pool.returned == 1
+
+    async def test_broken_connection_replaced(self):
+        pool = _FakePool()
+        lease = _ConnectionLease(pool)  # type: ignore[arg-type]
+        conn = await lease.get()
+        conn.broken = True
+        assert await lease.get() is not conn
+        assert pool.returned == 1
+
+
 class TestCompletionReport:
     """Tests for completion report output."""
 
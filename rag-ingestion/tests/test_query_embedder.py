@@ -0,0 +1,111 @@
+"""Tests for the batching, concurrency-limited query embedder."""
+
+from __future__ import annotations
+
+import asyncio
+from typing import TYPE_CHECKING, Any
+
+import pytest
+
+from bbj_rag.query_embedder import EmbeddingOverloaded, QueryEmbedder
+
+if TYPE_CHECKING:
+    from tests.conftest import FakeOllama
+
+
+async def _embedder(client: FakeOllama, **kwargs: Any) -> QueryEmbedder:
+    embedder = QueryEmbedder(client, "test-model", **kwargs)  # type: ignore[arg-type]
+    await embedder.start()
+    return embedder
+
+
+class TestQueryEmbedder:
+    async def test_single_query(self, fake_ollama: type[FakeOllama]) -> None:
+        client = fake_ollama()
+        embedder = await _embedder(client)
+        assert await embedder.embed("abc") == [3.0]
+        assert client.calls == [["abc"]]
+        await embedder.close()
+
+    async def test_concurrent_queries_are_batched(
+        self, fake_ollama: type[FakeOllama]
+    ) -> None:
+        client = fake_ollama()
+        embedder = await _embedder(client, batch_window=0.01)
+        texts = ["a", "bb", "ccc", "dddd"]
+        results = await asyncio.gather(*(embedder.embed(t) for t in texts))
+        assert results == [[1.0], [2.0], [3.0], [4.0]]
+        assert client.calls == [texts]
+        await embedder.close()
+
+    async def test_batches_respect_max_batch(
+        self, fake_ollama: type[FakeOllama]
+    ) -> None:
+        client = fake_ollama()
+        embedder = await _embedder(client, max_batch=2, batch_window=0.01)
+        await asyncio.gather(*(embedder.embed(t) for t in ["a", "b", "c", "d", "e"]))
+        assert all(len(call) <= 2 for call in client.calls)
+        assert sorted(t for call in client.calls for t in call) == list("abcde")
+        await embedder.close()
+
+    async def test_identical_queries_are_coalesced(
+        self, fake_ollama: type[FakeOllama]
+    ) -> None:
+        client = fake_ollama()
+        embedder = await _embedder(client, batch_window=0.01)
+        results = await asyncio.gather(*(embedder.embed("BBjGrid") for _ in range(5)))
+        assert results == [[7.0]] * 5
+        assert client.calls == [["BBjGrid"]]
+        await embedder.close()
+
+    async def test_concurrency_limit(self, fake_ollama: type[FakeOllama]) -> None:
+        client = fake_ollama(delay=0.02)
+        embedder = await _embedder(
+            client, max_concurrency=1, max_batch=1, batch_window=0
+        )
+        await asyncio.gather(*(embedder.embed(t) for t in ["a", "b", "c"]))
+        assert client.max_in_flight == 1
+        assert len(client.calls) == 3
+        await embedder.close()
+
+    async def test_full_queue_raises_overloaded(
+        self, fake_ollama: type[FakeOllama]
+    ) -> None:
+        client = fake_ollama(delay=0.05)
+        embedder = await _embedder(
+            client, max_concurrency=1, max_queue=1, max_batch=1, batch_window=0
+        )
+        first = asyncio.create_task(embedder.embed("a"))
+        await asyncio.sleep(0.01)  # "a" is now in flight
+        second = asyncio.create_task(embedder.embed("b"))
+        await asyncio.sleep(0)
+        with pytest.raises(EmbeddingOverloaded):
+            await embedder.embed("c")
+        assert await first == [1.0]
+        assert await second == [1.0]
+        await embedder.close()
+
+    async def test_errors_reach_every_waiter(
+        self, fake_ollama: type[FakeOllama]
+    ) -> None:
+        client = fake_ollama(fail=True)
+        embedder = await _embedder(client, batch_window=0.01)
+        results = await asyncio.gather(
+            embedder.embed("a"), embedder.embed("b"), return_exceptions=True
+        )
+        assert all(isinstance(r, RuntimeError) for r in results)
+        await embedder.close()
+
+    async def test_timeout(self, fake_ollama: type[FakeOllama]) -> None:
+        client = fake_ollama(delay=1.0)
+        embedder = await _embedder(client, timeout=0.01)
+        with pytest.raises(TimeoutError):
+            await embedder.embed("slow")
+        await embedder.close()
+
+    async def test_not_running_raises_overloaded(
+        self, fake_ollama: type[FakeOllama]
+    ) -> None:
+        embedder = QueryEmbedder(fake_ollama(), "test-model")  # type: ignore[arg-type]
+        with pytest.raises(EmbeddingOverloaded):
+            await embedder.embed("a")
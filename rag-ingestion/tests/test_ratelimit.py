@@ -0,0 +1,184 @@
+"""Tests for per-client token-bucket rate limiting."""
+
+from __future__ import annotations
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from bbj_rag.config import Settings
+from bbj_rag.ratelimit import (
+    RateLimiter,
+    RateLimitMiddleware,
+    client_key,
+    from_settings,
+    trusted_networks,
+)
+
+
+class TestRateLimiter:
+    def test_burst_then_reject(self) -> None:
+        limiter = RateLimiter(rate=1.0, burst=3)
+        decisions = [limiter.acquire("a", now=0.0) for _ in range(4)]
+        assert [d.allowed for d in decisions] == [True, True, True, False]
+        assert [d.remaining for d in decisions[:3]] == [2, 1, 0]
+        assert decisions[3].retry_after == 1.0
+
+    def test_refill_over_time(self) -> None:
+        limiter = RateLimiter(rate=2.0, burst=2)
+        limiter.acquire("a", now=0.0)
+        limiter.acquire("a", now=0.0)
+        assert not limiter.acquire("a", now=0.1).allowed
+        assert limiter.acquire("a", now=0.6).allowed
+
+    def test_refill_capped_at_burst(self) -> None:
+        limiter = RateLimiter(rate=10.0, burst=2)
+        limiter.acquire("a", now=0.0)
+        decision = limiter.acquire("a", now=100.0)
+        assert decision.remaining == 1
+
+    def test_clients_are_independent(self) -> None:
+        limiter = RateLimiter(rate=0.1, burst=1)
+        assert limiter.acquire("a", now=0.0).allowed
+        assert not limiter.acquire("a", now=0.0).allowed
+        assert limiter.acquire("b", now=0.0).allowed
+
+    def test_weighted_cost(self) -> None:
+        limiter = RateLimiter(rate=1.0, burst=5)
+        assert limiter.acquire("a", cost=4, now=0.0).allowed
+        assert not limiter.acquire("a", cost=4, now=0.0).allowed
+
+    def test_evicts_least_recent_client(self) -> None:
+        limiter = RateLimiter(rate=1.0, burst=1, max_clients=2)
+        for client in ("a", "b", "c"):
+            limiter.acquire(client, now=0.0)
+        assert len(limiter) == 2
+        # "a" was evicted, so it starts again with a full bucket
+        assert limiter.acquire("a", now=0.0).allowed
+
+    def test_headers(self) -> None:
+        limiter = RateLimiter(rate=0.5, burst=1)
+        ok = limiter.acquire("a", now=0.0)
+        rejected = limiter.acquire("a", now=0.0)
+        assert ok.headers() == {
+            "RateLimit-Limit": "1",
+            "RateLimit-Remaining": "0",
+            "RateLimit-Reset": "2",
+        }
+        assert rejected.headers()["Retry-After"] == "2"
+
+
+class TestFromSettings:
+    def test_endpoints(self) -> None:
+        limits = from_settings(Settings(workers=1))
+        assert set(limits) == {"/search", "/search/stream", "/chat/stream"}
+        assert limits["/chat/stream"].rate < limits["/search"].rate
+        assert limits["/search/stream"] is limits["/search"]
+
+    def test_disabled(self) -> None:
+        assert from_settings(Settings(rate_limit_enabled=False)) == {}
+
+    def test_zero_rate_disables_endpoint(self) -> None:
+        limits = from_settings(Settings(workers=1, rate_limit_chat_rate=0))
+        assert set(limits) == {"/search", "/search/stream"}
+
+    def test_split_between_workers(self) -> None:
+        limits = from_settings(
+            Settings(workers=4, rate_limit_search_rate=8, rate_limit_search_burst=20)
+        )
+        assert limits["/search"].rate == 2.0
+        assert limits["/search"].burst == 5
+
+
+def _client(
+    limits: dict[str, RateLimiter], peer: tuple[str, int] = ("testclient", 50000)
+) -> TestClient:
+    app = FastAPI()
+    app.add_middleware(RateLimitMiddleware)
+    app.state.rate_limits = limits
+
+    @app.post("/search")
+    async def search() -> dict[str, str]:
+        return {"status": "ok"}
+
+    @app.get("/search")
+    async def search_get() -> dict[str, str]:
+        return {"status": "ok"}
+
+    return TestClient(app, client=peer)
+
+
+class TestMiddleware:
+    def test_headers_and_429(self) -> None:
+        client = _client({"/search": RateLimiter(rate=0.01, burst=2)})
+        first = client.post("/search")
+        assert first.status_code == 200
+        assert first.headers["RateLimit-Limit"] == "2"
+        assert first.headers["RateLimit-Remaining"] == "1"
+        client.post("/search")
+        rejected = client.post("/search")
+        assert rejected.status_code == 429
+        assert int(rejected.headers["Retry-After"]) >= 1
+        assert rejected.headers["RateLimit-Remaining"] == "0"
+
+    def test_client_id_header_gets_own_bucket_from_loopback(self) -> None:
+        client = _client(
+            {"/search": RateLimiter(rate=0.01, burst=1)}, peer=("127.0.0.1", 5000)
+        )
+        assert client.post("/search", headers={"X-Client-Id": "a"}).status_code == 200
+        assert client.post("/search", headers={"X-Client-Id": "a"}).status_code == 429
+        assert client.post("/search", headers={"X-Client-Id": "b"}).status_code == 200
+
+    def test_client_id_header_ignored_from_untrusted_peer(self) -> None:
+        client = _client(
+            {"/search": RateLimiter(rate=0.01, burst=1)}, peer=("203.0.113.9", 5000)
+        )
+        assert client.post("/search", headers={"X-Client-Id": "a"}).status_code == 200
+        assert client.post("/search", headers={"X-Client-Id": "b"}).status_code == 429
+
+    def test_unlimited_paths_and_methods_pass(self) -> None:
+        client = _client({"/search": RateLimiter(rate=0.01, burst=1)})
+        client.post("/search")
+        response = client.get("/search")
+        assert response.status_code == 200
+        assert "RateLimit-Limit" not in response.headers
+
+    def test_no_limits_configured(self) -> None:
+        client = _client({})
+        for _ in range(5):
+            assert client.post("/search").status_code == 200
+
+
+class TestClientKey:
+    def test_header_honoured_from_loopback(self) -> None:
+        scope = {"headers": [(b"x-client-id", b" agent-7 ")], "client": ("::1", 1)}
+        assert client_key(scope) == "id:agent-7"
+
+    def test_header_ignored_from_untrusted_peer(self) -> None:
+        scope = {"headers": [(b"x-client-id", b"agent-7")], "client": ("1.2.3.4", 1)}
+        assert client_key(scope) == "ip:1.2.3.4"
+
+    def test_header_honoured_from_trusted_proxy(self) -> None:
+        trusted = trusted_networks(Settings(rate_limit_trusted_proxies=["10.0.0.0/8"]))
+        scope = {"headers": [(b"x-client-id", b"agent-7")], "client": ("10.1.2.3", 1)}
+        assert client_key(scope, trusted) == "id:agent-7"
+
+    def test_falls_back_to_peer(self) -> None:
+        scope = {"headers": [(b"x-client-id", b"")], "client": ("127.0.0.1", 1)}
+        assert client_key(scope) == "ip:127.0.0.1"
+
+
+class TestMcpClientId:
+    def test_trusted_proxy_header_forwarded(self, monkeypatch) -> None:
+        from types import SimpleNamespace
+
+        from bbj_rag import mcp_server
+
+        monkeypatch.setenv("BBJ_RAG_RATE_LIMIT_TRUSTED_PROXIES", '["10.0.0.0/8"]')
+        mcp_server._trusted_networks.cache_clear()
+        scope = {"headers": [(b"x-client-id", b"agent-7")], "client": ("10.1.2.3", 1)}
+        request = SimpleNamespace(scope=scope)
+        ctx = SimpleNamespace(request_context=SimpleNamespace(request=request))
+        try:
+            assert mcp_server._client_id(ctx) == "mcp:id:agent-7"  # type: ignore[arg-type]
+        finally:
+            mcp_server._trusted_networks.cache_clear()
@@ -165,8 +165,7 @@ class TestPrintQualityReport:
         mock_conn.cursor.return_value.__enter__ = MagicMock(return_value=mock_cursor)
         mock_conn.cursor.return_value.__exit__ = MagicMock(return_value=False)
 
-        # COUNT(*) returns 0, other queries return empty
-        mock_cursor.fetchone.return_value = (0,)
+        # corpus_stats and the live fallback aggregate are both empty
         mock_cursor.fetchall.return_value = []
 
         with patch("bbj_rag.intelligence.report.click") as mock_click:
@@ -182,15 +181,15 @@ class TestPrintQualityReport:
         mock_conn.cursor.return_value.__enter__ = MagicMock(return_value=mock_cursor)
         mock_conn.cursor.return_value.__exit__ = MagicMock(return_value=False)
 
-        # First call: COUNT(*) -> 100
-        # Second call: by_source -> [('flare', 80), ('pdf', 20)]
-        # Third call: by_generation -> [('all', 70), ('dwc', 30)]
-        # Fourth call: by_doc_type -> [('concept', 60), ('api-reference', 40)]
-        mock_cursor.fetchone.return_value = (100,)
-        mock_cursor.fetchall.side_effect = [
-            [("flare", 80), ("pdf", 20)],
-            [("all", 70), ("dwc", 30)],
-            [("concept", 60), ("api-reference", 40)],
+        # Precomputed corpus_stats rows: (dimension, key, count)
+        mock_cursor.fetchall.return_value = [
+            ("total", "", 100),
+            ("source", "flare", 80),
+            ("source", "pdf", 20),
+            ("generation", "all", 70),
+            ("generation", "dwc", 30),
+            ("doc_type", "concept", 60),
+            ("doc_type", "api-reference", 40),
         ]
 
         with patch("bbj_rag.intelligence.report.click") as mock_click:
@@ -0,0 +1,177 @@
+"""Tests for the staged /search and streaming /search/stream endpoints."""
+
+from __future__ import annotations
+
+import json
+from collections.abc import Callable
+from typing import TYPE_CHECKING, Any
+
+import pytest
+from fastapi.testclient import TestClient
+
+from bbj_rag.api import routes
+from bbj_rag.api.deps import (
+    get_identifier_index,
+    get_pool,
+    get_query_embedder,
+    get_synonym_map,
+)
+from bbj_rag.identifiers import Identifier
+from bbj_rag.intelligence.synonyms import SynonymMap
+from bbj_rag.query_embedder import EmbeddingOverloaded
+from bbj_rag.search import SearchResult
+
+if TYPE_CHECKING:
+    from tests.conftest import FakeEmbedder, FakePool
+
+
+def _result(i: int, source_url: str | None = None) -> SearchResult:
+    return SearchResult(
+        id=i,
+        source_url=source_url or f"flare://page{i}",
+        title=f"Result {i}",
+        content="content",
+        doc_type="api-reference",
+        generations=["dwc"],
+        context_header="",
+        deprecated=False,
+        display_url="",
+        source_type="flare",
+        score=1.0 / (i + 1),
+    )
+
+
+class _FakeIndex:
+    def __init__(self, hit: bool) -> None:
+        self.hit = hit
+        self.lookups = 0
+
+    def lookup(self, query: str) -> list[Identifier]:
+        self.lookups += 1
+        if not self.hit:
+            return []
+        return [Identifier(query, "class", "", "bbj_api://x", "u")]
+
+
+@pytest.fixture
+def search_client(
+    make_client: Callable[..., TestClient],
+    fake_pool: type[FakePool],
+    fake_embedder: type[FakeEmbedder],
+) -> Callable[..., TestClient]:
+    def make(
+        embedder: FakeEmbedder | None = None, identifier_hit: bool = False
+    ) -> TestClient:
+        return make_client(
+            routes.router,
+            overrides={
+                get_pool: fake_pool(),
+                get_query_embedder: embedder or fake_embedder(),
+                get_identifier_index: _FakeIndex(identifier_hit),
+                get_synonym_map: SynonymMap(),
+            },
+        )
+
+    return make
+
+
+@pytest.fixture
+def hybrid(monkeypatch: pytest.MonkeyPatch) -> list[SearchResult]:
+    # Two chunks per page so diversity reranking reorders the fused list
+    results = [_result(i, f"flare://page{i // 2}") for i in range(8)]
+
+    async def fake_hybrid_search(**kwargs: Any) -> list[SearchResult]:
+        return results[: kwargs["limit"]]
+
+    monkeypatch.setattr(routes, "async_hybrid_search", fake_hybrid_search)
+    return results
+
+
+@pytest.fixture
+def exact(monkeypatch: pytest.MonkeyPatch) -> list[SearchResult]:
+    results = [_result(100)]
+
+    async def fake_exact_search(**kwargs: Any) -> list[SearchResult]:
+        # The route resolves the identifier once and hands the URLs over
+        assert kwargs["source_urls"] == ["bbj_api://x"]
+        return results
+
+    monkeypatch.setattr(routes, "async_exact_match_search", fake_exact_search)
+    return results
+
+
+def _ndjson(text: str) -> list[dict[str, Any]]:
+    return [json.loads(line) for line in text.splitlines() if line]
+
+
+class TestSearchStreamNDJSON:
+    def test_fused_reranked_done(
+        self, search_client: Callable[..., TestClient], hybrid: list[SearchResult]
+    ) -> None:
+        client = search_client()
+        response = client.post("/search/stream", json={"query": "grid", "limit": 4})
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        events = _ndjson(response.text)
+        assert [e["event"] for e in events] == ["fused", "reranked", "done"]
+        assert [r["title"] for r in events[0]["results"]] == [
+            r.title for r in hybrid[:4]
+        ]
+        assert events[1]["count"] == 4
+        assert events[2] == {"event": "done", "query": "grid", "count": 4}
+
+    def test_final_stage_matches_search(
+        self, search_client: Callable[..., TestClient], hybrid: list[SearchResult]
+    ) -> None:
+        client = search_client()
+        body = {"query": "grid", "limit": 4}
+        events = _ndjson(client.post("/search/stream", json=body).text)
+        plain = client.post("/search", json=body).json()
+        reranked = events[1]
+        assert reranked["results"] == plain["results"]
+
+    def test_exact_fast_path_skips_embedding(
+        self,
+        search_client: Callable[..., TestClient],
+        fake_embedder: type[FakeEmbedder],
+        exact: list[SearchResult],
+        hybrid: list[SearchResult],
+    ) -> None:
+        embedder = fake_embedder()
+        client = search_client(embedder, identifier_hit=True)
+        events = _ndjson(client.post("/search/stream", json={"query": "BBjGrid"}).text)
+        assert [e["event"] for e in events] == ["exact", "done"]
+        assert events[0]["results"][0]["title"] == "Result 100"
+        assert embedder.calls == 0
+
+    def test_embedding_failure_is_error_event(
+        self,
+        search_client: Callable[..., TestClient],
+        fake_embedder: type[FakeEmbedder],
+        hybrid: list[SearchResult],
+    ) -> None:
+        embedder = fake_embedder(fail=EmbeddingOverloaded("queue full"))
+        client = search_client(embedder)
+        response = client.post("/search/stream", json={"query": "grid"})
+        assert response.status_code == 200
+        events = _ndjson(response.text)
+        assert [e["event"] for e in events] == ["error"]
+        assert events[0]["status"] == 503
+
+
+class TestSearchStreamSSE:
+    def test_event_stream(
+        self, search_client: Callable[..., TestClient], hybrid: list[SearchResult]
+    ) -> None:
+        client = search_client()
+        response = client.post(
+            "/search/stream",
+            json={"query": "grid", "limit": 2},
+            headers={"Accept": "text/event-stream"},
+        )
+        assert response.headers["content-type"].startswith("text/event-stream")
+        names = [
+            line.split(":", 1)[1].strip()
+            for line in response.text.splitlines()
+            if line.startswith("event:")
+        ]
+        assert names == ["fused", "reranked", "done"]
@@ -0,0 +1,138 @@
+"""Unit tests for query synonym extraction and expansion (no database required)."""
+
+from __future__ import annotations
+
+from bbj_rag.intelligence.synonyms import (
+    LEGACY_TERMS,
+    SynonymMap,
+    build_synonym_entries,
+    normalize_term,
+)
+from bbj_rag.search import _keyword_params, _keyword_tsquery
+
+_WINDOW_CARD = """# BBjWindow
+
+## Methods
+
+- `addButton(p_id, p_x, p_y)` - Adds a button
+- `setTitle(p_title)` - Sets the title
+- `show()` - Shows the window
+"""
+
+
+def _rows() -> list[tuple[str, str, str, str]]:
+    return [
+        (
+            "flare://Content/commands/seterr_verb.htm",
+            "SETERR Verb - Set Error Branch",
+            "Language > Verbs > SETERR Verb - Set Error Branch",
+            "",
+        ),
+        (
+            "flare://Content/mnemonics/cs.htm",
+            "'CS' Mnemonic - Clear Screen (Character Mode)",
+            "Language > Mnemonics",
+            "",
+        ),
+        (
+            "flare://Content/commands/mask.htm",
+            "MASK - Set Output Mask",
+            "Language > Functions > MASK",
+            "",
+        ),
+        (
+            "flare://Content/overview/intro.htm",
+            "INTRO - Not a keyword page",
+            "Getting Started",
+            "",
+        ),
+        ("bbj_api://BBjWindow", "BBjWindow", "BBjWindow", _WINDOW_CARD),
+    ]
+
+
+def _by_term() -> dict[str, tuple[str, ...]]:
+    return {e.term: e.expansions for e in build_synonym_entries(_rows())}
+
+
+class TestNormalizeTerm:
+    """normalize_term lowercases, strips quotes and drops stopwords."""
+
+    def test_normalize(self):
+        assert normalize_term("'CS'") == "cs"
+        assert normalize_term("Add a Button") == "add button"
+        assert normalize_term("the") == ""
+
+
+class TestBuildSynonymEntries:
+    """build_synonym_entries derives keyword and API-name mappings."""
+
+    def test_keyword_title_maps_both_directions(self):
+        terms = _by_term()
+        assert terms["seterr"] == ("Set Error Branch",)
+        assert terms["set error branch"] == ("SETERR",)
+
+    def test_mnemonic_parenthetical_dropped(self):
+        terms = _by_term()
+        assert terms["cs"] == ("Clear Screen",)
+        assert terms["clear screen"] == ("CS",)
+
+    def test_bare_title_needs_keyword_section(self):
+        terms = _by_term()
+        assert terms["mask"] == ("Set Output Mask",)
+        assert "intro" not in terms
+
+    def test_camelcase_methods(self):
+        terms = _by_term()
+        assert terms["add button"] == ("addButton",)
+        assert terms["set title"] == ("setTitle",)
+        assert "show" not in terms
+
+    def test_seed_terms_always_present(self):
+        terms = {e.term: e for e in build_synonym_entries([])}
+        assert set(terms) == {normalize_term(t) for t in LEGACY_TERMS}
+        assert terms["print mask"].source == "seed"
+
+
+class TestSynonymMap:
+    """SynonymMap expands query n-grams without repeating query words."""
+
+    def _map(self) -> SynonymMap:
+        return SynonymMap(
+            {e.term: e.expansions for e in build_synonym_entries(_rows())}
+        )
+
+    def test_keyword_expands_to_description(self):
+        assert self._map().expansions("How does SETERR work?") == ["Set Error Branch"]
+
+    def test_longest_ngram_and_stopwords(self):
+        assert self._map().expansions("add a button to a window") == ["addButton"]
+
+    def test_expansion_query_syntax(self):
+        query = self._map().expansion_query("print mask for SETERR")
+        # "mask" is already in the query, so only new phrasings are added.
+        assert query == "output mask or set output mask or set error branch"
+
+    def test_expansions_already_in_query_dropped(self):
+        synonyms = SynonymMap({"error trap": ["error"]})
+        assert synonyms.expansions("error trap") == []
+
+    def test_no_match_and_empty_map(self):
+        assert self._map().expansion_query("BBjGrid sorting") == ""
+        assert SynonymMap().expansions("SETERR") == []
+        assert len(SynonymMap()) == 0
+
+    def test_websearch_operators_stripped(self):
+        synonyms = SynonymMap({"x": ['-foo "bar" or baz']})
+        assert synonyms.expansion_query("x") == "foo bar baz"
+
+
+class TestKeywordTsquery:
+    """The BM25 SQL only changes when an expansion is present."""
+
+    def test_without_expansion(self):
+        assert _keyword_tsquery("") == "plainto_tsquery('english', %s)"
+        assert _keyword_params("q", "") == ["q"]
+
+    def test_with_expansion(self):
+        assert "websearch_to_tsquery" in _keyword_tsquery("seterr")
+        assert _keyword_params("q", "seterr") == ["q", "seterr"]